@@ -1,143 +1,281 @@
-import streamlit as st
-import plotly.io as pio
-
-from data_fetch import (
-    get_performance_trends,
-    get_department_performance,
-    get_attrition_rate,
-    get_department_load,
-    get_project_overlap,
-    get_employee_tenure_ladder,
-    get_employee_project_timelines
-)
-
-from visualizations import (
-    plot_performance_trends,
-    plot_department_performance,
-    plot_attrition_rate,
-    plot_department_load,
-    plot_employee_tenure_ladder,
-    plot_employee_project_timelines
-)
-
-from utils import (
-    download_plot,
-    download_as_excel,
-    render_plot_with_download
-)
-
-# Plotly rendering defaults
-pio.kaleido.scope.default_scale = 1
-pio.kaleido.scope.default_width = 700
-pio.kaleido.scope.default_height = 450
-
-# Constants
-DEPARTMENTS = ['HR', 'Engineering', 'Sales', 'Marketing', 'Finance']
-TAB_CONFIG = {
-    "📈 Performance Trends": {"dates": True, "threshold": True, "fetch": "performance"},
-    "🏢 Department Performance": {"dates": False, "threshold": False, "fetch": "department_perf"},
-    "📉 Attrition Analysis": {"dates": True, "threshold": False, "fetch": "attrition"},
-    "👥 Department Load": {"dates": True, "threshold": False, "fetch": "load"},
-    "🧭 Tenure Ladder": {"dates": False, "threshold": False, "fetch": "tenure"},
-    "🧩 Project Overlap": {"dates": False, "threshold": False, "fetch": "overlap"},
-    "📅 Employee Project Timelines": {"dates": False, "threshold": False, "fetch": "timelines"},
-}
-
-# Streamlit Config
-st.set_page_config(page_title="HR Analytics Dashboard", layout="wide")
-st.title('📊 HR Analytics Dashboard')
-
-# Sidebar Filters
-selected_tab = st.selectbox("Select a Tab", list(TAB_CONFIG.keys()))
-config = TAB_CONFIG[selected_tab]
-
-department = st.sidebar.selectbox("Select Department", DEPARTMENTS)
-
-start_date, end_date, threshold = None, None, None
-if config["dates"]:
-    st.sidebar.subheader("Select Date Range")
-    start_year = st.sidebar.selectbox("Start Year", range(2015, 2026), index=0)
-    end_year = st.sidebar.selectbox("End Year", range(2015, 2026), index=10)
-    start_month = st.sidebar.selectbox("Start Month", range(1, 13), format_func=lambda x: f"{x:02d}")
-    end_month = st.sidebar.selectbox("End Month", range(1, 13), format_func=lambda x: f"{x:02d}")
-    start_date = f"{start_year}-{start_month:02d}-01"
-    end_date = f"{end_year}-{end_month:02d}-28"
-
-if config["threshold"]:
-    threshold = st.sidebar.slider("Performance Score Threshold", 0, 10, 5)
-
-# --- Cached Fetch Functions ---
-@st.cache_data
-def fetch_performance(dept, date_range, thresh):
-    return get_performance_trends(dept, date_range, thresh)
-
-@st.cache_data
-def fetch_department_performance(dept):
-    return get_department_performance(dept)
-
-@st.cache_data
-def fetch_attrition(dept, start, end):
-    return get_attrition_rate(dept, start, end)
-
-@st.cache_data
-def fetch_department_load(dept, start, end):
-    return get_department_load(dept, start, end)
-
-@st.cache_data
-def fetch_tenure(dept):
-    return get_employee_tenure_ladder(dept)
-
-@st.cache_data
-def fetch_overlap(dept):
-    return get_project_overlap(dept)
-
-@st.cache_data
-def fetch_timelines(dept):
-    return get_employee_project_timelines(dept)
-
-# --- Tab Logic ---
-if config["fetch"] == "performance":
-    df = fetch_performance(department, (start_date, end_date), threshold)
-    fig = plot_performance_trends(df)
-    fname = f"{department}_Performance_{start_date[:7]}_{end_date[:7]}.png"
-    render_plot_with_download(fig, "Performance Trends", fname)
-
-elif config["fetch"] == "department_perf":
-    df = fetch_department_performance(department)
-    fig = plot_department_performance(df)
-    fname = f"{department}_Department_Performance.png"
-    render_plot_with_download(fig, "Department Performance", fname)
-
-elif config["fetch"] == "attrition":
-    df = fetch_attrition(department, start_date, end_date)
-    fig = plot_attrition_rate(df)
-    fname = f"{department}_Attrition_{start_date[:7]}_{end_date[:7]}.png"
-    render_plot_with_download(fig, "Attrition Analysis", fname)
-
-elif config["fetch"] == "load":
-    df = fetch_department_load(department, start_date, end_date)
-    fig = plot_department_load(df)
-    fname = f"{department}_DeptLoad_{start_date[:7]}_{end_date[:7]}.png"
-    render_plot_with_download(fig, "Department Load", fname)
-
-elif config["fetch"] == "tenure":
-    df = fetch_tenure(department)
-    fig = plot_employee_tenure_ladder(df)
-    fname = f"{department}_Tenure_Ladder.png"
-    render_plot_with_download(fig, "Employee Tenure Ladder", fname)
-
-elif config["fetch"] == "overlap":
-    df = fetch_overlap(department)
-    st.subheader("Project Overlap Detection")
-    if df is not None and not df.empty:
-        st.dataframe(df)
-        fname = f"{department}_Project_Overlap.xlsx"
-        download_as_excel(df, fname)
-    else:
-        st.info("No overlapping projects found.")
-
-elif config["fetch"] == "timelines":
-    df = fetch_timelines(department)
-    fig = plot_employee_project_timelines(df)
-    fname = f"{department}_Project_Timelines.png"
-    render_plot_with_download(fig, "Employee Project Timelines", fname)
+import os
+import threading
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from data_fetch import (
+    DB_PATH,
+    get_db_pool,
+    get_performance_trends,
+    get_department_performance,
+    get_attrition_rate,
+    get_department_load,
+    get_project_overlap,
+    get_employee_tenure_ladder,
+    get_employee_project_timelines,
+    get_department_comparison,
+    get_department_names,
+    get_employee_profile,
+    search_employees,
+    employee_logs_source,
+    project_overlap_source,
+    project_timelines_source,
+    stream_project_timelines
+)
+
+from visualizations import (
+    plot_performance_trends,
+    plot_department_performance,
+    plot_attrition_rate,
+    plot_department_load,
+    plot_employee_tenure_ladder,
+    plot_employee_project_timelines,
+    plot_department_comparison,
+    plot_department_heatmap,
+    plot_employee_reviews
+)
+
+from utils import (
+    download_plot,
+    download_export,
+    render_plot_with_download,
+    render_paged_table,
+    render_performance_panel
+)
+from employee_search import search_text
+from exports import frame_chunks
+from instrumentation import get_recorder, set_context
+
+from prefetch import PrefetchScheduler
+
+# Constants
+TAB_CONFIG = {
+    "📈 Performance Trends": {"dates": True, "threshold": True, "fetch": "performance"},
+    "🏢 Department Performance": {"dates": True, "threshold": False, "fetch": "department_perf"},
+    "📉 Attrition Analysis": {"dates": True, "threshold": False, "fetch": "attrition"},
+    "👥 Department Load": {"dates": True, "threshold": False, "fetch": "load"},
+    "🧭 Tenure Ladder": {"dates": False, "threshold": False, "fetch": "tenure"},
+    "🧩 Project Overlap": {"dates": False, "threshold": False, "fetch": "overlap"},
+    "📅 Employee Project Timelines": {"dates": False, "threshold": False, "fetch": "timelines"},
+    "🗂️ All Departments": {"dates": True, "threshold": False, "fetch": "compare"},
+    "🔎 Employee Search": {"dates": False, "threshold": False, "fetch": "search"},
+}
+
+# Query behind each tab, with a uniform (department, start, end, threshold) signature;
+# the search tab queries from its own search box instead
+FETCHERS = {
+    "performance": lambda dept, start, end, thresh: get_performance_trends(dept, (start, end), thresh),
+    "department_perf": lambda dept, start, end, thresh: get_department_performance(dept, start, end),
+    "attrition": lambda dept, start, end, thresh: get_attrition_rate(dept, start, end),
+    "load": lambda dept, start, end, thresh: get_department_load(dept, start, end),
+    "tenure": lambda dept, start, end, thresh: get_employee_tenure_ladder(dept),
+    "overlap": lambda dept, start, end, thresh: get_project_overlap(dept),
+    "timelines": lambda dept, start, end, thresh: get_employee_project_timelines(dept),
+    "compare": lambda dept, start, end, thresh: get_department_comparison(start, end),
+}
+
+# Tab shown for each fetch, so prefetched queries are attributed to it
+FETCH_TABS = {config["fetch"]: tab for tab, config in TAB_CONFIG.items()}
+
+# Widget defaults, used to prefetch tabs whose filters aren't currently shown
+DEFAULT_START_DATE = "2015-01-01"
+DEFAULT_END_DATE = "2025-01-28"
+DEFAULT_THRESHOLD = 5
+
+# Width in pixels the time-series charts are downsampled for. Streamlit doesn't
+# tell the script how wide the browser draws a chart, so it is configured; the
+# default fits the wide layout on a 1080p screen
+CHART_WIDTH_PX = int(os.environ.get('HR_CHART_WIDTH_PX', 1200))
+
+# Background prefetch: shared worker threads, and a cap on queued jobs per session
+PREFETCH_WORKERS = 4
+PREFETCH_MAX_INFLIGHT = len(TAB_CONFIG) - 1
+
+# Streamlit Config
+st.set_page_config(page_title="HR Analytics Dashboard", layout="wide")
+st.title('📊 HR Analytics Dashboard')
+
+# Sidebar Filters
+selected_tab = st.selectbox("Select a Tab", list(TAB_CONFIG.keys()))
+config = TAB_CONFIG[selected_tab]
+set_context(selected_tab)
+
+# A database missing schema migrations stops here with the command that migrates
+# it, instead of every query failing on its own
+try:
+    get_db_pool(DB_PATH)
+except RuntimeError as e:
+    st.error(str(e))
+    st.stop()
+
+# Departments come from the database, so new ones appear without a code change
+departments = get_department_names()
+if not departments:
+    st.error("No departments found in the database.")
+    st.stop()
+department = st.sidebar.selectbox("Select Department", departments)
+
+start_date, end_date, threshold = None, None, None
+if config["dates"]:
+    st.sidebar.subheader("Select Date Range")
+    start_year = st.sidebar.selectbox("Start Year", range(2015, 2026), index=0)
+    end_year = st.sidebar.selectbox("End Year", range(2015, 2026), index=10)
+    start_month = st.sidebar.selectbox("Start Month", range(1, 13), format_func=lambda x: f"{x:02d}")
+    end_month = st.sidebar.selectbox("End Month", range(1, 13), format_func=lambda x: f"{x:02d}")
+    start_date = f"{start_year}-{start_month:02d}-01"
+    end_date = f"{end_year}-{end_month:02d}-28"
+
+if config["threshold"]:
+    threshold = st.sidebar.slider("Performance Score Threshold", 0, 10, DEFAULT_THRESHOLD)
+
+# Time-series charts are downsampled to the chart width (and large departments'
+# performance drawn as a band); this shows every employee and point
+full_detail = False
+if config["fetch"] in ("performance", "load"):
+    full_detail = st.sidebar.checkbox("Show full detail", value=False,
+                                      help="Plot every data point instead of a downsampled series")
+
+# --- Background Prefetch ---
+# Warm the cache for every other tab while this one renders. Hidden date and
+# threshold widgets come back at their defaults, so prefetch with those.
+@st.cache_resource
+def get_prefetch_executor():
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+# Run a job on a worker thread under this session's script context, so the
+# st.cache_resource lookups inside data_fetch behave as on the script thread;
+# its timings are recorded as background samples of the tab it warms
+def in_session(job, ctx, tab):
+    add_script_run_ctx(threading.current_thread(), ctx)
+    set_context(tab, background=True)
+    return job()
+
+if "prefetch" not in st.session_state:
+    st.session_state["prefetch"] = PrefetchScheduler(get_prefetch_executor(), max_inflight=PREFETCH_MAX_INFLIGHT)
+
+prefetch_start, prefetch_end = (start_date, end_date) if config["dates"] else (DEFAULT_START_DATE, DEFAULT_END_DATE)
+prefetch_threshold = threshold if config["threshold"] else DEFAULT_THRESHOLD
+prefetch_jobs = {
+    fetch: partial(in_session, partial(fetcher, department, prefetch_start, prefetch_end, prefetch_threshold),
+                   get_script_run_ctx(), FETCH_TABS[fetch])
+    for fetch, fetcher in FETCHERS.items() if fetch != config["fetch"]
+}
+st.session_state["prefetch"].schedule((department, prefetch_start, prefetch_end, prefetch_threshold), prefetch_jobs)
+
+# Warm the cache for the next page of a paged table through this session's
+# scheduler, so it shares the per-session cap and is cancelled with the filters
+def prefetch_page(name, job):
+    st.session_state["prefetch"].add(name, partial(in_session, job, get_script_run_ctx(), selected_tab))
+
+# --- Tab Logic ---
+# Results are cached once, in data_fetch's shared QueryCache
+fetcher = FETCHERS.get(config["fetch"])
+df = fetcher(department, start_date, end_date, threshold) if fetcher else None
+
+if config["fetch"] == "performance":
+    fig = plot_performance_trends(df, width_px=CHART_WIDTH_PX, full_detail=full_detail)
+    fname = f"{department}_Performance_{start_date[:7]}_{end_date[:7]}.png"
+    render_plot_with_download(fig, "Performance Trends", fname)
+
+elif config["fetch"] == "department_perf":
+    fig = plot_department_performance(df)
+    fname = f"{department}_Department_Performance_{start_date[:7]}_{end_date[:7]}.png"
+    render_plot_with_download(fig, "Department Performance", fname)
+
+elif config["fetch"] == "attrition":
+    fig = plot_attrition_rate(df)
+    fname = f"{department}_Attrition_{start_date[:7]}_{end_date[:7]}.png"
+    render_plot_with_download(fig, "Attrition Analysis", fname)
+
+elif config["fetch"] == "load":
+    fig = plot_department_load(df, width_px=CHART_WIDTH_PX, full_detail=full_detail)
+    fname = f"{department}_DeptLoad_{start_date[:7]}_{end_date[:7]}.png"
+    render_plot_with_download(fig, "Department Load", fname)
+
+elif config["fetch"] == "tenure":
+    fig = plot_employee_tenure_ladder(df)
+    fname = f"{department}_Tenure_Ladder.png"
+    render_plot_with_download(fig, "Employee Tenure Ladder", fname)
+
+elif config["fetch"] == "overlap":
+    st.subheader("Project Overlap Detection")
+    if df is not None and not df.empty:
+        # Page through the overlaps instead of sending every row to the browser
+        render_paged_table(project_overlap_source(department, df), f"overlap_{department}", prefetch=prefetch_page)
+        download_export(partial(frame_chunks, df), f"{department}_Project_Overlap")
+    else:
+        st.info("No overlapping projects found.")
+
+elif config["fetch"] == "timelines":
+    fig = plot_employee_project_timelines(df)
+    fname = f"{department}_Project_Timelines.png"
+    render_plot_with_download(fig, "Employee Project Timelines", fname)
+    # Export rows straight from the cursor rather than from the cached frame
+    if df is not None and not df.empty:
+        st.subheader("Time Logs")
+        render_paged_table(project_timelines_source(department), f"timelines_{department}", prefetch=prefetch_page)
+        download_export(partial(stream_project_timelines, department), f"{department}_Project_Timelines")
+
+elif config["fetch"] == "compare":
+    # Every department side by side; the department selector doesn't apply here
+    period = f"{start_date[:7]}_{end_date[:7]}"
+    fig = plot_department_comparison(df["summary"])
+    render_plot_with_download(fig, "Department Comparison", f"All_Departments_Comparison_{period}.png")
+    fig = plot_department_heatmap(df["attrition"], "exits", "Monthly Exits by Department", "Exits")
+    render_plot_with_download(fig, "Monthly Exits by Department", f"All_Departments_Exits_{period}.png")
+    fig = plot_department_heatmap(df["load"], "avg_hours_logged", "Average Hours Logged by Department", "Avg Hours")
+    render_plot_with_download(fig, "Average Hours Logged by Department", f"All_Departments_Hours_{period}.png")
+
+elif config["fetch"] == "search":
+    # Matches are looked up each time the text is committed (Enter or leaving
+    # the box); picking one opens that employee's profile
+    st.subheader("Employee Search")
+    text = search_text(st.text_input("Employee name", key="employee_search",
+                                     placeholder="Type part of a name and press Enter"))
+    matches = search_employees(text) if text else None
+    if not text:
+        st.caption("Names starting with the text are listed first, then names containing it.")
+    elif matches is None:
+        st.error("Employee search failed.")
+    elif matches.empty:
+        st.info(f"No employees match '{text}'.")
+    else:
+        labels = {emp_id: f"{name} · {dept} · #{emp_id}" for emp_id, name, dept
+                  in zip(matches["emp_id"].tolist(), matches["name"].tolist(), matches["department"].tolist())}
+        emp_id = st.selectbox(f"{len(labels)} matches", list(labels), index=None, format_func=labels.get,
+                              placeholder="Choose an employee", key="employee_search_pick")
+        if emp_id is not None:
+            profile = get_employee_profile(emp_id)
+            employee = profile["employee"]
+            if employee is None or employee.empty:
+                st.error("Could not load this employee.")
+            else:
+                person = employee.iloc[0]
+                st.subheader(person["name"])
+                dept_col, joined_col, left_col, tenure_col = st.columns(4)
+                dept_col.metric("Department", person["department"] if employee["department"].notna().iloc[0] else "—")
+                joined_col.metric("Joined", str(person["join_date"])[:10])
+                left_col.metric("Left", str(person["exit_date"])[:10] if employee["exit_date"].notna().iloc[0]
+                                else "Still employed")
+                tenure_col.metric("Tenure", f"{person['tenure_years']:.1f} years")
+
+                fig = plot_employee_reviews(profile["reviews"])
+                render_plot_with_download(fig, "Review Scores", f"Employee_{emp_id}_Reviews.png")
+
+                st.subheader("Projects")
+                projects = profile["projects"]
+                if projects is not None and not projects.empty:
+                    st.dataframe(projects[["project_name", "first_log", "last_log", "logs", "hours_logged"]],
+                                 hide_index=True)
+                    st.subheader("Time Logs")
+                    render_paged_table(employee_logs_source(emp_id), f"employee_logs_{emp_id}",
+                                       prefetch=prefetch_page)
+                else:
+                    st.info("No project time logged.")
+
+# --- Performance Panel ---
+# Hidden unless the dashboard is opened with ?perf=1
+if st.query_params.get("perf") == "1":
+    render_performance_panel(get_recorder())
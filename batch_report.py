@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+
+import numpy as np
+
+from chart_export import EXPORT_HEIGHT, EXPORT_SCALE, EXPORT_WIDTH
+
+REPORT_FORMATS = ('png', 'pdf')
+DEFAULT_START_DATE = '2015-01-01'
+DEFAULT_THRESHOLD = 5
+
+# Directory holding the company-wide charts, next to one directory per department
+ALL_DEPARTMENTS = 'All Departments'
+
+# Report charts grouped by the query they are drawn from, so each result is
+# fetched once per department and shared by every chart that needs it. Each
+# chart is (file stem, plot function name, extra arguments); 'company' groups
+# are rendered once for the whole report instead of once per department.
+REPORT_GROUPS = {
+    'performance': {'company': False, 'charts': [('Performance_Trends', 'plot_performance_trends', ())]},
+    'department_perf': {'company': False, 'charts': [('Department_Performance', 'plot_department_performance', ())]},
+    'attrition': {'company': False, 'charts': [('Attrition', 'plot_attrition_rate', ())]},
+    'load': {'company': False, 'charts': [('Department_Load', 'plot_department_load', ())]},
+    'tenure': {'company': False, 'charts': [('Tenure_Ladder', 'plot_employee_tenure_ladder', ())]},
+    'timelines': {'company': False, 'charts': [('Project_Timelines', 'plot_employee_project_timelines', ())]},
+    'compare': {'company': True, 'charts': [
+        ('Comparison', 'plot_department_comparison', ('summary',)),
+        ('Exits', 'plot_department_heatmap', ('attrition', 'exits', 'Monthly Exits by Department', 'Exits')),
+        ('Hours', 'plot_department_heatmap',
+         ('load', 'avg_hours_logged', 'Average Hours Logged by Department', 'Avg Hours')),
+    ]},
+}
+
+STAGES = ('fetch', 'plot', 'render', 'write')
+
+
+def _fetch(data_fetch, group, department, start_date, end_date, threshold):
+    if group == 'performance':
+        return data_fetch.get_performance_trends(department, (start_date, end_date), threshold)
+    if group == 'department_perf':
+        return data_fetch.get_department_performance(department, start_date, end_date)
+    if group == 'attrition':
+        return data_fetch.get_attrition_rate(department, start_date, end_date)
+    if group == 'load':
+        return data_fetch.get_department_load(department, start_date, end_date)
+    if group == 'tenure':
+        return data_fetch.get_employee_tenure_ladder(department)
+    if group == 'timelines':
+        return data_fetch.get_employee_project_timelines(department)
+    return data_fetch.get_department_comparison(start_date, end_date)
+
+
+def safe_name(text):
+    """File-system safe version of a department name."""
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', text).strip('_') or 'unnamed'
+
+
+def _init_worker(db_path):
+    import data_fetch
+
+    data_fetch.DB_PATH = db_path
+
+
+def render_group(group, department, start_date, end_date, threshold, out_dir, formats):
+    """Fetch one query and render every chart drawn from it. Runs in a worker process.
+
+    Returns a manifest entry per chart, with the files written and the time spent in
+    every stage; the fetch time is charged to the group's first chart.
+    """
+    import data_fetch
+    import visualizations
+
+    started = time.perf_counter()
+    data = _fetch(data_fetch, group, department, start_date, end_date, threshold)
+    fetch_seconds = time.perf_counter() - started
+
+    directory = os.path.join(out_dir, safe_name(department))
+    os.makedirs(directory, exist_ok=True)
+    entries = []
+    for stem, plot_name, args in REPORT_GROUPS[group]['charts']:
+        entry = {'department': department, 'group': group, 'chart': stem, 'files': [], 'pid': os.getpid()}
+        stages = dict.fromkeys(STAGES, 0.0)
+        stages['fetch'], fetch_seconds = fetch_seconds, 0.0  # the fetch is shared, so only the first chart pays it
+        try:
+            started = time.perf_counter()
+            frame = data[args[0]] if args and isinstance(data, dict) else data
+            fig = getattr(visualizations, plot_name)(frame, *args[1:])
+            stages['plot'] = time.perf_counter() - started
+            entry['status'] = 'ok' if fig is not None else 'no data'
+            for fmt in formats if fig is not None else ():
+                started = time.perf_counter()
+                image = fig.to_image(format=fmt, width=EXPORT_WIDTH, height=EXPORT_HEIGHT, scale=EXPORT_SCALE)
+                rendered = time.perf_counter()
+                path = os.path.join(directory, f"{safe_name(department)}_{stem}.{fmt}")
+                with open(path, 'wb') as out:
+                    out.write(image)
+                stages['render'] += rendered - started
+                stages['write'] += time.perf_counter() - rendered
+                entry['files'].append({'path': os.path.relpath(path, out_dir), 'format': fmt, 'bytes': len(image)})
+        except Exception as e:
+            print(f"Report error ({department}, {stem}): {e}")
+            entry['status'] = 'error'
+            entry['error'] = str(e)
+        entry['stages_ms'] = {stage: round(seconds * 1000, 3) for stage, seconds in stages.items()}
+        entries.append(entry)
+    return entries
+
+
+def stage_summary(entries):
+    """Total, p50 and p95 milliseconds per stage across all charts."""
+    summary = {}
+    for stage in STAGES:
+        values = [entry['stages_ms'][stage] for entry in entries if entry['stages_ms'][stage] > 0]
+        summary[stage] = {
+            'total_ms': round(sum(values), 3),
+            'p50_ms': round(float(np.percentile(values, 50)), 3) if values else 0.0,
+            'p95_ms': round(float(np.percentile(values, 95)), 3) if values else 0.0,
+        }
+    return summary
+
+
+def build_report(db_path, out_dir, departments=None, start_date=DEFAULT_START_DATE, end_date=None,
+                 threshold=DEFAULT_THRESHOLD, formats=('png',), groups=None, workers=None):
+    """Render the (department x chart) matrix on a process pool and write a manifest.
+
+    Each task is one query group for one department; company-wide groups are
+    one task for the whole report. Returns the manifest, which is also written
+    to out_dir/manifest.json.
+    """
+    import data_fetch
+
+    data_fetch.DB_PATH = db_path
+    end_date = end_date or date.today().isoformat()
+    known = data_fetch.get_department_names()
+    for name in set(departments or ()) - set(known):
+        print(f"Unknown department '{name}', skipped")
+    departments = [name for name in departments if name in known] if departments else known
+    groups = groups or list(REPORT_GROUPS)
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+
+    tasks = []
+    for group in groups:
+        targets = [ALL_DEPARTMENTS] if REPORT_GROUPS[group]['company'] else departments
+        tasks += [(group, department) for department in targets]
+
+    started = time.perf_counter()
+    entries = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_path,)) as executor:
+        futures = [executor.submit(render_group, group, department, start_date, end_date, threshold,
+                                   out_dir, formats)
+                   for group, department in tasks]
+        for future in as_completed(futures):
+            entries += future.result()
+    wall = time.perf_counter() - started
+
+    entries.sort(key=lambda entry: (entry['department'], entry['group'], entry['chart']))
+    busy_ms = sum(sum(entry['stages_ms'].values()) for entry in entries)
+    manifest = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'db_path': db_path,
+        'date_range': [start_date, end_date],
+        'threshold': threshold,
+        'formats': list(formats),
+        'workers': workers,
+        'tasks': len(tasks),
+        'wall_ms': round(wall * 1000, 3),
+        # Share of the pool's capacity spent in the stages; near 1 means every core was busy
+        'utilization': round(busy_ms / max(wall * 1000 * workers, 1e-9), 3),
+        'stages': stage_summary(entries),
+        'charts': entries,
+    }
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render every dashboard chart for every department, headless.")
+    parser.add_argument('--db', default=os.environ.get('HR_DB_PATH', 'db/hr_analytics.db'))
+    parser.add_argument('--output-dir', default='reports', help="Where charts and manifest.json are written")
+    parser.add_argument('--departments', nargs='+', help="Only these departments (default: all)")
+    parser.add_argument('--charts', nargs='+', choices=list(REPORT_GROUPS), help="Only these chart groups")
+    parser.add_argument('--start', default=DEFAULT_START_DATE, help="Start of the date range (YYYY-MM-DD)")
+    parser.add_argument('--end', default=None, help="End of the date range (default: today)")
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD, help="Performance score threshold")
+    parser.add_argument('--formats', nargs='+', choices=REPORT_FORMATS, default=['png'])
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    manifest = build_report(args.db, args.output_dir, args.departments, args.start, args.end, args.threshold,
+                            args.formats, args.charts, args.workers)
+    failed = [entry for entry in manifest['charts'] if entry['status'] == 'error']
+    print(f"{len(manifest['charts'])} charts from {manifest['tasks']} tasks on {manifest['workers']} workers "
+          f"in {manifest['wall_ms'] / 1000:.1f} s (utilization {manifest['utilization']:.0%}), {len(failed)} failed")
+    for stage, stats in manifest['stages'].items():
+        print(f"  {stage:<7} total {stats['total_ms']:10.1f} ms  p50 {stats['p50_ms']:8.1f} ms  "
+              f"p95 {stats['p95_ms']:8.1f} ms")
+    print(f"Manifest written to {os.path.join(args.output_dir, 'manifest.json')}")
@@ -0,0 +1,419 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import data_fetch
+from columnar_backend import export_snapshot
+from data_generator import (BULK_LOAD_PRAGMAS, DAY_STRINGS, EMPLOYEES_PER_SCALE, create_tables, department_names,
+                            generate_database, generate_employees, insert_rows, scaled_counts)
+from frame_schema import frame_bytes
+from migrations import apply_migrations
+from partitioning import build_partitions
+
+BENCH_DIR = 'bench_data'
+SNAPSHOT_DIR = os.path.join(BENCH_DIR, 'snapshots')
+PARTITION_DIR = os.path.join(BENCH_DIR, 'partitions')
+DEFAULT_SCALES = (0.1, 1.0, 10.0)
+DEFAULT_DEPARTMENT = 'Engineering'
+DEFAULT_START_DATE = '2010-01-01'
+DEFAULT_END_DATE = '2024-12-31'
+
+# Latency increases smaller than this are treated as noise when checking for regressions
+MIN_REGRESSION_MS = 1.0
+
+# Employee search is timed on its own database of this many employees, against a
+# type-ahead budget. The texts cover every path: one and two letters (prefix seek
+# only), a first name that is also inside last names, a surname fragment, text
+# spanning first and last name, and text that matches nothing.
+SEARCH_EMPLOYEES = 1_000_000
+SEARCH_BUDGET_MS = 20.0
+SEARCH_TERMS = ('a', 'wi', 'will', 'son', 'ice bro', 'xyz')
+
+
+def prepare_database(scale, seed=42, bench_dir=BENCH_DIR):
+    """Return the path of a generated, indexed database for this scale, building it if missing."""
+    os.makedirs(bench_dir, exist_ok=True)
+    db_path = os.path.join(bench_dir, f'hr_sf{scale:g}_seed{seed}.db')
+    if not os.path.exists(db_path):
+        print(f"Generating scale {scale:g} database at {db_path} ...")
+        generate_database(db_path, scale=scale, seed=seed, verbose=False).report()
+    # Databases kept from earlier runs are brought up to the latest schema too
+    apply_migrations(db_path)
+    return db_path
+
+
+@contextmanager
+def uncached():
+    """Bypass the result cache so every call reaches the database."""
+    cache_enabled, data_fetch.QUERY_CACHE_ENABLED = data_fetch.QUERY_CACHE_ENABLED, False
+    try:
+        yield
+    finally:
+        data_fetch.QUERY_CACHE_ENABLED = cache_enabled
+
+
+@contextmanager
+def on_database(db_path):
+    """Run data_fetch queries against db_path, then point it back at its previous database."""
+    previous, data_fetch.DB_PATH = data_fetch.DB_PATH, db_path
+    try:
+        yield
+    finally:
+        data_fetch.DB_PATH = previous
+
+
+def run_query(name, department, start_date, end_date, repeat, explain=True, db_path=None):
+    """Time one registered query and return latency percentiles, row count and query plans.
+
+    Runs against db_path if given, else data_fetch.DB_PATH.
+    """
+    with on_database(db_path or data_fetch.DB_PATH):
+        fn, build_args = data_fetch.QUERY_REGISTRY[name]
+        args = build_args(department, start_date, end_date)
+
+        executed = []
+        def capture(query, params, seconds, rows):
+            executed.append((query, params))
+
+        # The warm-up run doubles as the capture of the SQL the function executes
+        with uncached():
+            data_fetch.add_query_listener(capture)
+            try:
+                result = fn(*args)
+            finally:
+                data_fetch.remove_query_listener(capture)
+
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                result = fn(*args)
+                timings.append((time.perf_counter() - started) * 1000)
+
+        plans = {}
+        for query, params in executed if explain else []:
+            # Comments are dropped before joining lines so the key stays valid SQL
+            key = ' '.join(re.sub(r'--[^\n]*', '', query).split())
+            plans.setdefault(key, (params, data_fetch.explain_query_plan(query, params)))
+
+    return {
+        'p50_ms': round(float(np.percentile(timings, 50)), 3),
+        'p95_ms': round(float(np.percentile(timings, 95)), 3),
+        'rows': 0 if result is None else len(result),
+        'failed': result is None,
+        'plans': [{'query': query, 'params': list(params or ()), 'plan': plan}
+                  for query, (params, plan) in plans.items()],
+    }
+
+
+def run_suite(scales=DEFAULT_SCALES, repeat=5, seed=42, department=DEFAULT_DEPARTMENT,
+              start_date=DEFAULT_START_DATE, end_date=DEFAULT_END_DATE, queries=None):
+    """Run every registered query at every scale and return the results document."""
+    results = {}
+    for scale in scales:
+        data_fetch.DB_PATH = prepare_database(scale, seed)
+        results[f'{scale:g}'] = scale_results = {}
+        for name in queries or data_fetch.QUERY_REGISTRY:
+            scale_results[name] = run_query(name, department, start_date, end_date, repeat)
+            stats = scale_results[name]
+            print(f"sf={scale:<6g} {name:<24} p50 {stats['p50_ms']:9.2f} ms  "
+                  f"p95 {stats['p95_ms']:9.2f} ms  rows {stats['rows']:>9,}")
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'seed': seed,
+        'repeat': repeat,
+        'department': department,
+        'date_range': [start_date, end_date],
+        'results': results,
+    }
+
+
+def same_frames(left, right):
+    """True when two query results are identical, values and dtypes."""
+    if left is None or right is None:
+        return left is right
+    try:
+        pd.testing.assert_frame_equal(left, right)
+    except AssertionError:
+        return False
+    return True
+
+
+def compare_backends(scales=DEFAULT_SCALES, repeat=5, seed=42, department=DEFAULT_DEPARTMENT,
+                     start_date=DEFAULT_START_DATE, end_date=DEFAULT_END_DATE, queries=None,
+                     snapshot_dir=SNAPSHOT_DIR):
+    """Time every registered query on SQLite and on DuckDB over a Parquet snapshot.
+
+    Snapshots are exported on first use (or when the database has changed).
+    Each query's frames from both engines are compared and the result is
+    recorded as 'identical'.
+    """
+    results = {}
+    backend = data_fetch.ANALYTICS_BACKEND
+    data_fetch.SNAPSHOT_DIR = snapshot_dir
+    try:
+        for scale in scales:
+            data_fetch.DB_PATH = db_path = prepare_database(scale, seed)
+            if not data_fetch.get_columnar_backend(db_path).is_current(db_path):
+                print(f"Exporting Parquet snapshot of {db_path} ...")
+                export_snapshot(db_path, snapshot_dir, verbose=False)
+            results[f'{scale:g}'] = scale_results = {}
+            for name in queries or data_fetch.QUERY_REGISTRY:
+                fn, build_args = data_fetch.QUERY_REGISTRY[name]
+                frames, stats = {}, {}
+                for engine in ('sqlite', 'duckdb'):
+                    data_fetch.ANALYTICS_BACKEND = engine
+                    with uncached():
+                        frames[engine] = fn(*build_args(department, start_date, end_date))
+                    stats[engine] = run_query(name, department, start_date, end_date, repeat, explain=False)
+                    del stats[engine]['plans']
+                scale_results[name] = dict(stats, identical=same_frames(frames['sqlite'], frames['duckdb']))
+                speedup = stats['sqlite']['p50_ms'] / max(stats['duckdb']['p50_ms'], 1e-9)
+                print(f"sf={scale:<6g} {name:<24} sqlite p50 {stats['sqlite']['p50_ms']:9.2f} ms  "
+                      f"duckdb p50 {stats['duckdb']['p50_ms']:9.2f} ms  {speedup:6.2f}x  "
+                      f"{'identical' if scale_results[name]['identical'] else 'MISMATCH'}")
+    finally:
+        data_fetch.ANALYTICS_BACKEND = backend
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'seed': seed,
+        'repeat': repeat,
+        'department': department,
+        'date_range': [start_date, end_date],
+        'backends': results,
+    }
+
+
+@contextmanager
+def partition_routing(enabled):
+    """Turn routing of partition plans to the per-year partition files on or off."""
+    routing, data_fetch.PARTITION_ROUTING = data_fetch.PARTITION_ROUTING, enabled
+    try:
+        yield
+    finally:
+        data_fetch.PARTITION_ROUTING = routing
+
+
+def compare_partitions(scales=DEFAULT_SCALES, repeat=5, seed=42, department=DEFAULT_DEPARTMENT,
+                       start_date=DEFAULT_START_DATE, end_date=DEFAULT_END_DATE, queries=None,
+                       partition_dir=PARTITION_DIR):
+    """Time every registered query on the single database file and routed over per-year partitions.
+
+    Partitions are built on first use (or rebuilt for the years that changed).
+    Queries without a partition plan run on the main file both times. Each
+    query's frames are compared and the result is recorded as 'identical'.
+    """
+    results = {}
+    data_fetch.PARTITION_DIR = partition_dir
+    for scale in scales:
+        data_fetch.DB_PATH = db_path = prepare_database(scale, seed)
+        if not data_fetch.get_partition_router(db_path).is_current(db_path):
+            print(f"Building partitions of {db_path} ...")
+            build_partitions(db_path, partition_dir, verbose=False)
+        results[f'{scale:g}'] = scale_results = {}
+        for name in queries or data_fetch.QUERY_REGISTRY:
+            fn, build_args = data_fetch.QUERY_REGISTRY[name]
+            frames, stats = {}, {}
+            for layout, routed in (('single', False), ('partitioned', True)):
+                with partition_routing(routed):
+                    with uncached():
+                        frames[layout] = fn(*build_args(department, start_date, end_date))
+                    stats[layout] = run_query(name, department, start_date, end_date, repeat, explain=False)
+                del stats[layout]['plans']
+            scale_results[name] = dict(stats, identical=same_frames(frames['single'], frames['partitioned']))
+            speedup = stats['single']['p50_ms'] / max(stats['partitioned']['p50_ms'], 1e-9)
+            print(f"sf={scale:<6g} {name:<24} single p50 {stats['single']['p50_ms']:9.2f} ms  "
+                  f"partitioned p50 {stats['partitioned']['p50_ms']:9.2f} ms  {speedup:6.2f}x  "
+                  f"{'identical' if scale_results[name]['identical'] else 'MISMATCH'}")
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'seed': seed,
+        'repeat': repeat,
+        'department': department,
+        'date_range': [start_date, end_date],
+        'partitions': results,
+    }
+
+
+@contextmanager
+def typed_frames(enabled):
+    """Turn the fetch layer's result typing on or off."""
+    typed, data_fetch.TYPED_FRAMES = data_fetch.TYPED_FRAMES, enabled
+    try:
+        yield
+    finally:
+        data_fetch.TYPED_FRAMES = typed
+
+
+def memory_report(scales=DEFAULT_SCALES, seed=42, department=DEFAULT_DEPARTMENT,
+                  start_date=DEFAULT_START_DATE, end_date=DEFAULT_END_DATE, queries=None):
+    """Deep memory of every registered query's frame with raw driver types and with typed columns.
+
+    Queries returning something other than a DataFrame (e.g. headcount events)
+    are skipped.
+    """
+    results = {}
+    for scale in scales:
+        data_fetch.DB_PATH = prepare_database(scale, seed)
+        results[f'{scale:g}'] = scale_results = {}
+        for name in queries or data_fetch.QUERY_REGISTRY:
+            fn, build_args = data_fetch.QUERY_REGISTRY[name]
+            frames = {}
+            for typed in (False, True):
+                with uncached(), typed_frames(typed):
+                    frames[typed] = fn(*build_args(department, start_date, end_date))
+            if not all(isinstance(frame, pd.DataFrame) for frame in frames.values()):
+                continue
+            before, after = frame_bytes(frames[False]), frame_bytes(frames[True])
+            scale_results[name] = {
+                'rows': len(frames[True]),
+                'before_bytes': before,
+                'after_bytes': after,
+                'dtypes': {column: str(dtype) for column, dtype in frames[True].dtypes.items()},
+            }
+            print(f"sf={scale:<6g} {name:<24} {before / 1024:11,.1f} KiB -> {after / 1024:11,.1f} KiB  "
+                  f"{before / max(after, 1):5.2f}x  rows {len(frames[True]):>9,}")
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'seed': seed,
+        'department': department,
+        'date_range': [start_date, end_date],
+        'memory': results,
+    }
+
+
+def prepare_search_database(employees=SEARCH_EMPLOYEES, seed=42, bench_dir=BENCH_DIR):
+    """Return the path of a migrated database of generated employees with empty fact tables, building it if missing."""
+    os.makedirs(bench_dir, exist_ok=True)
+    db_path = os.path.join(bench_dir, f'hr_search_{employees}_seed{seed}.db')
+    if not os.path.exists(db_path):
+        print(f"Generating {employees:,} employees at {db_path} ...")
+        departments = scaled_counts(employees / EMPLOYEES_PER_SCALE)['departments']
+        generated = generate_employees(np.random.default_rng(seed), employees, departments)
+        conn = sqlite3.connect(db_path)
+        try:
+            for pragma in BULK_LOAD_PRAGMAS:
+                conn.execute(pragma)
+            create_tables(conn.cursor())
+            conn.executemany('INSERT INTO departments (dept_id, name) VALUES (?, ?)',
+                             enumerate(department_names(departments), start=1))
+            insert_rows(conn.cursor(), 'employees', {
+                'emp_id': generated['emp_id'],
+                'name': generated['name'],
+                'department_id': generated['department_id'],
+                'join_date': DAY_STRINGS[generated['join_day']],
+            })
+            conn.commit()
+            conn.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            conn.close()
+    apply_migrations(db_path)
+    return db_path
+
+
+def search_latency(employees=SEARCH_EMPLOYEES, repeat=5, seed=42, terms=SEARCH_TERMS):
+    """Time employee type-ahead searches end to end (SQL, frame and typing) with the result caches off."""
+    data_fetch.DB_PATH = prepare_search_database(employees, seed)
+    results = {}
+    with uncached():
+        for text in terms:
+            matches = data_fetch.search_employees(text)
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                matches = data_fetch.search_employees(text)
+                timings.append((time.perf_counter() - started) * 1000)
+            p95 = float(np.percentile(timings, 95))
+            results[text] = {
+                'p50_ms': round(float(np.percentile(timings, 50)), 3),
+                'p95_ms': round(p95, 3),
+                'rows': 0 if matches is None else len(matches),
+                'within_budget': p95 <= SEARCH_BUDGET_MS,
+            }
+            print(f"{employees:,} employees  {text!r:<12} p50 {results[text]['p50_ms']:7.2f} ms  "
+                  f"p95 {p95:7.2f} ms  rows {results[text]['rows']:>3}  "
+                  f"{'ok' if results[text]['within_budget'] else f'OVER {SEARCH_BUDGET_MS:g} ms'}")
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'seed': seed,
+        'repeat': repeat,
+        'employees': employees,
+        'budget_ms': SEARCH_BUDGET_MS,
+        'search': results,
+    }
+
+
+def find_regressions(current, baseline, threshold):
+    """Return (scale, query, baseline_ms, current_ms) where p95 grew by more than threshold."""
+    regressions = []
+    for scale, queries in current['results'].items():
+        for name, stats in queries.items():
+            before = baseline.get('results', {}).get(scale, {}).get(name)
+            if before is None:
+                continue
+            limit = before['p95_ms'] * (1 + threshold)
+            if stats['p95_ms'] > limit and stats['p95_ms'] - before['p95_ms'] > MIN_REGRESSION_MS:
+                regressions.append((scale, name, before['p95_ms'], stats['p95_ms']))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every data_fetch query at several data scales.")
+    parser.add_argument('--scales', type=float, nargs='+', default=list(DEFAULT_SCALES))
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per query")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--department', default=DEFAULT_DEPARTMENT)
+    parser.add_argument('--queries', nargs='+', choices=list(data_fetch.QUERY_REGISTRY),
+                        help="Only run these queries")
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write results")
+    parser.add_argument('--baseline', help="Previous results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed p95 slowdown versus the baseline (0.25 = 25%%)")
+    parser.add_argument('--compare-backends', action='store_true',
+                        help="Compare SQLite with DuckDB over Parquet snapshots instead")
+    parser.add_argument('--compare-partitions', action='store_true',
+                        help="Compare the single database file with per-year partitions instead")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="Report each query's frame memory before and after typing instead")
+    parser.add_argument('--search-latency', action='store_true',
+                        help=f"Time employee search against its {SEARCH_BUDGET_MS:g} ms budget instead")
+    parser.add_argument('--employees', type=int, default=SEARCH_EMPLOYEES,
+                        help="Employees in the search latency database")
+    args = parser.parse_args()
+
+    if args.search_latency:
+        report = search_latency(args.employees, args.repeat, args.seed)
+    elif args.memory_report:
+        report = memory_report(args.scales, args.seed, args.department, queries=args.queries)
+    elif args.compare_backends:
+        report = compare_backends(args.scales, args.repeat, args.seed, args.department, queries=args.queries)
+    elif args.compare_partitions:
+        report = compare_partitions(args.scales, args.repeat, args.seed, args.department, queries=args.queries)
+    else:
+        report = run_suite(args.scales, args.repeat, args.seed, args.department, queries=args.queries)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.search_latency:
+        sys.exit(0 if all(stats['within_budget'] for stats in report['search'].values()) else 1)
+    if args.compare_backends or args.compare_partitions:
+        layouts = report['backends' if args.compare_backends else 'partitions']
+        mismatches = [name for queries in layouts.values() for name, stats in queries.items() if not stats['identical']]
+        sys.exit(1 if mismatches else 0)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report, json.load(f), args.threshold)
+        for scale, name, before, after in regressions:
+            print(f"❌ REGRESSION sf={scale} {name}: p95 {before:.2f} ms -> {after:.2f} ms")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions beyond threshold")
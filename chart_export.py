@@ -0,0 +1,100 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Size of exported PNGs, passed to every render instead of mutating Kaleido's global scope
+EXPORT_WIDTH = 700
+EXPORT_HEIGHT = 450
+EXPORT_SCALE = 1
+
+
+def render_png(fig_json, width=EXPORT_WIDTH, height=EXPORT_HEIGHT, scale=EXPORT_SCALE):
+    """Render a figure serialized with fig.to_json() to PNG bytes. Runs in a worker process."""
+    import plotly.io as pio
+
+    fig = pio.from_json(fig_json)
+    return fig.to_image(format="png", width=width, height=height, scale=scale)
+
+
+def figure_key(fig_json, width=EXPORT_WIDTH, height=EXPORT_HEIGHT, scale=EXPORT_SCALE):
+    """Hash identifying one rendered image of a figure."""
+    digest = hashlib.sha256(fig_json.encode('utf-8'))
+    digest.update(f'|{width}x{height}@{scale}'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ChartExporter:
+    """Renders chart images on a process pool and keeps the results in a bounded LRU.
+
+    Images are keyed by figure_key, so identical figures from any session share
+    one render. A key that is already rendering is never submitted twice; the
+    finished PNG lands in the cache from the future's done callback. When the
+    cached images exceed max_bytes the least recently used are dropped.
+    """
+
+    def __init__(self, executor, max_bytes=64 * 1024 * 1024):
+        self._executor = executor
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()  # key -> PNG bytes
+        self._bytes = 0
+        self._futures = {}  # key -> future, while rendering
+        self._errors = {}  # key -> message from the last failed render
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'renders': 0, 'failed': 0, 'evictions': 0}
+
+    def get(self, key):
+        """Return the cached PNG for key, or None."""
+        with self._lock:
+            png = self._images.get(key)
+            if png is None:
+                self._stats['misses'] += 1
+                return None
+            self._images.move_to_end(key)
+            self._stats['hits'] += 1
+            return png
+
+    def submit(self, key, fig_json):
+        """Start rendering fig_json unless it is cached or already rendering."""
+        with self._lock:
+            if key in self._images or key in self._futures:
+                return
+            self._errors.pop(key, None)
+            future = self._executor.submit(render_png, fig_json)
+            self._futures[key] = future
+            self._stats['renders'] += 1
+        future.add_done_callback(lambda done: self._finish(key, done))
+
+    def _finish(self, key, future):
+        try:
+            png = future.result()
+        except Exception as e:
+            print(f"Chart export error: {e}")
+            with self._lock:
+                self._futures.pop(key, None)
+                self._errors[key] = str(e)
+                self._stats['failed'] += 1
+            return
+        with self._lock:
+            self._futures.pop(key, None)
+            if len(png) > self.max_bytes:
+                return
+            self._images[key] = png
+            self._bytes += len(png)
+            while self._bytes > self.max_bytes:
+                _, dropped = self._images.popitem(last=False)
+                self._bytes -= len(dropped)
+                self._stats['evictions'] += 1
+
+    def pending(self, key):
+        with self._lock:
+            return key in self._futures
+
+    def error(self, key):
+        """Message from the last failed render of key, if any."""
+        with self._lock:
+            return self._errors.get(key)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, images=len(self._images), bytes=self._bytes,
+                        rendering=len(self._futures))
@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+
+from db_pool import connect_source
+from disk_cache import database_version
+
+# Tables copied into a snapshot, and the date column whose year partitions the
+# large fact tables (None = one unpartitioned file)
+SNAPSHOT_TABLES = {
+    'departments': None,
+    'employees': None,
+    'projects': None,
+    'performance_reviews': 'review_date',
+    'employee_projects': 'log_date',
+    'dept_monthly_exits': None,
+    'dept_daily_hours': None,
+    'dept_monthly_scores': None,
+}
+
+# Rows read from SQLite per Arrow record batch while exporting
+EXPORT_BATCH_ROWS = 250_000
+
+MANIFEST = 'manifest.json'
+
+
+def snapshot_path(snapshot_dir, db_path):
+    """Directory holding the snapshot of one database file."""
+    return os.path.join(snapshot_dir, Path(db_path).stem)
+
+
+def _arrow_type(declared):
+    declared = (declared or '').upper()
+    if 'INT' in declared:
+        return pa.int64()
+    if 'REAL' in declared or 'FLOA' in declared or 'DOUB' in declared:
+        return pa.float64()
+    return pa.string()
+
+
+def _table_batches(conn, table, partition_column, batch_rows):
+    """Yield (schema, record batches) for one table, adding a year column when partitioned."""
+    # table_xinfo also lists generated columns (hidden 2 or 3), e.g. the date keys
+    columns = [(row[1], _arrow_type(row[2])) for row in conn.execute(f'PRAGMA table_xinfo({table})')
+               if row[6] != 1]
+    fields = [pa.field(name, arrow_type) for name, arrow_type in columns]
+    select = ', '.join(name for name, _ in columns)
+    if partition_column:
+        fields.append(pa.field('year', pa.int32()))
+        select += f', CAST(substr({partition_column}, 1, 4) AS INTEGER) AS year'
+    schema = pa.schema(fields)
+
+    def batches():
+        with closing(conn.execute(f'SELECT {select} FROM {table}')) as cursor:
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows:
+                    break
+                values = list(zip(*rows))
+                yield pa.RecordBatch.from_arrays(
+                    [pa.array(values[i], type=field.type) for i, field in enumerate(schema)], schema=schema
+                )
+
+    return schema, batches()
+
+
+def export_snapshot(db_path, snapshot_dir, batch_rows=EXPORT_BATCH_ROWS, verbose=True):
+    """Export the dashboard tables of db_path to a Parquet snapshot and return its manifest.
+
+    Every table is read inside one read transaction, so the snapshot is
+    consistent. Fact tables are hive-partitioned by year of their date column
+    (table/year=2021/...). The new snapshot is written next to the old one and
+    swapped in at the end; its manifest records the database version it was
+    taken from, so readers can tell when it has gone stale.
+    """
+    import pyarrow.dataset as ds
+
+    target = snapshot_path(snapshot_dir, db_path)
+    staging = f'{target}.tmp-{os.getpid()}'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    manifest = {'db_path': os.path.abspath(db_path), 'created_at': datetime.now().isoformat(timespec='seconds'),
+                'tables': {}}
+    try:
+        # pyarrow pulls the record batches from its own thread
+        with closing(connect_source(db_path, check_same_thread=False)) as conn:
+            version = database_version(db_path)
+            conn.execute('BEGIN')
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for table, partition_column in SNAPSHOT_TABLES.items():
+                if table not in existing:
+                    continue
+                started = time.perf_counter()
+                schema, batches = _table_batches(conn, table, partition_column, batch_rows)
+                rows = 0
+
+                def counted():
+                    nonlocal rows
+                    for batch in batches:
+                        rows += batch.num_rows
+                        yield batch
+
+                ds.write_dataset(
+                    counted(), os.path.join(staging, table), schema=schema, format='parquet',
+                    partitioning=ds.partitioning(pa.schema([schema.field('year')]), flavor='hive')
+                    if partition_column else None,
+                    existing_data_behavior='overwrite_or_ignore',
+                )
+                seconds = time.perf_counter() - started
+                manifest['tables'][table] = {'rows': rows, 'partitioned_by': partition_column and 'year'}
+                if verbose:
+                    print(f"{table:<22} {rows:>12,} rows  {seconds:8.2f}s  {rows / max(seconds, 1e-9):>12,.0f} rows/s")
+            conn.execute('COMMIT')
+        manifest['database_version'] = version
+        with open(os.path.join(staging, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    retired = f'{target}.old-{os.getpid()}'
+    if os.path.exists(target):
+        os.replace(target, retired)
+    os.replace(staging, target)
+    shutil.rmtree(retired, ignore_errors=True)
+    return manifest
+
+
+class ColumnarBackend:
+    """Runs dashboard SQL on DuckDB over a Parquet snapshot of the SQLite database.
+
+    Each snapshot table is exposed as a view over its Parquet files, so DuckDB
+    scans them multi-threaded and pushes filters down into the Parquet
+    statistics and (for partitioned tables) the year directories. Queries run
+    on a per-call cursor, which makes the backend safe to share across threads.
+    """
+
+    def __init__(self, directory, threads=None):
+        try:
+            import duckdb
+        except ImportError:  # optional: only needed when HR_ANALYTICS_BACKEND=duckdb
+            raise ImportError("The columnar backend needs the 'duckdb' package: pip install duckdb") from None
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._manifest = None
+        self._manifest_mtime = None
+        self._conn = duckdb.connect(config={'threads': threads} if threads else {})
+
+    def _load_manifest(self):
+        path = os.path.join(self.directory, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if mtime != self._manifest_mtime:
+                with open(path) as f:
+                    self._manifest = json.load(f)
+                self._manifest_mtime = mtime
+                self._create_views()
+            return self._manifest
+
+    def _create_views(self):
+        for table, info in self._manifest['tables'].items():
+            pattern = Path(self.directory, table).absolute().as_posix() + (
+                '/**/*.parquet' if info['partitioned_by'] else '/*.parquet'
+            )
+            self._conn.execute(
+                f"CREATE OR REPLACE VIEW {table} AS "
+                f"SELECT * FROM read_parquet('{pattern}', hive_partitioning = {bool(info['partitioned_by'])})"
+            )
+
+    def is_current(self, db_path):
+        """True when a snapshot exists and was taken from the database's current version."""
+        manifest = self._load_manifest()
+        if manifest is None:
+            return False
+        current = json.loads(json.dumps(database_version(db_path)))
+        return manifest.get('database_version') == current
+
+    def query(self, query, params=None):
+        """Run a query on the snapshot and return a pandas DataFrame."""
+        with closing(self._conn.cursor()) as cursor:
+            return cursor.execute(query, list(params) if params is not None else None).df()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the SQLite database to a Parquet snapshot for DuckDB.")
+    parser.add_argument('--db', default=os.environ.get('HR_DB_PATH', 'db/hr_analytics.db'))
+    parser.add_argument('--snapshot-dir', default=os.environ.get('HR_SNAPSHOT_DIR', 'snapshots'))
+    parser.add_argument('--batch-rows', type=int, default=EXPORT_BATCH_ROWS)
+    args = parser.parse_args()
+
+    export_snapshot(args.db, args.snapshot_dir, args.batch_rows)
+    print(f"Snapshot written to {snapshot_path(args.snapshot_dir, args.db)}")
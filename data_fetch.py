@@ -1,161 +1,740 @@
-import sqlite3
-import pandas as pd
-import streamlit as st
-from utils import format_date, calculate_tenure, generate_sql_filter
-from contextlib import closing
-
-# Reuse DB connection via @st.cache_resource
-@st.cache_resource
-def get_db_connection():
-    db_path = 'db/hr_analytics.db'
-    conn = sqlite3.connect(db_path, check_same_thread=False)  # Allow multi-threading
-    return conn
-
-# Fetch data with safe parameterized queries
-def fetch_data(query, params=None):
-    # Use context manager to ensure connection is properly closed
-    conn = get_db_connection()  # Use the cached connection
-
-    try:
-        with closing(conn.cursor()) as cursor: # 'with' ensures the cursor is automatically closed after execution
-            data = pd.read_sql_query(query, conn, params=params)
-    except sqlite3.DatabaseError as e:
-        print(f"Database error: {e}")
-        return None
-    except Exception as e:
-        print(f"Error: {e}")
-        return None
-    return data
-
-# Fetch performance trends with window functions for year-over-year performance
-@st.cache_data  
-def get_performance_trends(department_filter, date_range_filter, performance_threshold):
-    query = '''
-    WITH performance_ranks AS (
-        SELECT e.name, p.review_date, p.score,
-               ROW_NUMBER() OVER (PARTITION BY e.emp_id ORDER BY p.review_date) AS performance_rank
-        FROM performance_reviews p
-        JOIN employees e ON p.emp_id = e.emp_id
-        JOIN departments d ON e.department_id = d.dept_id
-        WHERE d.name = ? 
-          AND p.review_date BETWEEN ? AND ? 
-          AND p.score >= ? 
-    )
-    SELECT name, review_date, score, performance_rank
-    FROM performance_ranks
-    ORDER BY name, review_date;
-    '''
-    
-    start_date, end_date = ('2010-01-01', '2025-12-31') if not date_range_filter else date_range_filter
-    params = (department_filter, start_date, end_date, performance_threshold)
-    return fetch_data(query, params=params)
-
-# Fetch department performance (average performance score by department)
-@st.cache_data  
-def get_department_performance(department_filter):
-    query = '''
-    SELECT d.name as department, AVG(p.score) as avg_score
-    FROM performance_reviews p
-    JOIN employees e ON p.emp_id = e.emp_id
-    JOIN departments d ON e.department_id = d.dept_id
-    WHERE d.name = ?
-    GROUP BY d.name;
-    '''
-    return fetch_data(query, params=(department_filter,))
-
-# Fetch attrition rate (monthly exit counts)
-@st.cache_data  
-def get_attrition_rate(department_filter, start_date, end_date):
-    query = '''
-    SELECT strftime('%Y-%m', exit_date) as month, COUNT(*) as exits
-    FROM employees
-    WHERE exit_date IS NOT NULL
-    AND department_id = (SELECT dept_id FROM departments WHERE name = ?)
-    AND exit_date BETWEEN ? AND ?
-    GROUP BY month;
-    '''
-    return fetch_data(query, params=(department_filter, start_date, end_date))
-
-# Fetch department load (headcount & avg daily hours logged) with date range filter
-@st.cache_data  
-def get_department_load(department_filter, start_date, end_date):
-    query = '''
-    WITH active_employees AS (
-        SELECT emp_id
-        FROM employees e
-        JOIN departments d ON e.department_id = d.dept_id
-        WHERE d.name = ? 
-          AND (e.exit_date IS NULL OR e.exit_date > DATE('now'))
-    ),
-    hours_per_day AS (
-        SELECT e.department_id, ep.log_date, AVG(ep.hours_logged) as avg_hours_logged
-        FROM employee_projects ep
-        JOIN employees e ON ep.emp_id = e.emp_id
-        JOIN departments d ON e.department_id = d.dept_id
-        WHERE d.name = ? 
-          AND ep.log_date BETWEEN ? AND ?
-        GROUP BY e.department_id, ep.log_date
-    )
-    SELECT d.name as department,
-           (SELECT COUNT(*) FROM active_employees) as current_headcount,
-           h.log_date,
-           ROUND(h.avg_hours_logged, 2) as avg_hours_logged_per_employee
-    FROM departments d
-    JOIN hours_per_day h ON d.dept_id = h.department_id
-    WHERE d.name = ?
-    ORDER BY h.log_date;
-    '''
-    params = (department_filter, department_filter, start_date, end_date, department_filter)
-    return fetch_data(query, params=params)
-
-# Fetch overlapping projects per employee
-@st.cache_data  
-def get_project_overlap(department_filter):
-    query = '''
-    SELECT e.name, p1.name as project1, p2.name as project2
-    FROM employees e
-    JOIN employee_projects ep1 ON e.emp_id = ep1.emp_id
-    JOIN employee_projects ep2 ON ep1.emp_id = ep2.emp_id
-    JOIN projects p1 ON ep1.project_id = p1.project_id
-    JOIN projects p2 ON ep2.project_id = p2.project_id
-    WHERE p1.start_date < p2.end_date AND p2.start_date < p1.end_date
-      AND p1.project_id != p2.project_id
-    AND e.department_id = (SELECT dept_id FROM departments WHERE name = ?)
-    GROUP BY e.name, project1, project2;
-    '''
-    return fetch_data(query, params=(department_filter,))
-
-
-# Updated query for employee tenure ladder
-@st.cache_data  
-def get_employee_tenure_ladder(department_filter):
-    query = '''
-    SELECT emp_id, name, join_date, exit_date,
-           ROUND(
-               (julianday(COALESCE(exit_date, CURRENT_DATE)) - julianday(join_date)) / 365.0, 2
-           ) AS tenure_years
-    FROM employees
-    WHERE department_id = (SELECT dept_id FROM departments WHERE name = ?)
-      AND join_date IS NOT NULL
-      AND julianday(join_date) <= julianday(CURRENT_DATE);
-    '''
-    tenure_data = fetch_data(query, params=(department_filter,))
-    
-    # Ensure tenure is non-negative (in case of any edge cases with dates)
-    if tenure_data is not None:
-        tenure_data['tenure_years'] = tenure_data['tenure_years'].apply(lambda x: max(0, x))  # Ensuring no negative values
-    return tenure_data
-
-
-# Fetch employee project timelines for Gantt chart visualization
-@st.cache_data  
-def get_employee_project_timelines(department_filter):
-    query = '''
-    SELECT e.name AS employee_name, p.name AS project_name, ep.hours_logged, p.start_date, p.end_date
-    FROM employees e
-    JOIN employee_projects ep ON e.emp_id = ep.emp_id
-    JOIN projects p ON ep.project_id = p.project_id
-    WHERE e.department_id = (SELECT dept_id FROM departments WHERE name = ?)
-    ORDER BY e.name, p.start_date;
-    '''
-    return fetch_data(query, params=(department_filter,))
+import logging
+import os
+import sqlite3
+import time
+import pandas as pd
+import streamlit as st
+from utils import format_date, calculate_tenure, generate_sql_filter
+from contextlib import closing
+from functools import partial
+from db_pool import ConnectionPool
+from query_cache import QueryCache
+from disk_cache import DiskCache, database_version
+from columnar_backend import ColumnarBackend, snapshot_path
+from overlap_engine import OVERLAP_COLUMNS, find_overlaps
+from headcount import build_events_from_days, headcount_on_days, key_day_numbers
+from date_keys import day_key, month_key, today_key
+from instrumentation import get_recorder
+from pagination import ResultStore
+from frame_schema import apply_schema
+from score_stats import PERIODS, score_distribution
+from employee_search import SEARCH_LIMIT, search_patterns, search_text
+from partitioning import PartitionRouter, partition_path
+from migrations import check_schema
+
+logger = logging.getLogger(__name__)
+
+# Database location and pool settings (overridable through the environment)
+DB_PATH = os.environ.get('HR_DB_PATH', 'db/hr_analytics.db')
+POOL_SIZE = int(os.environ.get('HR_DB_POOL_SIZE', 8))
+CACHE_SIZE = int(os.environ.get('HR_DB_CACHE_SIZE', -65536))  # negative = KiB
+MMAP_SIZE = int(os.environ.get('HR_DB_MMAP_SIZE', 268435456))
+TEMP_STORE = os.environ.get('HR_DB_TEMP_STORE', 'MEMORY')
+
+# Result cache settings
+QUERY_CACHE_ENABLED = os.environ.get('HR_QUERY_CACHE', '1') != '0'
+QUERY_CACHE_MAX_BYTES = int(os.environ.get('HR_QUERY_CACHE_MB', 256)) * 1024 * 1024
+QUERY_CACHE_TTL = float(os.environ['HR_QUERY_CACHE_TTL']) if os.environ.get('HR_QUERY_CACHE_TTL') else None
+DISK_CACHE_ENABLED = os.environ.get('HR_DISK_CACHE', '1') != '0'
+DISK_CACHE_DIR = os.environ.get('HR_DISK_CACHE_DIR', '.hr_query_cache')
+DISK_CACHE_MAX_BYTES = int(os.environ.get('HR_DISK_CACHE_MB', 1024)) * 1024 * 1024
+
+# Analytics engine: 'sqlite' (default) or 'duckdb' over a Parquet snapshot
+# written by `python columnar_backend.py`; stale snapshots fall back to SQLite
+ANALYTICS_BACKEND = os.environ.get('HR_ANALYTICS_BACKEND', 'sqlite')
+SNAPSHOT_DIR = os.environ.get('HR_SNAPSHOT_DIR', 'snapshots')
+DUCKDB_THREADS = int(os.environ['HR_DUCKDB_THREADS']) if os.environ.get('HR_DUCKDB_THREADS') else None
+
+# Per-year partition files of the fact tables, written by `python partitioning.py`.
+# With HR_PARTITION_ROUTING=1, queries with a partition plan fan out over them
+# while they are current (stale partitions fall back to the main file)
+PARTITION_ROUTING = os.environ.get('HR_PARTITION_ROUTING', '0') == '1'
+PARTITION_DIR = os.environ.get('HR_PARTITION_DIR', 'partitions')
+PARTITION_WORKERS = int(os.environ.get('HR_PARTITION_WORKERS', 4))
+
+# Results are typed once here (dates, categoricals, small integers) so the charts
+# never re-parse them; HR_TYPED_FRAMES=0 hands out the raw driver types instead
+TYPED_FRAMES = os.environ.get('HR_TYPED_FRAMES', '1') != '0'
+
+# Cached frames are handed out as shallow copies; copy-on-write (always on from
+# pandas 3) stops a caller's change from reaching the cached buffers
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# One read-only connection pool per database file, shared by all sessions. The
+# queries below rely on every schema migration (summary tables, date keys, score
+# histograms, search index), so the schema is checked once before the pool is
+# handed out, and a RuntimeError names the command that brings it up to date
+@st.cache_resource
+def get_db_pool(db_path):
+    pool = ConnectionPool(db_path, max_connections=POOL_SIZE, cache_size=CACHE_SIZE,
+                          mmap_size=MMAP_SIZE, temp_store=TEMP_STORE)
+    try:
+        with pool.connection() as conn:
+            check_schema(conn, db_path)
+    except RuntimeError:
+        pool.close()
+        raise
+    return pool
+
+# Single result cache shared by all sessions, in front of fetch_data
+@st.cache_resource
+def get_query_cache():
+    return QueryCache(max_bytes=QUERY_CACHE_MAX_BYTES, ttl=QUERY_CACHE_TTL)
+
+# Second cache tier on local disk, shared by every process (replica) on the host
+@st.cache_resource
+def get_disk_cache():
+    return DiskCache(DISK_CACHE_DIR, max_bytes=DISK_CACHE_MAX_BYTES)
+
+# DuckDB over the Parquet snapshot of a database file, shared by all sessions
+@st.cache_resource
+def get_columnar_backend(db_path):
+    return ColumnarBackend(snapshot_path(SNAPSHOT_DIR, db_path), threads=DUCKDB_THREADS)
+
+# Router over the per-year partition files of a database file, shared by all sessions
+@st.cache_resource
+def get_partition_router(db_path):
+    return PartitionRouter(partition_path(PARTITION_DIR, db_path), max_workers=PARTITION_WORKERS,
+                           mmap_size=MMAP_SIZE)
+
+# In-memory tables for paging computed results such as overlaps, shared by all sessions
+@st.cache_resource
+def get_result_store():
+    return ResultStore()
+
+# Callbacks notified after every query as fn(query, params, seconds, rows)
+_query_listeners = []
+
+def add_query_listener(listener):
+    _query_listeners.append(listener)
+
+def remove_query_listener(listener):
+    if listener in _query_listeners:
+        _query_listeners.remove(listener)
+
+# Fetch data with safe parameterized queries. Results go through the shared
+# QueryCache, then the on-disk cache; `postprocess` derives a value from the
+# frame (e.g. the overlap sweep) and is cached alongside it, keyed by the
+# function's name. `columnar_query` is the DuckDB spelling of the query, for the
+# few that use SQLite-only functions. `partitions` is a PartitionRouter plan for
+# queries over the fact tables; it must produce the same frame as `query`.
+def fetch_data(query, params=None, postprocess=None, columnar_query=None, partitions=None):
+    cache = get_query_cache() if QUERY_CACHE_ENABLED else None
+    disk_cache = get_disk_cache() if QUERY_CACHE_ENABLED and DISK_CACHE_ENABLED else None
+    variant = postprocess.__qualname__ if postprocess else None
+    key = QueryCache.make_key(DB_PATH, query, params, variant)
+    recorder = get_recorder()
+    started = time.perf_counter()
+    # Versions seen before the query runs; a result that raced a write isn't cached under the new one
+    version = cache.version(DB_PATH) if cache is not None else None
+    disk_version = database_version(DB_PATH) if disk_cache is not None else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            recorder.record_query(query, params, time.perf_counter() - started, cached, 'memory',
+                                  nbytes=cache.size(key))
+            return cached
+    if disk_cache is not None:
+        cached = disk_cache.get(key)
+        if cached is not None:
+            # Entries written before frames were typed are upgraded on the way in
+            cached = apply_schema(cached) if TYPED_FRAMES else cached
+            cached = cache.put(key, cached, version) if cache is not None else cached
+            recorder.record_query(query, params, time.perf_counter() - started, cached, 'disk',
+                                  nbytes=cache.size(key) if cache is not None else None)
+            return cached
+
+    query_started = time.perf_counter()
+    backend = 'sqlite'
+    try:
+        columnar = get_columnar_backend(DB_PATH) if ANALYTICS_BACKEND == 'duckdb' else None
+        router = get_partition_router(DB_PATH) if partitions is not None and PARTITION_ROUTING else None
+        if columnar is not None and columnar.is_current(DB_PATH):
+            query = columnar_query or query
+            backend = 'duckdb'
+            data = columnar.query(query, params)
+        elif router is not None and router.is_current(DB_PATH):
+            backend = 'partitions'
+            data = router.query(DB_PATH, partitions)
+        else:
+            # Check out a pooled connection so concurrent sessions don't share cursors
+            with get_db_pool(DB_PATH).connection() as conn:
+                with closing(conn.cursor()) as cursor: # 'with' ensures the cursor is automatically closed after execution
+                    data = pd.read_sql_query(query, conn, params=params)
+    except (sqlite3.DatabaseError, pd.errors.DatabaseError) as e:
+        logger.error("Database error on %s backend: %s", backend, e)
+        recorder.record_query(query, params, time.perf_counter() - started, None, 'miss', error=str(e),
+                              backend=backend)
+        return None
+    except Exception as e:
+        logger.exception("Query failed on %s backend", backend)
+        recorder.record_query(query, params, time.perf_counter() - started, None, 'miss',
+                              error=f"{type(e).__name__}: {e}", backend=backend)
+        return None
+
+    elapsed = time.perf_counter() - query_started
+    for listener in list(_query_listeners):
+        listener(query, params, elapsed, len(data))
+
+    rows = len(data)
+    if TYPED_FRAMES:
+        data = apply_schema(data)
+    if postprocess is not None:
+        data = postprocess(data)
+        data = apply_schema(data) if TYPED_FRAMES else data
+    if disk_cache is not None:
+        disk_cache.put(key, data, disk_version)
+    result = cache.put(key, data, version) if cache is not None else data
+    recorder.record_query(query, params, time.perf_counter() - started, result, 'miss',
+                          nbytes=cache.size(key) if cache is not None else None, backend=backend,
+                          query_ms=round(elapsed * 1000, 3), source_rows=rows)
+    return result
+
+# Yield a query's result as DataFrame chunks read from the cursor with fetchmany,
+# bypassing the result caches so large exports never materialize in memory.
+# The pooled connection is held until the generator is exhausted or closed.
+def stream_query(query, params=None, chunk_rows=10_000):
+    with get_db_pool(DB_PATH).connection() as conn:
+        yield from pd.read_sql_query(query, conn, params=params, chunksize=chunk_rows)
+
+# Return SQLite's EXPLAIN QUERY PLAN detail lines for a query
+def explain_query_plan(query, params=None):
+    with get_db_pool(DB_PATH).connection() as conn:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {query.strip().rstrip(';')}", params or ()).fetchall()
+    return [row[-1] for row in rows]
+
+# Department names for the selectors, read from the departments table
+def get_department_names():
+    departments = fetch_data('SELECT name FROM departments WHERE name IS NOT NULL ORDER BY name;')
+    return [] if departments is None else departments['name'].tolist()
+
+# Fetch performance trends with window functions for year-over-year performance
+def get_performance_trends(department_filter, date_range_filter, performance_threshold):
+    query = '''
+    WITH performance_ranks AS (
+        SELECT e.name, p.review_date, p.score,
+               ROW_NUMBER() OVER (PARTITION BY e.emp_id ORDER BY p.review_day, p.score, p.reviewer_id) AS performance_rank
+        FROM performance_reviews p
+        JOIN employees e ON p.emp_id = e.emp_id
+        JOIN departments d ON e.department_id = d.dept_id
+        WHERE d.name = ? 
+          AND p.review_day BETWEEN ? AND ?
+          AND p.score >= ? 
+    )
+    SELECT name, review_date, score, performance_rank
+    FROM performance_ranks
+    ORDER BY name, review_date, score, performance_rank;
+    '''
+    
+    start_date, end_date = ('2010-01-01', '2025-12-31') if not date_range_filter else date_range_filter
+    params = (department_filter, day_key(start_date), day_key(end_date), performance_threshold)
+    # On partitions each year returns its reviews and the ranks are numbered after merging
+    partition_query = '''
+    SELECT e.emp_id, e.name, p.review_date, p.review_day, p.score, p.reviewer_id
+    FROM performance_reviews p
+    JOIN employees e ON p.emp_id = e.emp_id
+    JOIN departments d ON e.department_id = d.dept_id
+    WHERE d.name = ?
+      AND p.review_day BETWEEN ? AND ?
+      AND p.score >= ?;
+    '''
+    partitions = {'table': 'performance_reviews', 'start_date': start_date, 'end_date': end_date,
+                  'department': department_filter, 'query': partition_query, 'params': params,
+                  'merge': rank_reviews}
+    return fetch_data(query, params=params, partitions=partitions)
+
+# Merge per-partition reviews into the performance trends frame: ROW_NUMBER over
+# each employee's reviews, then the query's ORDER BY
+def rank_reviews(frames):
+    reviews = pd.concat(frames, ignore_index=True)
+    if reviews.empty:
+        # Same all-object columns as an empty result from SQLite
+        return pd.DataFrame({column: pd.Series(dtype=object)
+                             for column in ['name', 'review_date', 'score', 'performance_rank']})
+    reviews = reviews.sort_values(['emp_id', 'review_day', 'score', 'reviewer_id'], kind='mergesort')
+    reviews['performance_rank'] = reviews.groupby('emp_id', sort=False).cumcount() + 1
+    reviews = reviews.sort_values(['name', 'review_date', 'score', 'performance_rank'], kind='mergesort',
+                                  ignore_index=True)
+    return reviews[['name', 'review_date', 'score', 'performance_rank']]
+
+# Fetch department performance (average performance score by department)
+def get_department_performance(department_filter, start_date=None, end_date=None, period='year'):
+    return get_score_distribution(department_filter, start_date, end_date, period)
+
+# Score distribution (count, mean, quartiles, whiskers) per department and period,
+# merged from the dept_monthly_scores histogram instead of reading every review;
+# all departments when department_filter is None
+def get_score_distribution(department_filter=None, start_date=None, end_date=None, period='year'):
+    sqlite_period, duckdb_period = PERIODS[period]
+    query = '''
+    SELECT d.name AS department, {period} AS period, s.score, SUM(s.reviews) AS reviews
+    FROM dept_monthly_scores s
+    JOIN departments d ON s.department_id = d.dept_id
+    WHERE s.month_key BETWEEN ? AND ?
+      AND s.reviews > 0
+      {department}
+    GROUP BY 1, 2, 3
+    ORDER BY d.name, period, s.score;
+    '''
+    params = (month_key(start_date or '1900-01-01'), month_key(end_date or '2999-12-31'))
+    department = ''
+    if department_filter is not None:
+        department, params = 'AND d.name = ?', params + (department_filter,)
+    return fetch_data(query.format(period=sqlite_period, department=department), params=params,
+                      postprocess=score_distribution,
+                      columnar_query=query.format(period=duckdb_period, department=department))
+
+# Fetch attrition rate (monthly exit counts) from the dept_monthly_exits summary;
+# the date range is applied at month granularity, on YYYYMM month keys
+def get_attrition_rate(department_filter, start_date, end_date):
+    query = '''
+    SELECT month, exits
+    FROM dept_monthly_exits
+    WHERE department_id = (SELECT dept_id FROM departments WHERE name = ?)
+      AND month_key BETWEEN ? AND ?
+      AND exits > 0
+    ORDER BY month_key;
+    '''
+    return fetch_data(query, params=(department_filter, month_key(start_date), month_key(end_date)))
+
+# Sorted join/exit events from an employees frame of day keys
+def employee_events(employees):
+    return build_events_from_days(key_day_numbers(employees['join_day']), key_day_numbers(employees['exit_day']))
+
+# Fetch join/exit events for a department, sorted once and cached per department
+def get_headcount_events(department_filter):
+    query = '''
+    SELECT join_day, exit_day
+    FROM employees
+    WHERE department_id = (SELECT dept_id FROM departments WHERE name = ?)
+      AND join_day IS NOT NULL;
+    '''
+    return fetch_data(query, params=(department_filter,), postprocess=employee_events)
+
+# Fetch department load (headcount & avg daily hours logged) with date range filter;
+# daily hours come from the dept_daily_hours summary (sum / count per day) and the
+# headcount active on each day from a sweep over join/exit events
+def get_department_load(department_filter, start_date, end_date):
+    query = '''
+    SELECT d.name as department,
+           h.log_date,
+           ROUND(h.hours_sum * 1.0 / h.log_count, 2) as avg_hours_logged_per_employee,
+           h.log_day
+    FROM departments d
+    JOIN dept_daily_hours h ON d.dept_id = h.department_id
+    WHERE d.name = ?
+      AND h.log_day BETWEEN ? AND ?
+      AND h.log_count > 0
+    ORDER BY h.log_day;
+    '''
+    load = fetch_data(query, params=(department_filter, day_key(start_date), day_key(end_date)))
+    events = get_headcount_events(department_filter)
+    if load is None or events is None:
+        return load
+    load.insert(1, 'headcount', headcount_on_days(events, *key_day_numbers(load.pop('log_day'))))
+    return load
+
+# Fetch overlapping projects per employee (None = whole company)
+def get_project_overlap(department_filter):
+    department_clause = ''
+    params = None
+    if department_filter is not None:
+        department_clause = "WHERE e.department_id = (SELECT dept_id FROM departments WHERE name = ?)"
+        params = (department_filter,)
+
+    # Collapse daily logs to one row per (employee, project) before any pairing
+    query = f'''
+    WITH assignments AS (
+        SELECT DISTINCT ep.emp_id, ep.project_id
+        FROM employee_projects ep
+        JOIN employees e ON ep.emp_id = e.emp_id
+        {department_clause}
+    )
+    SELECT e.emp_id, e.name, p.project_id, p.name AS project_name, p.start_day, p.end_day
+    FROM assignments a
+    JOIN employees e ON a.emp_id = e.emp_id
+    JOIN projects p ON a.project_id = p.project_id;
+    '''
+
+    return fetch_data(query, params=params, postprocess=find_overlaps)
+
+
+# Sorts offered by the paged overlap table; (name, project1, project2) is unique
+OVERLAP_SORTS = {
+    'Employee': ('name', 'project1', 'project2'),
+    'Project': ('project1', 'name', 'project2'),
+    'Overlap days': ('overlap_days', 'name', 'project1', 'project2'),
+}
+
+# Paged source over a department's overlaps, loaded into the in-memory result
+# store once per department and database version. Pages read the store directly,
+# not through the result cache, so they aren't worth prefetching.
+def project_overlap_source(department_filter, overlaps):
+    store = get_result_store()
+    key = (DB_PATH, department_filter, database_version(DB_PATH))
+    table = store.load(key, overlaps, OVERLAP_SORTS)
+    return {
+        'sql': f"SELECT {', '.join(OVERLAP_COLUMNS)} FROM {table}", 'params': None, 'sorts': OVERLAP_SORTS,
+        'run': partial(store.query, reload=(key, overlaps, OVERLAP_SORTS)), 'columns': list(OVERLAP_COLUMNS),
+        'cached': False,
+    }
+
+
+# Updated query for employee tenure ladder; tenure is computed from integer day
+# keys, with today's key passed in so the result changes (and re-caches) daily
+def get_employee_tenure_ladder(department_filter):
+    query = '''
+    SELECT emp_id, name, join_date, exit_date,
+           -- Clamp at zero in case of any edge cases with dates
+           MAX(0, ROUND((COALESCE(exit_day, ?) - join_day) / 365.0, 2)) AS tenure_years
+    FROM employees
+    WHERE department_id = (SELECT dept_id FROM departments WHERE name = ?)
+      AND join_day <= ?
+    ORDER BY emp_id;
+    '''
+    # DuckDB spells the scalar MAX as GREATEST
+    columnar_query = '''
+    SELECT emp_id, name, join_date, exit_date,
+           GREATEST(0, ROUND((COALESCE(exit_day, ?) - join_day) / 365.0, 2)) AS tenure_years
+    FROM employees
+    WHERE department_id = (SELECT dept_id FROM departments WHERE name = ?)
+      AND join_day <= ?
+    ORDER BY emp_id;
+    '''
+    today = today_key()
+    return fetch_data(query, params=(today, department_filter, today), columnar_query=columnar_query)
+
+
+# --- All-department comparison ---
+# One grouped query per metric covers every department at once; departments
+# are joined by id after grouping, so no per-department name lookups
+
+# Average score per department from summed scores and review counts; rounded
+# here so SQLite, DuckDB and merged partitions agree on ties
+def average_score(department_scores):
+    scores = department_scores.pop('score_sum') / department_scores.pop('scored')
+    department_scores.insert(1, 'avg_score', scores.round(2))
+    return department_scores
+
+# Per-partition score sums and counts added up by department
+def sum_by_department(frames):
+    scores = pd.concat(frames, ignore_index=True)
+    return scores.groupby('department', sort=True, as_index=False)[['score_sum', 'scored', 'reviews']].sum()
+
+# Average score and review count per department within a date range
+def get_all_departments_performance(start_date, end_date):
+    query = '''
+    SELECT d.name AS department, SUM(p.score) AS score_sum, COUNT(p.score) AS scored, COUNT(*) AS reviews
+    FROM performance_reviews p
+    JOIN employees e ON p.emp_id = e.emp_id
+    JOIN departments d ON e.department_id = d.dept_id
+    WHERE p.review_day BETWEEN ? AND ?
+    GROUP BY d.dept_id, d.name
+    ORDER BY d.name;
+    '''
+    params = (day_key(start_date), day_key(end_date))
+    partitions = {'table': 'performance_reviews', 'start_date': start_date, 'end_date': end_date,
+                  'query': query, 'params': params, 'merge': sum_by_department}
+    return fetch_data(query, params=params, postprocess=average_score, partitions=partitions)
+
+# Current headcount and average tenure per department
+def get_all_departments_headcount():
+    query = '''
+    SELECT d.name AS department,
+           COUNT(CASE WHEN e.exit_day IS NULL OR e.exit_day > ? THEN 1 END) AS headcount,
+           ROUND(AVG((COALESCE(e.exit_day, ?) - e.join_day) / 365.0), 2) AS avg_tenure_years
+    FROM employees e
+    JOIN departments d ON e.department_id = d.dept_id
+    WHERE e.join_day <= ?
+    GROUP BY d.dept_id, d.name
+    ORDER BY d.name;
+    '''
+    today = today_key()
+    return fetch_data(query, params=(today, today, today))
+
+# Monthly exits per department from the dept_monthly_exits summary
+def get_all_departments_attrition(start_date, end_date):
+    query = '''
+    SELECT d.name AS department, x.month, x.exits
+    FROM dept_monthly_exits x
+    JOIN departments d ON x.department_id = d.dept_id
+    WHERE x.month_key BETWEEN ? AND ?
+      AND x.exits > 0
+    ORDER BY d.name, x.month_key;
+    '''
+    return fetch_data(query, params=(month_key(start_date), month_key(end_date)))
+
+# Average hours per log from summed hours and log counts; rounded here rather
+# than in SQL so SQLite and DuckDB agree on ties
+def average_hours(monthly_hours):
+    hours = monthly_hours.pop('hours_sum')
+    monthly_hours['avg_hours_logged'] = (hours / monthly_hours.pop('log_count')).round(2)
+    return monthly_hours
+
+# Average hours logged per log, by department and month, from the dept_daily_hours
+# summary. Its primary key is (department_id, log_date), so a range on the date
+# text is a covering seek and the day key needn't be computed for every row.
+def get_all_departments_load(start_date, end_date):
+    query = '''
+    SELECT d.name AS department, substr(h.log_date, 1, 7) AS month,
+           SUM(h.hours_sum) AS hours_sum, SUM(h.log_count) AS log_count
+    FROM dept_daily_hours h
+    JOIN departments d ON h.department_id = d.dept_id
+    WHERE h.log_date BETWEEN ? AND ?
+      AND h.log_count > 0
+    GROUP BY h.department_id, d.name, month
+    ORDER BY d.name, month;
+    '''
+    return fetch_data(query, params=(start_date, end_date), postprocess=average_hours)
+
+# Every department's metrics for the comparison view: a per-department summary
+# (score, headcount, tenure) and long-format monthly exits and hours for heatmaps
+def get_department_comparison(start_date, end_date):
+    performance = get_all_departments_performance(start_date, end_date)
+    headcount = get_all_departments_headcount()
+    summary = None
+    if performance is not None and headcount is not None:
+        summary = headcount.merge(performance, on='department', how='outer').sort_values('department',
+                                                                                         ignore_index=True)
+    return {
+        'summary': summary,
+        'attrition': get_all_departments_attrition(start_date, end_date),
+        'load': get_all_departments_load(start_date, end_date),
+    }
+
+
+# Employee project timelines query and params, for one department or (None) the whole company
+def project_timelines_query(department_filter):
+    department_clause = ''
+    params = None
+    if department_filter is not None:
+        department_clause = "WHERE e.department_id = (SELECT dept_id FROM departments WHERE name = ?)"
+        params = (department_filter,)
+    query = f'''
+    SELECT e.name AS employee_name, p.name AS project_name, ep.hours_logged, p.start_date, p.end_date
+    FROM employees e
+    JOIN employee_projects ep ON e.emp_id = ep.emp_id
+    JOIN projects p ON ep.project_id = p.project_id
+    {department_clause}
+    ORDER BY e.name, p.start_date, p.name, ep.hours_logged, p.end_date;
+    '''
+    return query, params
+
+# Fetch employee project timelines for Gantt chart visualization
+def get_employee_project_timelines(department_filter):
+    query, params = project_timelines_query(department_filter)
+    return fetch_data(query, params=params)
+
+# Sorts offered by the paged timelines table: key columns, unique tiebreaker last.
+# Employee order is served by idx_employees_dept_name and the time logs' natural
+# key, so pages come straight off the indexes in either direction without a sort.
+TIMELINE_SORTS = {
+    'Employee': ('employee_name', 'emp_id', 'project_id', 'log_date'),
+}
+
+# Paged source over every time log of a department (None = whole company), one row per log
+def project_timelines_source(department_filter):
+    department_clause = ''
+    params = None
+    if department_filter is not None:
+        department_clause = "WHERE e.department_id = (SELECT dept_id FROM departments WHERE name = ?)"
+        params = (department_filter,)
+    query = f'''
+    SELECT e.name AS employee_name, p.name AS project_name, ep.hours_logged, ep.log_date,
+           p.start_date, p.end_date, e.emp_id, ep.project_id
+    FROM employees e
+    JOIN employee_projects ep ON e.emp_id = ep.emp_id
+    JOIN projects p ON ep.project_id = p.project_id
+    {department_clause}
+    '''
+    return {
+        'sql': query, 'params': params, 'sorts': TIMELINE_SORTS, 'run': fetch_data,
+        'columns': ['employee_name', 'project_name', 'hours_logged', 'log_date', 'start_date', 'end_date'],
+        'cached': True,
+    }
+
+# Stream the project timelines for export, chunk by chunk from the cursor
+def stream_project_timelines(department_filter, chunk_rows=10_000):
+    query, params = project_timelines_query(department_filter)
+    return stream_query(query, params=params, chunk_rows=chunk_rows)
+
+
+# --- Employee search and profile ---
+# Search resolves names to emp_ids through the name indexes; every profile read
+# after that is a seek on an emp_id-leading key
+
+# Type-ahead search: names starting with the text first, from the NOCASE name
+# index, then names containing it, from the trigram index (text of three or more
+# characters only). Each side stops at `limit` matches, so the cost doesn't grow
+# with the number of employees; the results are ordered by name within each side.
+def search_employees(text, limit=SEARCH_LIMIT):
+    text = search_text(text)
+    if not text:
+        return None
+    prefix, contains = search_patterns(text)
+    query = '''
+    WITH prefix AS (
+        SELECT emp_id, 0 AS tier
+        FROM employees
+        WHERE name LIKE ?
+        ORDER BY name COLLATE NOCASE, emp_id
+        LIMIT ?
+    ){infix}
+    SELECT e.emp_id, e.name, d.name AS department, e.join_date, e.exit_date
+    FROM (SELECT emp_id, tier FROM prefix{union}) AS m
+    JOIN employees e ON e.emp_id = m.emp_id
+    LEFT JOIN departments d ON e.department_id = d.dept_id
+    ORDER BY m.tier, e.name COLLATE NOCASE, e.emp_id
+    LIMIT ?;
+    '''
+    infix = '''
+    , infix AS (
+        SELECT rowid AS emp_id, 1 AS tier
+        FROM employee_search
+        WHERE name LIKE ? AND rowid NOT IN (SELECT emp_id FROM prefix)
+        ORDER BY rowid
+        LIMIT ?
+    )'''
+    # DuckDB has no trigram index or NOCASE collation: ILIKE scans the snapshot's names
+    columnar_query = '''
+    WITH prefix AS (
+        SELECT emp_id, 0 AS tier
+        FROM employees
+        WHERE name ILIKE ?
+        ORDER BY lower(name), emp_id
+        LIMIT ?
+    ){infix}
+    SELECT e.emp_id, e.name, d.name AS department, e.join_date, e.exit_date
+    FROM (SELECT emp_id, tier FROM prefix{union}) AS m
+    JOIN employees e ON e.emp_id = m.emp_id
+    LEFT JOIN departments d ON e.department_id = d.dept_id
+    ORDER BY m.tier, lower(e.name), e.emp_id
+    LIMIT ?;
+    '''
+    columnar_infix = '''
+    , infix AS (
+        SELECT emp_id, 1 AS tier
+        FROM employees
+        WHERE name ILIKE ? AND emp_id NOT IN (SELECT emp_id FROM prefix)
+        ORDER BY emp_id
+        LIMIT ?
+    )'''
+    params = (prefix, limit)
+    union = ''
+    if contains is None:
+        infix = columnar_infix = ''
+    else:
+        params, union = params + (contains, limit), ' UNION ALL SELECT emp_id, tier FROM infix'
+    return fetch_data(query.format(infix=infix, union=union), params=params + (limit,),
+                      columnar_query=columnar_query.format(infix=columnar_infix, union=union))
+
+# One employee's details and tenure, by primary key
+def get_employee(emp_id):
+    query = '''
+    SELECT e.emp_id, e.name, e.age, e.gender, d.name AS department, e.join_date, e.exit_date,
+           MAX(0, ROUND((COALESCE(e.exit_day, ?) - e.join_day) / 365.0, 2)) AS tenure_years
+    FROM employees e
+    LEFT JOIN departments d ON e.department_id = d.dept_id
+    WHERE e.emp_id = ?;
+    '''
+    columnar_query = query.replace('MAX(0,', 'GREATEST(0,')
+    return fetch_data(query, params=(today_key(), emp_id), columnar_query=columnar_query)
+
+# One employee's reviews in date order, read from the (emp_id, review_date,
+# reviewer_id) natural key
+def get_employee_reviews(emp_id):
+    query = '''
+    SELECT p.review_date, p.score, p.reviewer_id, r.name AS reviewer
+    FROM performance_reviews p
+    LEFT JOIN employees r ON p.reviewer_id = r.emp_id
+    WHERE p.emp_id = ?
+    ORDER BY p.review_date, p.reviewer_id;
+    '''
+    return fetch_data(query, params=(emp_id,))
+
+# Hours, log count and first/last log per project for one employee, grouped in
+# the order of the (emp_id, project_id, log_date) natural key; the cast keeps
+# DuckDB's HUGEINT sum from arriving as a float
+def get_employee_projects(emp_id):
+    query = '''
+    SELECT p.name AS project_name, MIN(ep.log_date) AS first_log, MAX(ep.log_date) AS last_log,
+           COUNT(*) AS logs, CAST(SUM(ep.hours_logged) AS BIGINT) AS hours_logged, ep.project_id
+    FROM employee_projects ep
+    JOIN projects p ON ep.project_id = p.project_id
+    WHERE ep.emp_id = ?
+    GROUP BY ep.project_id, p.name
+    ORDER BY first_log, ep.project_id;
+    '''
+    return fetch_data(query, params=(emp_id,))
+
+# Everything the profile drill-down shows for one employee
+def get_employee_profile(emp_id):
+    return {
+        'employee': get_employee(emp_id),
+        'reviews': get_employee_reviews(emp_id),
+        'projects': get_employee_projects(emp_id),
+    }
+
+# Sorts offered by the paged time logs of one employee; (project_id, log_date) is
+# unique per employee, and both orders are seeks on an emp_id-leading index
+EMPLOYEE_LOG_SORTS = {
+    'Date': ('log_date', 'project_id'),
+    'Project': ('project_id', 'log_date'),
+}
+
+# Paged source over one employee's time logs
+def employee_logs_source(emp_id):
+    query = '''
+    SELECT ep.log_date, p.name AS project_name, ep.hours_logged, ep.project_id
+    FROM employee_projects ep
+    JOIN projects p ON ep.project_id = p.project_id
+    WHERE ep.emp_id = ?
+    '''
+    return {
+        'sql': query, 'params': (emp_id,), 'sorts': EMPLOYEE_LOG_SORTS, 'run': fetch_data,
+        'columns': ['log_date', 'project_name', 'hours_logged'], 'cached': True,
+    }
+
+
+# Lowest-id employee of a department with both reviews and time logs, found by
+# seeks on the department index and the emp_id-leading fact indexes; the
+# registry's profile and search queries use them so they return rows at any scale
+def get_sample_employee(department_filter):
+    query = '''
+    SELECT e.emp_id, e.name
+    FROM employees e
+    WHERE e.department_id = (SELECT dept_id FROM departments WHERE name = ?)
+      AND EXISTS (SELECT 1 FROM performance_reviews p WHERE p.emp_id = e.emp_id)
+      AND EXISTS (SELECT 1 FROM employee_projects ep WHERE ep.emp_id = e.emp_id)
+    ORDER BY e.emp_id
+    LIMIT 1;
+    '''
+    sample = fetch_data(query, params=(department_filter,))
+    if sample is None or sample.empty:
+        raise LookupError(f"No employee in {department_filter} has both reviews and time logs")
+    return int(sample['emp_id'].iloc[0]), str(sample['name'].iloc[0])
+
+
+# Dashboard queries behind a uniform (department, start_date, end_date) signature,
+# used by the benchmark suite and the index advisor
+QUERY_REGISTRY = {
+    'performance_trends': (get_performance_trends, lambda dept, start, end: (dept, (start, end), 0)),
+    'department_performance': (get_department_performance, lambda dept, start, end: (dept, start, end)),
+    'attrition': (get_attrition_rate, lambda dept, start, end: (dept, start, end)),
+    'department_load': (get_department_load, lambda dept, start, end: (dept, start, end)),
+    'project_overlap': (get_project_overlap, lambda dept, start, end: (dept,)),
+    'tenure_ladder': (get_employee_tenure_ladder, lambda dept, start, end: (dept,)),
+    'project_timelines': (get_employee_project_timelines, lambda dept, start, end: (dept,)),
+    'all_departments_performance': (get_all_departments_performance, lambda dept, start, end: (start, end)),
+    'all_departments_headcount': (get_all_departments_headcount, lambda dept, start, end: ()),
+    'all_departments_attrition': (get_all_departments_attrition, lambda dept, start, end: (start, end)),
+    'all_departments_load': (get_all_departments_load, lambda dept, start, end: (start, end)),
+    'all_departments_scores': (get_score_distribution, lambda dept, start, end: (None, start, end)),
+    # Profile reads are for the department's sample employee, and the search is for
+    # the first four letters of their name (a prefix match, long enough for the trigram side)
+    'employee_search': (search_employees, lambda dept, start, end: (get_sample_employee(dept)[1][:4],)),
+    'employee': (get_employee, lambda dept, start, end: (get_sample_employee(dept)[0],)),
+    'employee_reviews': (get_employee_reviews, lambda dept, start, end: (get_sample_employee(dept)[0],)),
+    'employee_projects': (get_employee_projects, lambda dept, start, end: (get_sample_employee(dept)[0],)),
+}
@@ -0,0 +1,280 @@
+import argparse
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from database_setup import create_tables
+
+# Rows generated per unit of scale factor (scale 1.0 ~ 1k employees and 78k
+# project logs, scale 100 ~ 100k employees and 7.6M project logs)
+EMPLOYEES_PER_SCALE = 1_000
+PROJECTS_PER_SCALE = 20
+DEPARTMENTS_PER_SCALE = 2
+REVIEWS_PER_EMPLOYEE = 2
+# Mean logs drawn per employee. About 78 survive: employees whose tenure
+# overlaps no project log nothing, and logs are capped by the days an
+# assignment spans and deduplicated per day
+LOGS_PER_EMPLOYEE = 100
+MAX_PROJECTS_PER_EMPLOYEE = 4
+
+BASE_DEPARTMENTS = ['HR', 'Engineering', 'Sales', 'Marketing', 'Finance']
+FIRST_NAMES = ['Alice', 'Bob', 'Charlie', 'David', 'Eve', 'Frank', 'Grace', 'Helen', 'Ivy', 'Jack',
+               'Karen', 'Liam', 'Mason', 'Nina', 'Oscar', 'Paul', 'Quincy', 'Rachel', 'Sam', 'Tom',
+               'Uma', 'Vera', 'Will', 'Xander', 'Yara', 'Zane']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Lopez',
+              'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Martin', 'Lee', 'Perez', 'White',
+              'Harris', 'Clark', 'Lewis', 'Walker', 'Young', 'King', 'Wright', 'Scott', 'Green',
+              'Baker', 'Adams', 'Nelson', 'Hill', 'Campbell', 'Mitchell', 'Roberts', 'Carter']
+
+# Calendar window for generated dates
+FIRST_DAY = np.datetime64('2010-01-01')
+LAST_DAY = np.datetime64('2024-12-31')
+SPAN_DAYS = int((LAST_DAY - FIRST_DAY).astype(int)) + 1
+
+# Day offset -> 'YYYY-MM-DD', so dates are formatted once instead of once per row
+DAY_STRINGS = np.array(
+    np.datetime_as_string(FIRST_DAY + np.arange(SPAN_DAYS), unit='D').tolist(), dtype=object
+)
+
+# SQLite settings for a one-shot bulk load into a fresh file
+BULK_LOAD_PRAGMAS = (
+    'PRAGMA journal_mode = OFF',
+    'PRAGMA synchronous = OFF',
+    'PRAGMA locking_mode = EXCLUSIVE',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -262144',
+)
+
+
+def scaled_counts(scale):
+    """Return the number of departments, employees and projects for a scale factor."""
+    return {
+        'departments': max(len(BASE_DEPARTMENTS), round(DEPARTMENTS_PER_SCALE * scale)),
+        'employees': max(1, round(EMPLOYEES_PER_SCALE * scale)),
+        'projects': max(10, round(PROJECTS_PER_SCALE * scale)),
+    }
+
+
+def department_names(count):
+    """Return the five standard departments followed by numbered ones."""
+    extra = [f'Department {i:03d}' for i in range(len(BASE_DEPARTMENTS) + 1, count + 1)]
+    return BASE_DEPARTMENTS[:count] + extra
+
+
+def generate_employees(rng, num_employees, num_departments):
+    """Return employee columns as arrays, with exit days always after join days."""
+    first = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), num_employees)]
+    last = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), num_employees)]
+    join_day = rng.integers(0, SPAN_DAYS - 30, num_employees)
+    has_exit = rng.random(num_employees) < 0.35
+    exit_day = join_day + 30 + (rng.random(num_employees) * (SPAN_DAYS - 30 - join_day)).astype(np.int64)
+    return {
+        'emp_id': np.arange(1, num_employees + 1),
+        'name': first + ' ' + last,
+        'age': rng.integers(22, 56, num_employees),
+        'gender': np.array(['M', 'F'], dtype=object)[rng.integers(0, 2, num_employees)],
+        'department_id': rng.integers(1, num_departments + 1, num_employees),
+        'join_day': join_day,
+        'exit_day': np.where(has_exit, np.minimum(exit_day, SPAN_DAYS - 1), -1),
+    }
+
+
+def generate_projects(rng, num_projects):
+    """Return project columns as arrays."""
+    start_day = rng.integers(0, SPAN_DAYS - 60, num_projects)
+    end_day = np.minimum(start_day + rng.integers(30, 721, num_projects), SPAN_DAYS - 1)
+    return {
+        'project_id': np.arange(1, num_projects + 1),
+        'name': np.array([f'Project {i:04d}' for i in range(1, num_projects + 1)], dtype=object),
+        'start_day': start_day,
+        'end_day': end_day,
+    }
+
+
+def generate_reviews(rng, employees, lo, hi):
+    """Return performance reviews for employees[lo:hi], dated within each tenure."""
+    emp_idx = np.repeat(np.arange(lo, hi), rng.poisson(REVIEWS_PER_EMPLOYEE, hi - lo))
+    start = employees['join_day'][emp_idx]
+    stop = np.where(employees['exit_day'][emp_idx] >= 0, employees['exit_day'][emp_idx], SPAN_DAYS - 1)
+    day = start + (rng.random(len(emp_idx)) * (stop - start + 1)).astype(np.int64)
+
+    # One review per employee per day
+    _, keep = np.unique(emp_idx * SPAN_DAYS + day, return_index=True)
+    emp_idx, day = emp_idx[keep], day[keep]
+    return {
+        'emp_id': employees['emp_id'][emp_idx],
+        'review_date': DAY_STRINGS[day],
+        'score': rng.integers(1, 11, len(emp_idx)),
+        'reviewer_id': rng.integers(1, len(employees['emp_id']) + 1, len(emp_idx)),
+    }
+
+
+def generate_project_logs(rng, employees, projects, lo, hi):
+    """Return daily project logs for employees[lo:hi].
+
+    Each employee is assigned a few projects whose window overlaps their tenure
+    and logs hours on random days inside that overlap.
+    """
+    per_employee = rng.integers(1, MAX_PROJECTS_PER_EMPLOYEE + 1, hi - lo)
+    emp_idx = np.repeat(np.arange(lo, hi), per_employee)
+    tenure_start = employees['join_day'][emp_idx]
+    tenure_end = np.where(employees['exit_day'][emp_idx] >= 0, employees['exit_day'][emp_idx], SPAN_DAYS - 1)
+
+    # Rejection-sample a project overlapping the tenure; give up after a few rounds
+    proj_idx = rng.integers(0, len(projects['project_id']), len(emp_idx))
+    for _ in range(8):
+        window_lo = np.maximum(tenure_start, projects['start_day'][proj_idx])
+        window_hi = np.minimum(tenure_end, projects['end_day'][proj_idx])
+        invalid = np.flatnonzero(window_lo > window_hi)
+        if not len(invalid):
+            break
+        proj_idx[invalid] = rng.integers(0, len(projects['project_id']), len(invalid))
+    window_lo = np.maximum(tenure_start, projects['start_day'][proj_idx])
+    window_hi = np.minimum(tenure_end, projects['end_day'][proj_idx])
+    valid = window_lo <= window_hi
+    emp_idx, proj_idx = emp_idx[valid], proj_idx[valid]
+    window_lo, window_hi = window_lo[valid], window_hi[valid]
+
+    # Spread each employee's logs over their assignments
+    counts = rng.poisson(LOGS_PER_EMPLOYEE / per_employee[emp_idx - lo])
+    counts = np.minimum(counts, window_hi - window_lo + 1)
+    assignment = np.repeat(np.arange(len(emp_idx)), counts)
+    width = (window_hi - window_lo + 1)[assignment]
+    day = window_lo[assignment] + (rng.random(len(assignment)) * width).astype(np.int64)
+
+    # One log per employee, project and day; np.unique also sorts rows by employee
+    _, keep = np.unique(assignment * SPAN_DAYS + day, return_index=True)
+    assignment, day = assignment[keep], day[keep]
+    return {
+        'emp_id': employees['emp_id'][emp_idx[assignment]],
+        'project_id': projects['project_id'][proj_idx[assignment]],
+        'hours_logged': rng.integers(1, 9, len(assignment)),
+        'log_date': DAY_STRINGS[day],
+    }
+
+
+def insert_rows(cursor, table, columns):
+    """Insert a dict of equal-length column arrays into table and return the row count."""
+    names = list(columns)
+    placeholders = ', '.join('?' * len(names))
+    rows = zip(*(columns[name].tolist() for name in names))
+    cursor.executemany(f'INSERT INTO {table} ({", ".join(names)}) VALUES ({placeholders})', rows)
+    return len(columns[names[0]])
+
+
+class LoadStats:
+    """Accumulate row counts and elapsed seconds per table."""
+
+    def __init__(self):
+        self.rows = {}
+        self.seconds = {}
+
+    def add(self, table, rows, seconds):
+        self.rows[table] = self.rows.get(table, 0) + rows
+        self.seconds[table] = self.seconds.get(table, 0.0) + seconds
+
+    def report(self):
+        for table, rows in self.rows.items():
+            seconds = self.seconds[table]
+            print(f"{table:<22} {rows:>12,} rows  {seconds:8.2f}s  {rows / max(seconds, 1e-9):>12,.0f} rows/s")
+        total_rows, total_seconds = sum(self.rows.values()), sum(self.seconds.values())
+        print(f"{'total':<22} {total_rows:>12,} rows  {total_seconds:8.2f}s  "
+              f"{total_rows / max(total_seconds, 1e-9):>12,.0f} rows/s")
+
+
+def generate_database(db_path='hr_analytics.db', scale=1.0, seed=42, chunk_employees=5_000,
+                      overwrite=False, verbose=True):
+    """Build a synthetic HR database of the given scale factor and return its LoadStats.
+
+    Employees, departments and projects are generated up front; reviews and
+    project logs are generated and committed one employee chunk at a time so
+    memory stays bounded regardless of scale. All foreign keys point at rows
+    that exist.
+    """
+    if os.path.exists(db_path):
+        if not overwrite:
+            raise FileExistsError(f"{db_path} already exists; pass overwrite=True to replace it")
+        os.remove(db_path)
+
+    rng = np.random.default_rng(seed)
+    counts = scaled_counts(scale)
+    stats = LoadStats()
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    for pragma in BULK_LOAD_PRAGMAS:
+        cursor.execute(pragma)
+    create_tables(cursor)
+
+    employees = generate_employees(rng, counts['employees'], counts['departments'])
+    projects = generate_projects(rng, counts['projects'])
+
+    # Department heads are the first employee generated in each department
+    dept_ids, first_idx = np.unique(employees['department_id'], return_index=True)
+    heads = dict(zip(dept_ids.tolist(), employees['emp_id'][first_idx].tolist()))
+    started = time.perf_counter()
+    cursor.executemany(
+        'INSERT INTO departments (dept_id, name, head_id) VALUES (?, ?, ?)',
+        [(i, name, heads.get(i)) for i, name in enumerate(department_names(counts['departments']), start=1)]
+    )
+    stats.add('departments', counts['departments'], time.perf_counter() - started)
+
+    started = time.perf_counter()
+    employee_rows = {
+        'emp_id': employees['emp_id'],
+        'name': employees['name'],
+        'age': employees['age'],
+        'gender': employees['gender'],
+        'department_id': employees['department_id'],
+        'join_date': DAY_STRINGS[employees['join_day']],
+        'exit_date': np.where(employees['exit_day'] >= 0, DAY_STRINGS[employees['exit_day']], None),
+    }
+    stats.add('employees', insert_rows(cursor, 'employees', employee_rows), time.perf_counter() - started)
+
+    started = time.perf_counter()
+    project_rows = {
+        'project_id': projects['project_id'],
+        'name': projects['name'],
+        'start_date': DAY_STRINGS[projects['start_day']],
+        'end_date': DAY_STRINGS[projects['end_day']],
+    }
+    stats.add('projects', insert_rows(cursor, 'projects', project_rows), time.perf_counter() - started)
+    conn.commit()
+
+    for lo in range(0, counts['employees'], chunk_employees):
+        hi = min(lo + chunk_employees, counts['employees'])
+
+        started = time.perf_counter()
+        rows = insert_rows(cursor, 'performance_reviews', generate_reviews(rng, employees, lo, hi))
+        stats.add('performance_reviews', rows, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        rows = insert_rows(cursor, 'employee_projects', generate_project_logs(rng, employees, projects, lo, hi))
+        stats.add('employee_projects', rows, time.perf_counter() - started)
+        conn.commit()
+
+        if verbose:
+            print(f"  employees {hi:,}/{counts['employees']:,} loaded")
+
+    cursor.execute('PRAGMA journal_mode = DELETE')
+    conn.close()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic HR analytics database.")
+    parser.add_argument('--db', default='hr_analytics.db', help="Output SQLite file")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Scale factor (1.0 ~ 1k employees and 78k project logs)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--chunk-employees', type=int, default=5_000,
+                        help="Employees whose reviews and logs are generated per transaction")
+    parser.add_argument('--overwrite', action='store_true', help="Replace the output file if it exists")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    load_stats = generate_database(args.db, args.scale, args.seed, args.chunk_employees, args.overwrite)
+    load_stats.report()
+    print(f"✅ Generated {args.db} (scale {args.scale}) in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,85 @@
+from datetime import date, datetime, timezone
+
+# Dates are stored as ISO-8601 TEXT. Each one also gets an integer key that
+# indexes and compares without parsing strings:
+#   day keys   - days since 1970-01-01 (julianday of the Unix epoch is 2440587.5)
+#   month keys - YYYYMM, e.g. 202401
+UNIX_EPOCH = date(1970, 1, 1)
+
+
+def day_key_sql(column):
+    return f"CAST(julianday({column}) - 2440587.5 AS INTEGER)"
+
+
+def month_key_sql(column):
+    return f"CAST(strftime('%Y%m', {column}) AS INTEGER)"
+
+
+# (table, key column, SQL expression) for every generated date key
+DATE_KEY_COLUMNS = [
+    ('employees', 'join_day', day_key_sql('join_date')),
+    ('employees', 'exit_day', day_key_sql('exit_date')),
+    ('employees', 'exit_month', month_key_sql('exit_date')),
+    ('performance_reviews', 'review_day', day_key_sql('review_date')),
+    ('employee_projects', 'log_day', day_key_sql('log_date')),
+    ('projects', 'start_day', day_key_sql('start_date')),
+    ('projects', 'end_day', day_key_sql('end_date')),
+    ('dept_daily_hours', 'log_day', day_key_sql('log_date')),
+    ('dept_monthly_exits', 'month_key', month_key_sql("month || '-01'")),
+]
+
+# VIRTUAL generated columns are added in place: no table rewrite, and the
+# values are computed on read or stored only in the indexes built on them
+DATE_KEY_STATEMENTS = [
+    f'ALTER TABLE {table} ADD COLUMN {column} INTEGER GENERATED ALWAYS AS ({expression}) VIRTUAL'
+    for table, column, expression in DATE_KEY_COLUMNS
+]
+
+# One row per day from 1990 through 2040, for grouping and labelling by period
+CALENDAR_TABLE = [
+    '''
+    CREATE TABLE IF NOT EXISTS calendar (
+        day INTEGER PRIMARY KEY,
+        date TEXT NOT NULL UNIQUE,
+        year INTEGER NOT NULL,
+        quarter INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        month_key INTEGER NOT NULL,
+        weekday INTEGER NOT NULL  -- 0 = Sunday
+    ) WITHOUT ROWID
+    ''',
+    f'''
+    INSERT OR IGNORE INTO calendar (day, date, year, quarter, month, month_key, weekday)
+    WITH RECURSIVE days(d) AS (
+        SELECT date('1990-01-01')
+        UNION ALL
+        SELECT date(d, '+1 day') FROM days WHERE d < '2040-12-31'
+    )
+    SELECT {day_key_sql('d')}, d,
+           CAST(strftime('%Y', d) AS INTEGER),
+           (CAST(strftime('%m', d) AS INTEGER) + 2) / 3,
+           CAST(strftime('%m', d) AS INTEGER),
+           {month_key_sql('d')},
+           CAST(strftime('%w', d) AS INTEGER)
+    FROM days
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_calendar_month_key ON calendar(month_key)',
+]
+
+
+def day_key(value):
+    """Day key for an ISO date string (or date), matching day_key_sql."""
+    if not isinstance(value, date):
+        value = date.fromisoformat(str(value)[:10])
+    return (value - UNIX_EPOCH).days
+
+
+def month_key(value):
+    """Month key (YYYYMM) for an ISO date or 'YYYY-MM' string, matching month_key_sql."""
+    value = str(value)
+    return int(value[:4] + value[5:7])
+
+
+def today_key():
+    """Day key of today in UTC, like SQLite's CURRENT_DATE."""
+    return day_key(datetime.now(timezone.utc).date())
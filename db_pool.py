@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def enable_wal(db_path):
+    """Switch the database to WAL journaling so readers never block the loader (persists in the file)."""
+    if not os.path.exists(db_path):
+        return None
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            return conn.execute('PRAGMA journal_mode = WAL').fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        # Read-only media or a locked file: readers still work, just without WAL
+        print(f"Could not enable WAL on {db_path}: {e}")
+        return None
+
+
+def read_only_uri(db_path, immutable=False):
+    """SQLite URI opening db_path read-only; immutable also skips locking, for files that never change."""
+    return Path(db_path).absolute().as_uri() + ('?mode=ro&immutable=1' if immutable else '?mode=ro')
+
+
+def connect_source(db_path, **kwargs):
+    """Read-only connection for copying db_path into a derived store (Parquet snapshot, partition files).
+
+    Derived stores record the database_version they were built from and are
+    only used while it still matches. The pool switches the file to WAL on
+    first use, which changes that version, so it is switched here first;
+    otherwise a fresh store would look stale as soon as the dashboard opened.
+    """
+    enable_wal(db_path)
+    return sqlite3.connect(read_only_uri(db_path), uri=True, **kwargs)
+
+
+class ConnectionPool:
+    """Bounded pool of read-only SQLite connections to one database file.
+
+    A connection is checked out by one thread at a time; nested checkouts on
+    the same thread reuse the connection already held. Idle connections are
+    health-checked before reuse once they have been idle for a while.
+    """
+
+    def __init__(self, db_path, max_connections=8, timeout=30.0, cache_size=-65536,
+                 mmap_size=268435456, temp_store='MEMORY', health_check_interval=30.0):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.pragmas = {'cache_size': cache_size, 'mmap_size': mmap_size, 'temp_store': temp_store}
+        self.health_check_interval = health_check_interval
+        self.journal_mode = enable_wal(db_path)
+
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._idle = []  # (connection, returned_at)
+        self._local = threading.local()
+        self._metrics = {'created': 0, 'checkouts': 0, 'waits': 0, 'wait_seconds': 0.0,
+                         'health_check_failures': 0, 'in_use': 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(read_only_uri(self.db_path), uri=True, check_same_thread=False, timeout=self.timeout)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        with self._lock:
+            self._metrics['created'] += 1
+        return conn
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            with self._lock:
+                self._metrics['health_check_failures'] += 1
+            return False
+
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            started = time.perf_counter()
+            if not self._slots.acquire(timeout=self.timeout):
+                raise sqlite3.OperationalError(
+                    f"Timed out after {self.timeout}s waiting for a connection to {self.db_path}"
+                )
+            with self._lock:
+                self._metrics['waits'] += 1
+                self._metrics['wait_seconds'] += time.perf_counter() - started
+
+        with self._lock:
+            conn, returned_at = self._idle.pop() if self._idle else (None, None)
+        try:
+            if conn is not None and time.monotonic() - returned_at > self.health_check_interval:
+                if not self._is_healthy(conn):
+                    conn.close()
+                    conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+        return conn
+
+    def _release(self, conn):
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Check out a read-only connection for the duration of the with block."""
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            yield held
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        with self._lock:
+            self._metrics['checkouts'] += 1
+            self._metrics['in_use'] += 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            with self._lock:
+                self._metrics['in_use'] -= 1
+            self._release(conn)
+
+    def metrics(self):
+        """Return a snapshot of pool counters."""
+        with self._lock:
+            return dict(self._metrics, idle=len(self._idle), max_connections=self.max_connections,
+                        journal_mode=self.journal_mode)
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
@@ -0,0 +1,162 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Writes between full scans of the cache directory. In between, a write only
+# triggers a scan once this process's running size total passes max_bytes;
+# files written by other processes are counted at the next scan
+RESCAN_WRITES = 256
+
+# Eviction frees space down to this fraction of max_bytes, so a full cache
+# scans once per tenth of its size written rather than on every write
+EVICT_TO = 0.9
+
+
+def database_version(db_path):
+    """Cross-process version token for a database: mtime and size of the file and its WAL.
+
+    Any committed write changes the WAL (or, after a checkpoint, the main file),
+    so results cached under an older token are never served again. An empty
+    WAL holds no changes; readers recreate and touch it, so it is ignored.
+    """
+    stamps = []
+    for path in (db_path, db_path + '-wal'):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            stamps.append(None)
+            continue
+        stamps.append((stat.st_mtime_ns, stat.st_size) if stat.st_size or path == db_path else None)
+    return tuple(stamps)
+
+
+class DiskCache:
+    """On-disk DataFrame cache shared by every process on the host.
+
+    Each result is one Arrow IPC file named by a hash of the database path,
+    its version token, the SQL, parameters and postprocess variant. Files are
+    written to a temp name and renamed into place, so concurrent writers never
+    expose partial files, and read back through a memory map. When the
+    directory grows past max_bytes the least recently used files are deleted;
+    a running size total keeps the directory scan off most writes.
+    """
+
+    def __init__(self, directory, max_bytes=1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'errors': 0, 'scans': 0}
+        self._bytes = None  # unknown until the first scan
+        self._writes_since_scan = 0
+
+    def _path(self, key, version=None):
+        db_path, query, params, variant = key
+        version = database_version(db_path) if version is None else version
+        raw = repr((os.path.abspath(db_path), version, query, params, variant))
+        digest = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{digest}.arrow')
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _error(self, operation, path, error):
+        """Log a failed read or write and record it as an error sample; the query itself goes on."""
+        # Imported here: instrumentation imports query_cache, which imports this module
+        from instrumentation import get_recorder
+
+        logger.warning("Disk cache %s error for %s: %s", operation, path, error)
+        self._count('errors')
+        get_recorder().record('disk_cache', operation, 0.0, error=str(error))
+
+    def get(self, key):
+        """Return the cached DataFrame for a QueryCache key, or None."""
+        path = self._path(key)
+        try:
+            with pa.memory_map(path, 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+            frame = table.to_pandas()
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        except (pa.ArrowException, OSError) as e:
+            self._error('read', path, e)
+            return None
+        try:
+            os.utime(path)  # mtime doubles as last-used time for eviction
+        except OSError:
+            pass
+        self._count('hits')
+        return frame
+
+    def put(self, key, frame, version=None):
+        """Store a DataFrame for a QueryCache key; other value types are ignored.
+
+        `version` is the database_version seen before the query ran. The file is
+        named by it, so a result that raced a write is filed under the old
+        version and never served for the new one.
+        """
+        if not isinstance(frame, pd.DataFrame):
+            return
+        path = self._path(key, version)
+        tmp_path = None
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.chmod(tmp_path, 0o644)
+            size = os.stat(tmp_path).st_size
+            os.replace(tmp_path, path)
+        except (pa.ArrowException, OSError) as e:
+            self._error('write', path, e)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self._stats['writes'] += 1
+            self._writes_since_scan += 1
+            if self._bytes is not None:
+                self._bytes += size
+            due = self._bytes is None or self._bytes > self.max_bytes or self._writes_since_scan >= RESCAN_WRITES
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Scan the directory; if it is over max_bytes, delete least recently used files down to EVICT_TO of it."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.arrow'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes if total <= self.max_bytes else self.max_bytes * EVICT_TO
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                self._count('evictions')
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._bytes = total
+            self._writes_since_scan = 0
+            self._stats['scans'] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
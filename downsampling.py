@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+# Above this many points a chart switches to WebGL (scattergl) traces
+WEBGL_THRESHOLD = 5_000
+
+# Default chart width in pixels when the caller doesn't know it
+DEFAULT_CHART_WIDTH = 1200
+
+# Most series a chart draws one by one; more are summarised as a band (see band_frame)
+MAX_SERIES = 20
+
+
+def points_for_width(width_px):
+    """Points worth sending for a chart this wide (two per pixel column)."""
+    return max(int(width_px) * 2, 4)
+
+
+def _as_numeric(values):
+    """Return x values as float64, converting datetimes to nanoseconds."""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of n_out points that preserve the series' shape.
+
+    The first and last points are always kept. The rest are split into n_out - 2
+    buckets; from each, the point forming the largest triangle with the previously
+    kept point and the average of the next bucket is selected.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x, y = _as_numeric(x), np.asarray(y, dtype=np.float64)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_lo, next_hi = hi, max(edges[i + 2], hi + 1) if i + 2 < len(edges) else n
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs(
+            (x[previous] - avg_x) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (avg_y - y[previous])
+        )
+        previous = lo + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_indices(x, y, n_out):
+    """Indices of the min and max point in each of n_out // 2 equal-count buckets."""
+    n = len(x)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(np.int64)
+    keep = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi > lo:
+            keep.extend((lo + int(np.argmin(y[lo:hi])), lo + int(np.argmax(y[lo:hi]))))
+    return np.unique(keep)
+
+
+def downsample_frame(frame, x, y, group=None, width_px=DEFAULT_CHART_WIDTH, method='lttb'):
+    """Reduce `frame` to about points_for_width(width_px) rows in total.
+
+    Series are split by `group` (or treated as one) and share the budget
+    equally, keeping at least three points each, so the total only exceeds
+    the budget beyond budget // 3 series; summarise more than MAX_SERIES with
+    band_frame instead. Series must be sorted by `x` and are left untouched
+    when already within their share.
+    """
+    budget = points_for_width(width_px)
+    pick = lttb_indices if method == 'lttb' else minmax_indices
+    if frame is None or frame.empty:
+        return frame
+
+    if group is None:
+        if len(frame) <= budget:
+            return frame
+        return frame.iloc[pick(frame[x].to_numpy(), frame[y].to_numpy(), budget)]
+
+    groups = frame.groupby(group, sort=False, observed=True)
+    budget = max(budget // groups.ngroups, 3)
+    sizes = groups[x].transform('size').to_numpy()
+    if sizes.max() <= budget:
+        return frame
+    small = frame[sizes <= budget]
+    reduced = [
+        series.iloc[pick(series[x].to_numpy(), series[y].to_numpy(), budget)]
+        for _, series in frame[sizes > budget].groupby(group, sort=False, observed=True)
+    ]
+    return pd.concat([small, *reduced]).sort_values([group, x], kind='mergesort')
+
+
+def band_frame(frame, x, y, width_px=DEFAULT_CHART_WIDTH, lower=0.25, upper=0.75):
+    """Summarise many series as one band: the mean and lower/upper quantiles of y per x bucket.
+
+    The x range is cut into points_for_width(width_px) // 3 equal buckets, so
+    the three lines of the band hold at most the chart's point budget however
+    many series and rows went in. Returns one row per non-empty bucket, in x
+    order: its first x, 'mean', 'lower', 'upper' and 'values' (rows in it).
+    """
+    if frame is None or frame.empty:
+        return frame
+    buckets = max(points_for_width(width_px) // 3, 1)
+    position = _as_numeric(frame[x].to_numpy())
+    span = max(position.max() - position.min(), 1.0)
+    bucket = np.minimum(((position - position.min()) / span * buckets).astype(np.int64), buckets - 1)
+    values = frame[y].astype(np.float64).groupby(bucket, sort=True)
+    return pd.DataFrame({
+        x: frame[x].groupby(bucket, sort=True).min(),
+        'mean': values.mean(),
+        'lower': values.quantile(lower),
+        'upper': values.quantile(upper),
+        'values': values.size(),
+    }).reset_index(drop=True)
+
+
+def use_webgl(frame):
+    """True when a chart of this frame should use WebGL traces."""
+    return frame is not None and len(frame) > WEBGL_THRESHOLD
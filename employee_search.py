@@ -0,0 +1,68 @@
+# Trigram index over employee names for the search box. It is an external-content
+# FTS5 table: only the trigrams are stored, names are read back from employees by
+# rowid (= emp_id), and the triggers below keep it in step with employees. The
+# trigram tokenizer folds case and serves LIKE '%text%' for text of three or more
+# characters; shorter text is looked up by prefix in the NOCASE name index.
+SEARCH_TABLES = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS employee_search USING fts5(
+        name, content='employees', content_rowid='emp_id', tokenize='trigram'
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_employees_name_nocase ON employees(name COLLATE NOCASE)',
+]
+
+SEARCH_BACKFILL = [
+    "INSERT INTO employee_search(employee_search) VALUES ('rebuild')",
+]
+
+
+def _index_name(row):
+    return f'INSERT INTO employee_search(rowid, name) VALUES ({row}.emp_id, {row}.name);'
+
+
+def _unindex_name(row):
+    # External-content deletes must be given the values that were indexed
+    return f"INSERT INTO employee_search(employee_search, rowid, name) VALUES ('delete', {row}.emp_id, {row}.name);"
+
+
+SEARCH_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_employees_search_insert AFTER INSERT ON employees
+    BEGIN
+        {_index_name('NEW')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_employees_search_delete AFTER DELETE ON employees
+    BEGIN
+        {_unindex_name('OLD')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_employees_search_update AFTER UPDATE OF emp_id, name ON employees
+    WHEN OLD.emp_id IS NOT NEW.emp_id OR OLD.name IS NOT NEW.name
+    BEGIN
+        {_unindex_name('OLD')}
+        {_index_name('NEW')}
+    END
+    ''',
+]
+
+# Matches returned per search, and the shortest text the trigram index can serve
+SEARCH_LIMIT = 20
+MIN_TRIGRAM_CHARS = 3
+
+
+def search_text(text):
+    """Search box input with whitespace collapsed and LIKE wildcards removed.
+
+    The patterns are plain LIKE patterns (an ESCAPE clause would stop the
+    trigram index from being used), so '%' and '_' are dropped instead.
+    """
+    return ' '.join((text or '').replace('%', ' ').replace('_', ' ').split())
+
+
+def search_patterns(text):
+    """LIKE patterns for names starting with text and, when text is long enough, names containing it."""
+    return f'{text}%', f'%{text}%' if len(text) >= MIN_TRIGRAM_CHARS else None
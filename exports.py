@@ -0,0 +1,155 @@
+import argparse
+import csv
+import os
+import time
+
+from instrumentation import timed
+
+# Excel's hard limit is 1,048,576 rows per sheet; one of them holds the header
+EXCEL_MAX_DATA_ROWS = 1_048_575
+
+# Rows fetched from the cursor (or sliced from a frame) per chunk
+EXPORT_CHUNK_ROWS = 10_000
+
+EXPORT_FORMATS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+class ExportStats:
+    """Rows, bytes and elapsed time of one export."""
+
+    def __init__(self, fmt, rows, seconds, size, sheets=1):
+        self.fmt = fmt
+        self.rows = rows
+        self.seconds = seconds
+        self.size = size
+        self.sheets = sheets
+
+    def summary(self):
+        rate = self.rows / max(self.seconds, 1e-9)
+        sheets = f" across {self.sheets} sheets" if self.sheets > 1 else ""
+        return (f"{self.rows:,} rows{sheets} as {self.fmt} ({self.size / 1024 / 1024:.1f} MB) "
+                f"in {self.seconds:.2f}s, {rate:,.0f} rows/s")
+
+
+def frame_chunks(frame, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield row slices of an in-memory DataFrame (views, not copies)."""
+    if len(frame) == 0:
+        yield frame
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+def _records(chunk):
+    """Rows of a chunk as tuples of Python values, with missing values as None."""
+    return chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+def write_excel(chunks, path, sheet_rows=EXCEL_MAX_DATA_ROWS, sheet_name='Sheet'):
+    """Write chunks to an .xlsx file in xlsxwriter's constant-memory mode; return the sheet count.
+
+    Constant-memory mode flushes each row to disk as soon as the next one
+    starts, so only one row is held at a time. A new sheet is started
+    whenever the current one reaches sheet_rows data rows.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'strings_to_urls': False,
+                                          'nan_inf_to_errors': True})
+    worksheet, columns, row, sheets = None, None, 0, 0
+    try:
+        for chunk in chunks:
+            columns = list(chunk.columns)
+            for record in _records(chunk):
+                if worksheet is None or row > sheet_rows:
+                    sheets += 1
+                    worksheet = workbook.add_worksheet(f"{sheet_name}{sheets}")
+                    worksheet.write_row(0, 0, columns)
+                    row = 1
+                worksheet.write_row(row, 0, record)
+                row += 1
+        if worksheet is None:
+            sheets = 1
+            workbook.add_worksheet(f"{sheet_name}1").write_row(0, 0, columns or [])
+    finally:
+        workbook.close()
+    return sheets
+
+
+def write_csv(chunks, path):
+    """Write chunks to a CSV file, header first."""
+    with open(path, 'w', newline='', encoding='utf-8') as out:
+        header = True
+        for chunk in chunks:
+            chunk.to_csv(out, index=False, header=header, quoting=csv.QUOTE_MINIMAL)
+            header = False
+    return 1
+
+
+def write_parquet(chunks, path):
+    """Write chunks to a Parquet file, one row group per chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(path, table.schema)
+            else:
+                table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return 1
+
+
+WRITERS = {'xlsx': write_excel, 'csv': write_csv, 'parquet': write_parquet}
+
+
+@timed('export')
+def export_chunks(chunks, path, fmt):
+    """Stream chunks into path in the given format and return its ExportStats."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format '{fmt}', expected one of {sorted(WRITERS)}")
+    rows = 0
+
+    def counted():
+        nonlocal rows
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+
+    started = time.perf_counter()
+    try:
+        sheets = WRITERS[fmt](counted(), path)
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()  # release the cursor if the writer stopped early
+    return ExportStats(fmt, rows, time.perf_counter() - started, os.path.getsize(path), sheets)
+
+
+def main():
+    import data_fetch
+
+    parser = argparse.ArgumentParser(description="Export a dashboard query without loading it into memory.")
+    parser.add_argument('--db', default=data_fetch.DB_PATH, help="SQLite database to read")
+    parser.add_argument('--department', default=None, help="Department to export (default: whole company)")
+    parser.add_argument('--format', choices=sorted(WRITERS), default='xlsx')
+    parser.add_argument('--chunk-rows', type=int, default=EXPORT_CHUNK_ROWS)
+    parser.add_argument('--output', required=True, help="File to write")
+    args = parser.parse_args()
+
+    data_fetch.DB_PATH = args.db
+    chunks = data_fetch.stream_project_timelines(args.department, chunk_rows=args.chunk_rows)
+    print(export_chunks(chunks, args.output, args.format).summary())
+
+
+if __name__ == '__main__':
+    main()
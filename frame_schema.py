@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+# Result columns holding ISO dates, parsed once to datetime64 by the fetch layer
+DATE_COLUMNS = {'review_date', 'log_date', 'join_date', 'exit_date', 'start_date', 'end_date'}
+
+# Text columns stored as categoricals when their values repeat (names, departments, projects)
+CATEGORY_COLUMNS = {'name', 'employee_name', 'department', 'project_name', 'project1', 'project2', 'gender'}
+
+# Integer columns and the smallest type their domain fits in (ingest.py bounds
+# scores at 10, ages at 100 and hours per log at 24)
+INTEGER_COLUMNS = {
+    'score': 'int8',
+    'age': 'int8',
+    'hours_logged': 'int16',
+    'performance_rank': 'int32',
+    'emp_id': 'int32',
+    'reviewer_id': 'int32',
+    'project_id': 'int32',
+    'headcount': 'int32',
+    'exits': 'int32',
+    'reviews': 'int32',
+    'overlap_days': 'int32',
+    'join_day': 'int32',
+    'exit_day': 'int32',
+    'log_day': 'int32',
+    'start_day': 'int32',
+    'end_day': 'int32',
+}
+
+
+def _is_text(column):
+    return pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column)
+
+
+def _is_plain_integer(column):
+    # NumPy integers only; nullable Int64 columns (which may hold NA) are left alone
+    return isinstance(column.dtype, np.dtype) and column.dtype.kind in 'iu'
+
+
+def _fits(column, dtype):
+    info = np.iinfo(dtype)
+    return column.empty or (info.min <= column.min() and column.max() <= info.max)
+
+
+def _empty_schema(frame):
+    # No values to go by, and each engine types an empty result its own way (SQLite
+    # leaves every column object, DuckDB keeps the column types), so the names decide
+    converted = {}
+    for name in frame.columns:
+        column = frame[name]
+        if name in DATE_COLUMNS:
+            if _is_text(column):
+                converted[name] = pd.to_datetime(column, format='%Y-%m-%d', errors='coerce')
+        elif name in INTEGER_COLUMNS:
+            if column.dtype != INTEGER_COLUMNS[name]:
+                converted[name] = column.astype(INTEGER_COLUMNS[name])
+        elif column.dtype != object:
+            converted[name] = column.astype(object)
+    return frame.assign(**converted) if converted else frame
+
+
+def apply_schema(frame):
+    """Return frame with dates as datetime64, repeated names as categoricals and integers downcast.
+
+    Only columns named in the tables above are touched, and only when their
+    values fit: integers with NULLs (float or nullable columns) or outside the target
+    range are left as they are. Already-typed columns are skipped, so applying
+    it twice is cheap. Empty frames get the same types from any engine: dates
+    and integers as above, every other column object.
+    """
+    if not isinstance(frame, pd.DataFrame):
+        return frame
+    if frame.empty:
+        return _empty_schema(frame)
+    converted = {}
+    for name in frame.columns:
+        column = frame[name]
+        if name in DATE_COLUMNS and _is_text(column):
+            converted[name] = pd.to_datetime(column, format='%Y-%m-%d', errors='coerce')
+        elif name in CATEGORY_COLUMNS and _is_text(column) and column.nunique() * 2 <= len(column):
+            converted[name] = column.astype('category')
+        elif (name in INTEGER_COLUMNS and _is_plain_integer(column)
+              and column.dtype != INTEGER_COLUMNS[name] and _fits(column, INTEGER_COLUMNS[name])):
+            converted[name] = column.astype(INTEGER_COLUMNS[name])
+    return frame.assign(**converted) if converted else frame
+
+
+def frame_bytes(frame):
+    """Deep memory of a frame, including the Python strings of object columns."""
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+
+def memory_report(raw):
+    """Bytes of a raw query result before and after apply_schema, and the typed frame."""
+    typed = apply_schema(raw)
+    return {'before_bytes': frame_bytes(raw), 'after_bytes': frame_bytes(typed)}, typed
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+
+def to_day_numbers(dates):
+    """Convert dates to integer day numbers (days since 1970-01-01) plus a validity mask."""
+    parsed = pd.to_datetime(pd.Series(dates, dtype=object), errors='coerce')
+    valid = parsed.notna().to_numpy()
+    days = np.zeros(len(parsed), dtype=np.int64)
+    days[valid] = parsed[valid].to_numpy().astype('datetime64[D]').astype(np.int64)
+    return days, valid
+
+
+def key_day_numbers(day_keys):
+    """Day numbers plus a validity mask from integer day keys (NULLs arrive as NaN)."""
+    keys = pd.to_numeric(pd.Series(day_keys), errors='coerce')
+    valid = keys.notna().to_numpy()
+    return keys.fillna(0).to_numpy().astype(np.int64), valid
+
+
+def build_events(join_dates, exit_dates):
+    """Turn join/exit dates into (day, delta) event arrays sorted by day.
+
+    Each join is a +1 on its join date and each exit a -1 on its exit date, so
+    an employee counts as active from join_date up to the day before exit_date.
+    Employees without a join date are ignored.
+    """
+    return build_events_from_days(to_day_numbers(join_dates), to_day_numbers(exit_dates))
+
+
+def build_events_from_days(joins, exits):
+    """build_events for (day numbers, validity mask) pairs, e.g. from integer day keys."""
+    (join_days, has_join), (exit_days, has_exit) = joins, exits
+    has_exit = has_exit & has_join
+
+    days = np.concatenate([join_days[has_join], exit_days[has_exit]])
+    deltas = np.concatenate([
+        np.ones(has_join.sum(), dtype=np.int64),
+        -np.ones(has_exit.sum(), dtype=np.int64),
+    ])
+    order = np.argsort(days, kind='stable')
+    return days[order], deltas[order]
+
+
+def _headcount_by_day(events, start_day, end_day):
+    """Headcount for each day number in [start_day, end_day] from sorted events."""
+    days, deltas = events
+    num_days = max(int(end_day - start_day) + 1, 0)
+
+    opening = np.searchsorted(days, start_day, side='right')
+    closing = np.searchsorted(days, end_day, side='right')
+    changes = np.bincount(days[opening:closing] - start_day, weights=deltas[opening:closing],
+                          minlength=num_days)[:num_days]
+    changes[:1] += deltas[:opening].sum()
+    return np.cumsum(changes).astype(np.int64)
+
+
+def daily_headcount(events, start_date, end_date):
+    """Return the active headcount for every day in [start_date, end_date].
+
+    One pass over the sorted events: everything before the window collapses
+    into the opening headcount, events inside it are bucketed per day and a
+    cumulative sum yields the series. Cost is linear in days + events.
+    """
+    (start_day, end_day), _ = to_day_numbers([start_date, end_date])
+    headcount = _headcount_by_day(events, start_day, end_day)
+    return pd.DataFrame({
+        'date': np.arange(start_day, start_day + len(headcount)).astype('datetime64[D]'),
+        'headcount': headcount,
+    })
+
+
+def headcount_on(events, dates):
+    """Return the active headcount on each of the given dates."""
+    return headcount_on_days(events, *to_day_numbers(dates))
+
+
+def headcount_on_days(events, day_numbers, valid):
+    """headcount_on for day numbers and their validity mask."""
+    result = np.zeros(len(day_numbers), dtype=np.int64)
+    if not valid.any():
+        return result
+    first, last = day_numbers[valid].min(), day_numbers[valid].max()
+    result[valid] = _headcount_by_day(events, first, last)[day_numbers[valid] - first]
+    return result
@@ -1,37 +1,375 @@
-import sqlite3
-import time
-
-def create_indexes():
-    # Connect to the database
-    conn = sqlite3.connect('hr_analytics.db')
-    cursor = conn.cursor()
-
-    # Measure query performance before indexing (Before)
-    start_time = time.time()
-    cursor.execute('SELECT * FROM performance_reviews WHERE emp_id = 1')
-    cursor.fetchall()  
-    print("Time without index: {:.6f} seconds".format(time.time() - start_time))
-
-    # Create indexes (if not already created)
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_performance_reviews_emp_id ON performance_reviews(emp_id);')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_performance_reviews_review_date ON performance_reviews(review_date);')  
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_employees_department_id ON employees(department_id);')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_employees_join_date ON employees(join_date);')  
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_employees_exit_date ON employees(exit_date);')  
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_employee_projects_project_id ON employee_projects(project_id);')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_employee_projects_log_date ON employee_projects(log_date);')  
-
-    # Commit the changes
-    conn.commit()
-
-    # Measure query performance after indexing (After)
-    start_time = time.time()
-    cursor.execute('SELECT * FROM performance_reviews WHERE emp_id = 1')
-    cursor.fetchall()  
-    print("Time with index: {:.6f} seconds".format(time.time() - start_time))
-
-    # Close the connection
-    conn.close()
-
-if __name__ == "__main__":
-    create_indexes()
+import argparse
+import os
+import re
+import sqlite3
+import statistics
+import sys
+import time
+
+import data_fetch
+from benchmark import run_query
+from migrations import ADVISOR_VERSION_BASE, apply_index_migration, check_schema
+
+# Words that can follow a table name in FROM/JOIN but are not aliases
+SQL_KEYWORDS = {'ON', 'WHERE', 'JOIN', 'LEFT', 'INNER', 'CROSS', 'GROUP', 'ORDER', 'USING', 'AS', 'LIMIT'}
+
+# Widest index the advisor proposes; past this a covering index costs more to
+# maintain than the table lookups it saves
+MAX_INDEX_COLUMNS = 6
+
+# A candidate index is only kept if it makes its query at least this many times faster
+MIN_SPEEDUP = 1.1
+
+# ORDER BY / GROUP BY lists, up to the end of the clause or the enclosing parenthesis
+SORT_CLAUSE = re.compile(r'\b(?:ORDER|GROUP)\s+BY\b(.*?)(?=\bLIMIT\b|\bHAVING\b|\bORDER\s+BY\b|\bWINDOW\b|\)|;|$)',
+                         re.IGNORECASE | re.DOTALL)
+
+
+def table_aliases(query):
+    """Map each alias (and table name) used in FROM/JOIN clauses to its table."""
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', query, re.IGNORECASE):
+        aliases[table] = table
+        if alias and alias.upper() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def plan_issues(query, plan, tables):
+    """Return (kind, table, detail) for full table scans and temp B-trees in a query plan.
+
+    Scans of CTEs and subqueries are skipped; only names in `tables` count.
+    """
+    aliases = table_aliases(query)
+    issues = []
+    for detail in plan:
+        scan = re.match(r'SCAN (\w+)$', detail)
+        if scan and aliases.get(scan.group(1)) in tables:
+            issues.append(('full scan', aliases[scan.group(1)], detail))
+        elif 'USE TEMP B-TREE' in detail:
+            issues.append(('temp b-tree', None, detail))
+    return issues
+
+
+def table_schema(db_path):
+    """Return {table: [columns]} for the tables an index can go on, plus {index: (table, [columns])}.
+
+    Virtual tables, their shadow tables and SQLite's own tables are left out.
+    Generated columns are included, since they can be indexed.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'").fetchall()
+        virtual = [name for name, sql in rows if sql and sql.upper().startswith('CREATE VIRTUAL')]
+        columns = {}
+        for name, _ in rows:
+            if name.startswith('sqlite_') or any(name == v or name.startswith(f'{v}_') for v in virtual):
+                continue
+            columns[name] = [row[1] for row in conn.execute(f'PRAGMA table_xinfo({name})') if row[6] != 1]
+
+        indexes = {}
+        for table in columns:
+            for row in conn.execute(f'PRAGMA index_list({table})'):
+                indexes[row[1]] = (table, [info[2] for info in conn.execute(f'PRAGMA index_info({row[1]})')])
+        return columns, indexes
+    finally:
+        conn.close()
+
+
+def query_scopes(query):
+    """Return (start, end, aliases) for the whole query and each parenthesized SELECT in it.
+
+    Each scope's aliases are the tables in its own FROM/JOIN clauses, not
+    those of the subqueries nested inside it.
+    """
+    spans, opened = [(0, len(query))], []
+    for position, char in enumerate(query):
+        if char == '(':
+            opened.append(position)
+        elif char == ')' and opened:
+            start = opened.pop()
+            if re.match(r'\(\s*SELECT\b', query[start:position], re.IGNORECASE):
+                spans.append((start, position + 1))
+
+    scopes = []
+    for start, end in spans:
+        text = query[start:end]
+        for inner_start, inner_end in spans:
+            if start < inner_start and inner_end <= end:
+                text = text[:inner_start - start] + ' ' * (inner_end - inner_start) + text[inner_end - start:]
+        scopes.append((start, end, table_aliases(text)))
+    return scopes
+
+
+def column_uses(query, table, columns):
+    """Classify the table's columns the query references.
+
+    Returns (equality, join, range, sort, other) lists in order of first use:
+    columns compared with = or IN to a value, columns compared with = to
+    another table's column, columns bounded with BETWEEN, <, > or LIKE,
+    columns in ORDER BY / GROUP BY, and everything else read. A reference
+    counts when qualified by one of the table's aliases, or when unqualified
+    in a SELECT whose FROM clause has this table and no other with that column.
+    """
+    aliases = table_aliases(query)
+    scopes = query_scopes(query)
+    sort_spans = [match.span(1) for match in SORT_CLAUSE.finditer(query)]
+
+    uses = {'equality': [], 'join': [], 'range': [], 'sort': [], 'other': []}
+    for match in re.finditer(r'(?:\b(\w+)\.)?\b(\w+)\b', query):
+        qualifier, column = match.groups()
+        if column not in columns[table]:
+            continue
+        if qualifier:
+            if aliases.get(qualifier) != table:
+                continue
+        else:
+            # The innermost scope is the one that starts last
+            scope = set(max((s for s in scopes if s[0] <= match.start() < s[1]), key=lambda s: s[0])[2].values())
+            if (table not in scope or any(column in columns.get(name, ()) for name in scope - {table})
+                    or re.search(r'\bAS\s*$', query[:match.start()], re.IGNORECASE)):
+                continue
+
+        before, after = query[:match.start()].rstrip(), query[match.end():].lstrip()
+        if any(start <= match.start() < end for start, end in sort_spans):
+            kind = 'sort'
+        elif re.match(r'==?\s*\w+\.\w+', after) or re.search(r'\w+\.\w+\s*==?$', before):
+            kind = 'join'
+        elif re.match(r'(==?(?!=)|IN\b)', after, re.IGNORECASE) or re.search(r'(?<![<>!])==?$', before):
+            kind = 'equality'
+        elif re.match(r'([<>]|BETWEEN\b|LIKE\b|GLOB\b)', after, re.IGNORECASE) or re.search(r'[<>]=?$', before):
+            kind = 'range'
+        else:
+            kind = 'other'
+        if column not in uses[kind]:
+            uses[kind].append(column)
+    return uses['equality'], uses['join'], uses['range'], uses['sort'], uses['other']
+
+
+def unique(columns):
+    return list(dict.fromkeys(columns))
+
+
+def candidate_indexes(query, issues, columns, indexes):
+    """Return (table, columns) composite and covering index candidates for a query's plan issues.
+
+    A full scan makes candidates on the scanned table; a temp B-tree makes
+    candidates on every table whose columns the query sorts or groups by.
+    Composite keys lead with the columns compared to a value, then either the
+    first range column (with or without the join columns before it) or the
+    sort columns. Each composite also gets a covering variant with the other
+    columns the query reads from that table. Candidates an existing index
+    already starts with are skipped.
+    """
+    tables = {table for kind, table, _ in issues if kind == 'full scan'}
+    if any(kind == 'temp b-tree' for kind, _, _ in issues):
+        tables |= {table for table in set(table_aliases(query).values())
+                   if table in columns and column_uses(query, table, columns)[3]}
+
+    candidates = []
+    for table in sorted(tables):
+        equality, join, bounded, sort, other = column_uses(query, table, columns)
+        keys = (unique(equality + join + bounded[:1]), unique(equality + bounded[:1]), unique(equality + sort))
+        for key in keys:
+            covering = unique(key + join + bounded + sort + other)[:MAX_INDEX_COLUMNS]
+            for index_columns in (key, covering):
+                if not index_columns or (table, index_columns) in candidates:
+                    continue
+                if any(name == table and existing[:len(index_columns)] == index_columns
+                       for name, existing in indexes.values()):
+                    continue
+                candidates.append((table, index_columns))
+    return candidates
+
+
+def index_name(table, columns):
+    return f"idx_{table}_{'_'.join(columns)}"
+
+
+def index_statement(table, columns):
+    return f"CREATE INDEX IF NOT EXISTS {index_name(table, columns)} ON {table}({', '.join(columns)})"
+
+
+def query_plan(conn, query, params):
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query.strip().rstrip(';')}", params)]
+
+
+def time_query(conn, query, params, repeat):
+    """Return the median latency in ms of running the query `repeat` times on conn."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def evaluate_candidates(db_path, query, params, issues, candidates, tables, repeat=5):
+    """Return the candidates that remove plan issues and make the query faster, best first.
+
+    Candidates are tried one at a time; each round keeps the one that leaves
+    fewer plan issues, is used by the planner and cuts the median latency the
+    most (by at least MIN_SPEEDUP), then tries the rest on top of it. All of
+    it happens in a transaction that is rolled back, so the database is left
+    unchanged.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    accepted = []
+    try:
+        conn.execute('BEGIN')
+        try:
+            baseline, issue_count = time_query(conn, query, params, repeat), len(issues)
+            remaining = list(candidates)
+            while remaining:
+                best = None
+                for table, columns in list(remaining):
+                    conn.execute('SAVEPOINT candidate')
+                    try:
+                        conn.execute(index_statement(table, columns))
+                        plan = query_plan(conn, query, params)
+                        left = len(plan_issues(query, plan, tables))
+                        if left < issue_count and any(f'INDEX {index_name(table, columns)}' in detail for detail in plan):
+                            latency = time_query(conn, query, params, repeat)
+                            if latency * MIN_SPEEDUP <= baseline and (best is None or latency < best[0]):
+                                best = (latency, left, (table, columns))
+                    except sqlite3.Error as e:
+                        print(f"Skipping candidate {index_name(table, columns)}: {e}")
+                        remaining.remove((table, columns))
+                    finally:
+                        conn.execute('ROLLBACK TO candidate')
+                        conn.execute('RELEASE candidate')
+                if best is None:
+                    break
+                baseline, issue_count, index = best
+                conn.execute(index_statement(*index))
+                remaining.remove(index)
+                accepted.append(index)
+        finally:
+            conn.execute('ROLLBACK')
+    finally:
+        conn.close()
+    return accepted
+
+
+def propose_indexes(db_path, profile, repeat=5):
+    """Return {(table, columns): [query names]} for indexes that fix plan issues in the profile."""
+    columns, indexes = table_schema(db_path)
+    proposals = {}
+    for name, stats in profile.items():
+        for entry in stats['plans']:
+            issues = plan_issues(entry['query'], entry['plan'], columns)
+            candidates = candidate_indexes(entry['query'], issues, columns, indexes) if issues else []
+            if not candidates:
+                continue
+            for index in evaluate_candidates(db_path, entry['query'], entry['params'], issues, candidates, columns, repeat):
+                proposals.setdefault((index[0], tuple(index[1])), []).append(name)
+    return proposals
+
+
+def create_indexes(db_path, proposals):
+    """Apply each proposed index as its own advisor migration and return the versions applied."""
+    versions = []
+    for (table, columns), queries in proposals.items():
+        description = f"Advisor index on {table}({', '.join(columns)}) for {', '.join(unique(queries))}"
+        version = apply_index_migration(db_path, description, [index_statement(table, list(columns))])
+        print(f"Applied migration {version}: {description}")
+        versions.append(version)
+    return versions
+
+
+def profile_queries(db_path, department, start_date, end_date, repeat):
+    """Time every registered query against db_path and collect its plan issues.
+
+    Returns the profile and a {query name: error} dict of the queries that failed.
+    """
+    tables, _ = table_schema(db_path)
+    profile, failures = {}, {}
+    for name in data_fetch.QUERY_REGISTRY:
+        try:
+            stats = run_query(name, department, start_date, end_date, repeat, db_path=db_path)
+        except Exception as e:
+            failures[name] = str(e)
+            continue
+        if stats['failed']:
+            failures[name] = "query returned no result"
+            continue
+        stats['issues'] = [issue for p in stats['plans'] for issue in plan_issues(p['query'], p['plan'], tables)]
+        profile[name] = stats
+    return profile, failures
+
+
+def advise(db_path, department='Engineering', start_date='2010-01-01', end_date='2024-12-31',
+           repeat=5, apply=True):
+    """Audit query plans, propose indexes, apply them as migrations and report before/after latency.
+
+    Raises RuntimeError before creating any index if schema migrations are
+    pending or any query fails.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        check_schema(conn, db_path)
+    finally:
+        conn.close()
+
+    before, failures = profile_queries(db_path, department, start_date, end_date, repeat)
+    if failures:
+        raise RuntimeError("Queries failed before indexing, so there is no baseline to compare against:\n"
+                           + '\n'.join(f"  {name}: {error}" for name, error in failures.items()))
+
+    print("Query plan audit:")
+    issue_count = 0
+    for name, stats in before.items():
+        for kind, table, detail in stats['issues']:
+            print(f"  {name:<24} {kind:<12} {detail}")
+        issue_count += len(stats['issues'])
+    if not issue_count:
+        print("  no full scans or temp B-trees")
+
+    proposals = propose_indexes(db_path, before, repeat)
+    print("Proposed indexes:")
+    for (table, columns), queries in proposals.items():
+        print(f"  {index_statement(table, list(columns))}  -- {', '.join(unique(queries))}")
+    if not proposals:
+        print("  none")
+
+    if not apply or not proposals:
+        return before, None
+
+    create_indexes(db_path, proposals)
+    after, failures = profile_queries(db_path, department, start_date, end_date, repeat)
+
+    print(f"{'query':<24} {'before p50':>12} {'after p50':>12} {'speedup':>9}  remaining issues")
+    for name in before:
+        if name in failures:
+            print(f"{name:<24} failed after indexing: {failures[name]}")
+            continue
+        old, new = before[name]['p50_ms'], after[name]['p50_ms']
+        print(f"{name:<24} {old:>9.2f} ms {new:>9.2f} ms {old / max(new, 1e-6):>8.1f}x  {len(after[name]['issues'])}")
+    return before, after
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audit dashboard query plans and apply index migrations.")
+    parser.add_argument('--db', default=os.environ.get('HR_DB_PATH', 'db/hr_analytics.db'), help="SQLite database to index")
+    parser.add_argument('--department', default='Engineering', help="Department used for sample queries")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per query")
+    parser.add_argument('--dry-run', action='store_true', help="Only audit and propose, don't migrate")
+    parser.add_argument('--list', action='store_true', help="List the advisor migrations applied and exit")
+    args = parser.parse_args()
+    # sqlite3 would quietly create an empty file for a mistyped path
+    if not os.path.exists(args.db):
+        parser.error(f"no database at {args.db}")
+
+    if args.list:
+        conn = sqlite3.connect(args.db)
+        for version, description in conn.execute(
+                'SELECT version, description FROM schema_migrations WHERE version > ? ORDER BY version',
+                (ADVISOR_VERSION_BASE,)):
+            print(f"{version}: {description}")
+        conn.close()
+    else:
+        try:
+            advise(args.db, args.department, repeat=args.repeat, apply=not args.dry_run)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
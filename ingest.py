@@ -0,0 +1,413 @@
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+from datetime import date, datetime
+
+from database_setup import create_tables
+from db_pool import enable_wal
+from migrations import apply_migrations
+
+# Rows upserted per transaction; each commit releases the write lock, and
+# readers never wait on it in WAL mode
+INGEST_CHUNK_ROWS = 5_000
+
+# Per entity: target table, natural key (ON CONFLICT target) and fields as
+# name -> (type, required). Files are loaded in this order so references resolve.
+ENTITIES = {
+    'departments': {
+        'table': 'departments',
+        'key': ('dept_id',),
+        'fields': {'dept_id': ('int', True), 'name': ('text', True), 'head_id': ('int', False)},
+    },
+    'employees': {
+        'table': 'employees',
+        'key': ('emp_id',),
+        'fields': {'emp_id': ('int', True), 'name': ('text', True), 'age': ('int', False),
+                   'gender': ('text', False), 'department_id': ('int', True),
+                   'join_date': ('date', True), 'exit_date': ('date', False)},
+    },
+    'projects': {
+        'table': 'projects',
+        'key': ('project_id',),
+        'fields': {'project_id': ('int', True), 'name': ('text', True),
+                   'start_date': ('date', False), 'end_date': ('date', False)},
+    },
+    'reviews': {
+        'table': 'performance_reviews',
+        'key': ('emp_id', 'review_date', 'reviewer_id'),
+        'fields': {'emp_id': ('int', True), 'review_date': ('date', True), 'score': ('int', True),
+                   'reviewer_id': ('int', True)},
+    },
+    'time_logs': {
+        'table': 'employee_projects',
+        'key': ('emp_id', 'project_id', 'log_date'),
+        'fields': {'emp_id': ('int', True), 'project_id': ('int', True), 'hours_logged': ('int', True),
+                   'log_date': ('date', True)},
+    },
+}
+
+# File name prefixes recognised for each entity when --entity isn't given
+ENTITY_PREFIXES = {
+    'departments': 'departments', 'employees': 'employees', 'projects': 'projects',
+    'performance_reviews': 'reviews', 'reviews': 'reviews',
+    'employee_projects': 'time_logs', 'time_logs': 'time_logs', 'timelogs': 'time_logs',
+}
+
+# Integer fields accept ints and strings of digits, nothing else
+INTEGER = re.compile(r'[+-]?\d+')
+
+# Inclusive bounds for numeric fields
+RANGES = {'age': (14, 100), 'score': (0, 10), 'hours_logged': (0, 24)}
+
+# The upserts resolve conflicts on unique indexes over the fact tables' natural
+# keys. Rows already repeating a key are merged first, which changes data, so
+# this is done here, the first time a database is loaded through ingest, and
+# not by a schema migration. Time logs for one employee, project and day are
+# summed into the first row (the summary triggers keep dept_daily_hours
+# unchanged); a review repeated by the same reviewer on the same day keeps its
+# latest copy.
+NATURAL_KEY_DEDUP = [
+    '''
+    UPDATE employee_projects SET hours_logged = (
+        SELECT SUM(d.hours_logged) FROM employee_projects d
+        WHERE d.emp_id = employee_projects.emp_id AND d.project_id = employee_projects.project_id
+          AND d.log_date = employee_projects.log_date
+    )
+    WHERE rowid IN (
+        SELECT MIN(rowid) FROM employee_projects
+        GROUP BY emp_id, project_id, log_date HAVING COUNT(*) > 1
+    )
+    ''',
+    '''
+    DELETE FROM employee_projects
+    WHERE rowid NOT IN (SELECT MIN(rowid) FROM employee_projects GROUP BY emp_id, project_id, log_date)
+    ''',
+    '''
+    DELETE FROM performance_reviews
+    WHERE rowid NOT IN (SELECT MAX(rowid) FROM performance_reviews GROUP BY emp_id, review_date, reviewer_id)
+    ''',
+]
+
+NATURAL_KEY_INDEXES = [
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_performance_reviews_natural_key '
+    'ON performance_reviews(emp_id, review_date, reviewer_id)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_employee_projects_natural_key '
+    'ON employee_projects(emp_id, project_id, log_date)',
+    # Same columns as the unique indexes (migration 5), or a prefix of them
+    'DROP INDEX IF EXISTS idx_performance_reviews_emp_date_reviewer',
+    'DROP INDEX IF EXISTS idx_employee_projects_emp_project_date',
+    'DROP INDEX IF EXISTS idx_employee_projects_emp_project',
+]
+
+# One row per extract file loaded, keyed by content hash
+INGEST_TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS ingest_files (
+        sha256 TEXT PRIMARY KEY,
+        path TEXT,
+        entity TEXT,
+        rows_read INTEGER NOT NULL DEFAULT 0,
+        rows_loaded INTEGER NOT NULL DEFAULT 0,
+        rows_rejected INTEGER NOT NULL DEFAULT 0,
+        started_at TEXT,
+        completed_at TEXT
+    )
+    ''',
+]
+
+
+def upsert_sql(entity):
+    """INSERT ... ON CONFLICT DO UPDATE for an entity, skipping rows that wouldn't change.
+
+    The WHERE clause keeps unchanged rows from being rewritten, so they don't
+    fire the summary triggers or touch any index.
+    """
+    spec = ENTITIES[entity]
+    columns = list(spec['fields'])
+    updates = [column for column in columns if column not in spec['key']]
+    return f'''
+    INSERT INTO {spec['table']} ({', '.join(columns)})
+    VALUES ({', '.join('?' for _ in columns)})
+    ON CONFLICT ({', '.join(spec['key'])}) DO UPDATE SET
+        {', '.join(f'{column} = excluded.{column}' for column in updates)}
+    WHERE {' OR '.join(f'{column} IS NOT excluded.{column}' for column in updates)}
+    '''
+
+
+def prepare_ingest(conn):
+    """Create the checkpoint table and, on first use, the natural-key indexes; return rows merged per table.
+
+    Rows repeating a natural key are merged in the same transaction that
+    builds the unique indexes. Later calls find the indexes and change nothing.
+    """
+    with conn:
+        for statement in INGEST_TABLES:
+            conn.execute(statement)
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    if {'idx_performance_reviews_natural_key', 'idx_employee_projects_natural_key'} <= indexes:
+        return {}
+    tables = ('performance_reviews', 'employee_projects')
+    with conn:
+        conn.execute('BEGIN')
+        before = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in tables}
+        for statement in NATURAL_KEY_DEDUP + NATURAL_KEY_INDEXES:
+            conn.execute(statement)
+        return {table: before[table] - conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in tables}
+
+
+def entity_for(path):
+    """Guess the entity of an extract from its file name (employees_2024-06-01.csv -> employees)."""
+    name = os.path.basename(path).lower()
+    for prefix, entity in sorted(ENTITY_PREFIXES.items(), key=lambda item: -len(item[0])):
+        if name.startswith(prefix):
+            return entity
+    raise ValueError(f"Can't tell which entity {path} holds; pass --entity")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_rows(path):
+    """Stream (line number, row, problem) from a CSV (header row required) or JSONL extract.
+
+    `row` is a dict and `problem` None, except for a JSONL line that isn't a
+    JSON object: then `row` is the line's text and `problem` says what is
+    wrong, so the line can be rejected without stopping the load.
+    """
+    if path.lower().endswith(('.jsonl', '.ndjson', '.json')):
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, line.strip(), f"invalid JSON: {e.msg} at column {e.colno}"
+                    continue
+                if isinstance(row, dict):
+                    yield line_number, row, None
+                else:
+                    yield line_number, line.strip(), f"expected a JSON object, got {type(row).__name__}"
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row, None
+
+
+class Validator:
+    """Checks and converts extract rows, including references to rows already in the database."""
+
+    def __init__(self, conn):
+        self.departments = dict(conn.execute('SELECT name, dept_id FROM departments'))
+        self.known = {
+            'departments': {row[0] for row in conn.execute('SELECT dept_id FROM departments')},
+            'employees': {row[0] for row in conn.execute('SELECT emp_id FROM employees')},
+            'projects': {row[0] for row in conn.execute('SELECT project_id FROM projects')},
+        }
+
+    def convert(self, entity, raw):
+        """Return (values tuple, None) for a valid row or (None, reason)."""
+        raw = {key.strip().lower(): value for key, value in raw.items() if key}
+        if entity == 'employees' and not raw.get('department_id') and raw.get('department'):
+            raw['department_id'] = self.departments.get(raw['department'])
+            if raw['department_id'] is None:
+                return None, f"unknown department '{raw['department']}'"
+
+        values = []
+        for field, (kind, required) in ENTITIES[entity]['fields'].items():
+            value = raw.get(field)
+            if isinstance(value, str):
+                value = value.strip()
+            if value is None or value == '':
+                if required:
+                    return None, f"missing {field}"
+                values.append(None)
+                continue
+            try:
+                if kind == 'int':
+                    # Only ints and integral strings: int() would truncate JSON floats and take booleans
+                    if isinstance(value, bool) or not (isinstance(value, int) or
+                                                       isinstance(value, str) and INTEGER.fullmatch(value)):
+                        raise ValueError(value)
+                    value = int(value)
+                elif kind == 'date':
+                    value = date.fromisoformat(str(value)[:10]).isoformat()
+                else:
+                    value = str(value)
+            except ValueError:
+                return None, f"invalid {kind} for {field}: {value!r}"
+            low, high = RANGES.get(field, (None, None))
+            if low is not None and not low <= value <= high:
+                return None, f"{field} {value} outside {low}-{high}"
+            values.append(value)
+
+        row = dict(zip(ENTITIES[entity]['fields'], values))
+        if entity == 'employees' and row['exit_date'] and row['exit_date'] < row['join_date']:
+            return None, "exit_date before join_date"
+        if entity == 'projects' and row['start_date'] and row['end_date'] and row['end_date'] < row['start_date']:
+            return None, "end_date before start_date"
+        for field, parent in (('department_id', 'departments'), ('emp_id', 'employees'),
+                              ('reviewer_id', 'employees'), ('project_id', 'projects')):
+            if field in row and entity != parent and row[field] not in self.known[parent]:
+                return None, f"unknown {field} {row[field]}"
+        return tuple(values), None
+
+    def loaded(self, entity, rows):
+        """Remember keys just loaded so later rows (and files) can reference them."""
+        if entity in self.known:
+            self.known[entity].update(row[0] for row in rows)
+        if entity == 'departments':
+            self.departments.update((row[1], row[0]) for row in rows)
+
+
+def open_rejects(path, committed):
+    """Open a rejects file for writing after its first `committed` records.
+
+    Records past those came from a chunk that never committed; its rows are
+    read and rejected again on resume, so they are dropped here.
+    """
+    kept = []
+    if committed and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            kept = list(itertools.islice(f, committed))
+    rejects = open(path, 'w', encoding='utf-8')
+    rejects.writelines(kept)
+    return rejects
+
+
+def ingest_file(conn, path, entity, validator, chunk_rows=INGEST_CHUNK_ROWS, rejects_dir=None):
+    """Validate and upsert one extract in chunked transactions; return its stats or None if already loaded.
+
+    Progress is checkpointed in ingest_files, keyed by the file's sha256, in the
+    same transaction as each chunk. A file that completed is skipped; one that
+    was interrupted resumes after the last committed chunk. Its rejects file
+    keeps the rejects the checkpoint counts, and is started afresh otherwise.
+    """
+    sha256 = file_sha256(path)
+    checkpoint = conn.execute(
+        'SELECT rows_read, rows_loaded, rows_rejected, completed_at FROM ingest_files WHERE sha256 = ?', (sha256,)
+    ).fetchone()
+    if checkpoint and checkpoint[3]:
+        return None
+    if checkpoint is None:
+        with conn:
+            conn.execute('INSERT INTO ingest_files (sha256, path, entity, started_at) VALUES (?, ?, ?, ?)',
+                         (sha256, path, entity, datetime.now().isoformat(timespec='seconds')))
+        checkpoint = (0, 0, 0, None)
+    rows_read, rows_loaded, rows_rejected, _ = checkpoint
+
+    sql = upsert_sql(entity)
+    rejects = None
+    if rejects_dir:
+        os.makedirs(rejects_dir, exist_ok=True)
+        rejects = open_rejects(os.path.join(rejects_dir, os.path.basename(path) + '.rejects.jsonl'), rows_rejected)
+    started = time.perf_counter()
+
+    def flush(batch, read, rejected):
+        # Rejects reach the disk before the checkpoint that counts them commits
+        if rejects:
+            rejects.flush()
+            os.fsync(rejects.fileno())
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(sql, batch)
+            conn.execute('UPDATE ingest_files SET rows_read = ?, rows_loaded = rows_loaded + ?, rows_rejected = ? '
+                         'WHERE sha256 = ?', (read, len(batch), rejected, sha256))
+        validator.loaded(entity, batch)
+
+    try:
+        batch = []
+        for row_number, (line, raw, problem) in enumerate(read_rows(path), start=1):
+            if row_number <= rows_read:
+                continue  # committed before an interruption
+            values, reason = (None, problem) if problem else validator.convert(entity, raw)
+            if values is None:
+                rows_rejected += 1
+                if rejects:
+                    rejects.write(json.dumps({'line': line, 'reason': reason, 'row': raw}, default=str) + '\n')
+            else:
+                batch.append(values)
+            rows_read = row_number
+            if len(batch) >= chunk_rows:
+                flush(batch, rows_read, rows_rejected)
+                rows_loaded += len(batch)
+                batch = []
+        flush(batch, rows_read, rows_rejected)
+        rows_loaded += len(batch)
+        with conn:
+            conn.execute('UPDATE ingest_files SET completed_at = ? WHERE sha256 = ?',
+                         (datetime.now().isoformat(timespec='seconds'), sha256))
+    finally:
+        if rejects:
+            rejects.close()
+
+    seconds = time.perf_counter() - started
+    return {'path': path, 'entity': entity, 'rows_read': rows_read, 'rows_loaded': rows_loaded,
+            'rows_rejected': rows_rejected, 'seconds': seconds}
+
+
+def ingest(db_path, paths, entity=None, chunk_rows=INGEST_CHUNK_ROWS, rejects_dir='ingest_rejects', verbose=True):
+    """Load extracts into db_path incrementally and return per-file stats.
+
+    Creates the schema and applies pending migrations first, so the summary
+    triggers exist, then the ingest_files checkpoint table and the natural-key
+    indexes (see prepare_ingest). Files are processed in entity order
+    (departments, employees, projects, reviews, time logs).
+    """
+    with closing(sqlite3.connect(db_path)) as conn:
+        create_tables(conn.cursor())
+        conn.commit()
+    apply_migrations(db_path)
+    with closing(sqlite3.connect(db_path)) as conn:
+        merged = prepare_ingest(conn)
+    for table, rows in merged.items():
+        if rows:
+            print(f"Merged {rows:,} {table} rows repeating a natural key before building its unique index")
+    enable_wal(db_path)
+
+    order = list(ENTITIES)
+    files = sorted(((entity or entity_for(path), path) for path in paths), key=lambda item: order.index(item[0]))
+    results = []
+    with closing(sqlite3.connect(db_path, timeout=60)) as conn:
+        conn.execute('PRAGMA synchronous = NORMAL')  # durable at every commit in WAL mode
+        validator = Validator(conn)
+        for file_entity, path in files:
+            stats = ingest_file(conn, path, file_entity, validator, chunk_rows, rejects_dir)
+            if stats is None:
+                if verbose:
+                    print(f"{path}: already loaded, skipped")
+                continue
+            results.append(stats)
+            if verbose:
+                rate = stats['rows_read'] / max(stats['seconds'], 1e-9)
+                print(f"{path}: {stats['rows_loaded']:,} upserted, {stats['rows_rejected']:,} rejected "
+                      f"in {stats['seconds']:.2f}s ({rate:,.0f} rows/s)")
+        # Refresh planner statistics only where they have drifted
+        conn.execute('PRAGMA optimize')
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally load HRIS extracts (CSV or JSONL) into the database.")
+    parser.add_argument('files', nargs='+', help="Extract files; the entity is taken from the file name prefix")
+    parser.add_argument('--db', default=os.environ.get('HR_DB_PATH', 'db/hr_analytics.db'))
+    parser.add_argument('--entity', choices=list(ENTITIES), help="Entity of every file, instead of the name prefix")
+    parser.add_argument('--chunk-rows', type=int, default=INGEST_CHUNK_ROWS, help="Rows per transaction")
+    parser.add_argument('--rejects-dir', default='ingest_rejects', help="Where rejected rows are written")
+    args = parser.parse_args()
+
+    ingest(args.db, args.files, args.entity, args.chunk_rows, args.rejects_dir)
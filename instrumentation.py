@@ -0,0 +1,163 @@
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from query_cache import estimate_bytes, normalize_sql
+
+# Samples kept in memory, and an optional JSONL file every sample is appended to
+PERF_SAMPLES = int(os.environ.get('HR_PERF_SAMPLES', 5000))
+PERF_LOG = os.environ.get('HR_PERF_LOG') or None
+
+# Columns every sample has; queries add cache, params and sql. status is
+# 'error' for samples recorded with an error message, 'ok' otherwise
+SAMPLE_COLUMNS = ['at', 'tab', 'background', 'kind', 'name', 'status', 'ms', 'rows', 'bytes', 'cache', 'params',
+                  'sql', 'error']
+
+# Tab (and whether it is a background prefetch) that samples recorded on this
+# thread belong to; set by app.py on the script thread and in prefetch jobs
+_context = ContextVar('perf_context', default=(None, False))
+
+# String and numeric literals, replaced by ? when fingerprinting SQL
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def set_context(tab, background=False):
+    """Attribute samples recorded from here on (on this thread) to tab."""
+    _context.set((tab, background))
+
+
+def fingerprint(query):
+    """Short hash of a query's normalized shape, ignoring whitespace and literal values."""
+    shape = _LITERALS.sub('?', normalize_sql(query))
+    return hashlib.sha1(shape.encode('utf-8')).hexdigest()[:12]
+
+
+class Recorder:
+    """Rolling buffer of timing samples for queries, plots and exports.
+
+    Keeps the last max_samples samples in memory, and appends every sample to
+    a JSONL file when log_path is set. Each sample is a dict with the tab and
+    kind ('query', 'plot' or 'export'), a name (SQL fingerprint or function
+    name), latency in milliseconds, row count, result bytes and, for queries,
+    the parameters and where the result came from ('memory', 'disk' or 'miss').
+    """
+
+    def __init__(self, max_samples=5000, log_path=None):
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self._log = open(log_path, 'a', encoding='utf-8', buffering=1) if log_path else None
+
+    def record(self, kind, name, seconds, rows=None, nbytes=None, **fields):
+        tab, background = _context.get()
+        sample = {'at': datetime.now().isoformat(timespec='milliseconds'), 'tab': tab, 'background': background,
+                  'kind': kind, 'name': name, 'status': 'error' if fields.get('error') else 'ok',
+                  'ms': round(seconds * 1000, 3), 'rows': rows, 'bytes': nbytes, **fields}
+        with self._lock:
+            self._samples.append(sample)
+            if self._log is not None:
+                self._log.write(json.dumps(sample, default=str) + '\n')
+        return sample
+
+    def record_query(self, query, params, seconds, data, cache, nbytes=None, **fields):
+        """Record one fetch_data call, served from `cache` ('memory', 'disk' or 'miss')."""
+        rows = len(data) if isinstance(data, pd.DataFrame) else None
+        if nbytes is None and data is not None:
+            # The result cache measures deep sizes as it stores a value; without
+            # it, keep the sample cheap and count the frame's buffers only
+            nbytes = int(data.memory_usage(index=True).sum()) if rows is not None else estimate_bytes(data)
+        return self.record('query', fingerprint(query), seconds, rows, nbytes, cache=cache,
+                           params=list(params) if params is not None else None,
+                           sql=normalize_sql(query)[:200], **fields)
+
+    def samples(self):
+        with self._lock:
+            return list(self._samples)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def frame(self):
+        """All buffered samples as a DataFrame, oldest first."""
+        samples = pd.DataFrame(self.samples())
+        return samples.reindex(columns=SAMPLE_COLUMNS + [c for c in samples.columns if c not in SAMPLE_COLUMNS])
+
+    def summary(self, include_background=False):
+        """p50/p95 latency, sample and error counts and cache hit rate per tab and kind."""
+        samples = self.frame()
+        if not include_background:
+            samples = samples[~samples['background'].astype(bool)]
+        if samples.empty:
+            return pd.DataFrame(columns=['tab', 'kind', 'count', 'errors', 'p50_ms', 'p95_ms', 'hit_rate'])
+        samples = samples.assign(tab=samples['tab'].fillna('(none)'),
+                                 hit=samples['cache'].isin(['memory', 'disk']))
+        rows = []
+        for (tab, kind), group in samples.groupby(['tab', 'kind'], sort=True):
+            rows.append({
+                'tab': tab, 'kind': kind, 'count': len(group), 'errors': int((group['status'] == 'error').sum()),
+                'p50_ms': round(float(np.percentile(group['ms'], 50)), 2),
+                'p95_ms': round(float(np.percentile(group['ms'], 95)), 2),
+                'hit_rate': round(float(group['hit'].mean()), 2) if kind == 'query' else None,
+            })
+        return pd.DataFrame(rows)
+
+    def slowest(self, n=10, kind='query', include_background=True):
+        """The n slowest buffered samples of a kind, slowest first."""
+        samples = self.frame()
+        samples = samples[samples['kind'] == kind]
+        if not include_background:
+            samples = samples[~samples['background'].astype(bool)]
+        return samples.nlargest(n, 'ms')
+
+    def failures(self, n=10, include_background=True):
+        """The n most recent buffered samples recorded with an error, newest first."""
+        samples = self.frame()
+        samples = samples[samples['status'] == 'error']
+        if not include_background:
+            samples = samples[~samples['background'].astype(bool)]
+        return samples.iloc[::-1].head(n)
+
+
+# One recorder per process, shared by every session and worker thread
+_recorder = Recorder(PERF_SAMPLES, PERF_LOG)
+
+
+def get_recorder():
+    return _recorder
+
+
+def timed(kind):
+    """Decorator recording the latency of a plot or export function.
+
+    Rows are taken from the first DataFrame argument, or from the result's
+    `rows` attribute (e.g. ExportStats).
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            error = None
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            except Exception as e:
+                error = str(e)
+                raise
+            finally:
+                seconds = time.perf_counter() - started
+                frame = next((arg for arg in args if isinstance(arg, pd.DataFrame)), None)
+                rows = len(frame) if frame is not None else getattr(result, 'rows', None)
+                _recorder.record(kind, func.__name__, seconds, rows, **({'error': error} if error else {}))
+        return wrapper
+    return decorate
@@ -0,0 +1,221 @@
+import argparse
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+from date_keys import CALENDAR_TABLE, DATE_KEY_STATEMENTS
+from employee_search import SEARCH_BACKFILL, SEARCH_TABLES, SEARCH_TRIGGERS
+from score_stats import SCORE_BACKFILL, SCORE_TABLES, SCORE_TRIGGERS
+from summary_tables import SUMMARY_BACKFILL, SUMMARY_TABLES, SUMMARY_TRIGGERS
+
+# Versioned schema migrations: (version, description, statements). Applied in
+# order and recorded in schema_migrations, so each one runs exactly once per database.
+MIGRATIONS = [
+    (1, "Single-column lookup indexes", [
+        'CREATE INDEX IF NOT EXISTS idx_performance_reviews_emp_id ON performance_reviews(emp_id)',
+        'CREATE INDEX IF NOT EXISTS idx_performance_reviews_review_date ON performance_reviews(review_date)',
+        'CREATE INDEX IF NOT EXISTS idx_employees_department_id ON employees(department_id)',
+        'CREATE INDEX IF NOT EXISTS idx_employees_join_date ON employees(join_date)',
+        'CREATE INDEX IF NOT EXISTS idx_employees_exit_date ON employees(exit_date)',
+        'CREATE INDEX IF NOT EXISTS idx_employee_projects_project_id ON employee_projects(project_id)',
+        'CREATE INDEX IF NOT EXISTS idx_employee_projects_log_date ON employee_projects(log_date)',
+    ]),
+    (2, "Composite and covering indexes for dashboard access paths", [
+        # Department name lookups in the scalar subqueries
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_departments_name ON departments(name)',
+        # Attrition and tenure: department, then exit/join date
+        'CREATE INDEX IF NOT EXISTS idx_employees_dept_exit ON employees(department_id, exit_date)',
+        'CREATE INDEX IF NOT EXISTS idx_employees_dept_join ON employees(department_id, join_date)',
+        # Performance trends: covering (emp_id, review_date, score)
+        'CREATE INDEX IF NOT EXISTS idx_performance_reviews_emp_date_score '
+        'ON performance_reviews(emp_id, review_date, score)',
+        # Department load: covering (emp_id, log_date, hours_logged)
+        'CREATE INDEX IF NOT EXISTS idx_employee_projects_emp_date_hours '
+        'ON employee_projects(emp_id, log_date, hours_logged)',
+        # Overlap and timelines: distinct projects per employee
+        'CREATE INDEX IF NOT EXISTS idx_employee_projects_emp_project ON employee_projects(emp_id, project_id)',
+        # Superseded by the composites above (same leading column)
+        'DROP INDEX IF EXISTS idx_performance_reviews_emp_id',
+        'DROP INDEX IF EXISTS idx_employees_department_id',
+        # Date-only indexes on the fact tables lure the planner into scanning the
+        # whole date range instead of seeking by department's employees
+        'DROP INDEX IF EXISTS idx_performance_reviews_review_date',
+        'DROP INDEX IF EXISTS idx_employee_projects_log_date',
+    ]),
+    (3, "Materialized monthly exits and daily hours per department", [
+        *SUMMARY_TABLES,
+        *SUMMARY_BACKFILL,
+        *SUMMARY_TRIGGERS,
+    ]),
+    (4, "Integer date keys, calendar table and indexes on the keys", [
+        *DATE_KEY_STATEMENTS,
+        *CALENDAR_TABLE,
+        # Tenure ladder and headcount events: department, then join/exit day
+        'CREATE INDEX IF NOT EXISTS idx_employees_dept_join_day ON employees(department_id, join_day, exit_day)',
+        # Performance trends: covering (emp_id, review_day, score)
+        'CREATE INDEX IF NOT EXISTS idx_performance_reviews_emp_day_score '
+        'ON performance_reviews(emp_id, review_day, score)',
+        # Summary range scans by department and day / month key
+        'CREATE INDEX IF NOT EXISTS idx_dept_daily_hours_dept_day ON dept_daily_hours(department_id, log_day)',
+        'CREATE INDEX IF NOT EXISTS idx_dept_monthly_exits_dept_month '
+        'ON dept_monthly_exits(department_id, month_key)',
+        # Superseded by the day-key indexes above
+        'DROP INDEX IF EXISTS idx_employees_dept_join',
+        'DROP INDEX IF EXISTS idx_performance_reviews_emp_date_score',
+    ]),
+    (5, "Lookup indexes on the fact tables' natural keys", [
+        # Each employee's reviews in date order and time logs in (project, date)
+        # order. Migrations never change data, so these aren't unique: ingest.py
+        # swaps them for unique indexes once it has merged rows repeating a key
+        'CREATE INDEX IF NOT EXISTS idx_performance_reviews_emp_date_reviewer '
+        'ON performance_reviews(emp_id, review_date, reviewer_id)',
+        'CREATE INDEX IF NOT EXISTS idx_employee_projects_emp_project_date '
+        'ON employee_projects(emp_id, project_id, log_date)',
+        # Prefix of the index above
+        'DROP INDEX IF EXISTS idx_employee_projects_emp_project',
+    ]),
+    (6, "Index serving the paged timelines table in employee-name order", [
+        # Seek by department, then name with emp_id as the unique tiebreaker; each
+        # employee's logs then come in (project_id, log_date) order from the natural key
+        'CREATE INDEX IF NOT EXISTS idx_employees_dept_name ON employees(department_id, name, emp_id)',
+    ]),
+    (7, "Monthly score histogram per department for the distribution statistics", [
+        *SCORE_TABLES,
+        *SCORE_BACKFILL,
+        *SCORE_TRIGGERS,
+    ]),
+    (8, "Trigram name index and NOCASE name index for employee search", [
+        *SEARCH_TABLES,
+        *SEARCH_BACKFILL,
+        *SEARCH_TRIGGERS,
+    ]),
+]
+
+# Indexes proposed by the index advisor (index_creation.py) for one database are
+# recorded as migrations too, numbered from here so they never take a version
+# a schema migration above will need
+ADVISOR_VERSION_BASE = 1000
+
+# The only statements an advisor migration may contain
+INDEX_DDL = re.compile(r'\s*CREATE\s+(UNIQUE\s+)?INDEX\s+IF\s+NOT\s+EXISTS\s+\w+\s+ON\s+\w+\s*\([\w\s,]+\)\s*$',
+                       re.IGNORECASE)
+
+
+def ensure_migrations_table(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT
+    )
+    ''')
+
+
+def applied_versions(conn):
+    """Return the set of migration versions already applied to this database."""
+    ensure_migrations_table(conn)
+    return {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+
+
+def pending_migrations(conn):
+    """Return the migrations not yet applied, in order."""
+    done = applied_versions(conn)
+    return [migration for migration in MIGRATIONS if migration[0] not in done]
+
+
+def check_schema(conn, db_path):
+    """Raise RuntimeError naming the command to run if any schema migration is missing.
+
+    Only reads, so it works on read-only connections too.
+    """
+    try:
+        done = {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+    except sqlite3.OperationalError:
+        done = set()
+    missing = [str(version) for version, _, _ in MIGRATIONS if version not in done]
+    if missing:
+        raise RuntimeError(f"{db_path} is missing schema migrations {', '.join(missing)}; "
+                           f"run: python migrations.py --db {db_path}")
+
+
+def apply_migrations(db_path, target=None, analyze=True):
+    """Apply pending migrations up to `target` (all by default), each in its own transaction.
+
+    Returns the list of (version, description) applied. Runs ANALYZE afterwards
+    so the query planner sees statistics for any new indexes.
+    """
+    conn = sqlite3.connect(db_path)
+    applied = []
+    try:
+        for version, description, statements in pending_migrations(conn):
+            if target is not None and version > target:
+                break
+            with conn:
+                # Explicit BEGIN so DDL (ALTER TABLE, CREATE INDEX) rolls back with the rest
+                conn.execute('BEGIN')
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(
+                    'INSERT INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)',
+                    (version, description, datetime.now().isoformat(timespec='seconds'))
+                )
+            applied.append((version, description))
+        if analyze and applied:
+            conn.execute('ANALYZE')
+            conn.commit()
+    finally:
+        conn.close()
+    return applied
+
+
+def apply_index_migration(db_path, description, statements, analyze=True):
+    """Apply CREATE INDEX statements as one new advisor migration and return its version.
+
+    Anything other than index DDL is refused, so an advisor run never changes
+    tables or rows.
+    """
+    for statement in statements:
+        if not INDEX_DDL.match(statement):
+            raise ValueError(f"Advisor migrations may only create indexes, got: {statement}")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute('BEGIN')
+            ensure_migrations_table(conn)
+            latest = conn.execute('SELECT MAX(version) FROM schema_migrations').fetchone()[0] or 0
+            version = max(latest, ADVISOR_VERSION_BASE) + 1
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(
+                'INSERT INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)',
+                (version, description, datetime.now().isoformat(timespec='seconds'))
+            )
+        if analyze:
+            conn.execute('ANALYZE')
+            conn.commit()
+    finally:
+        conn.close()
+    return version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations to a database.")
+    parser.add_argument('--db', default=os.environ.get('HR_DB_PATH', 'db/hr_analytics.db'), help="SQLite database to migrate")
+    parser.add_argument('--target', type=int, help="Stop after this version")
+    parser.add_argument('--list', action='store_true', help="List all migrations and exit")
+    args = parser.parse_args()
+    # sqlite3 would quietly create an empty file for a mistyped path
+    if not os.path.exists(args.db):
+        parser.error(f"no database at {args.db}")
+
+    if args.list:
+        for version, description, statements in MIGRATIONS:
+            print(f"{version}: {description} ({len(statements)} statements)")
+    else:
+        applied = apply_migrations(args.db, args.target)
+        for version, description in applied:
+            print(f"Applied migration {version}: {description}")
+        if not applied:
+            print("Schema is up to date")
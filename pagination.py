@@ -0,0 +1,100 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Rows per page of a paged table
+PAGE_ROWS = 50
+
+
+def seek_query(source, sort, descending=False, after=None, limit=PAGE_ROWS):
+    """Build the SQL and parameters for one page of a paged source.
+
+    `source` is a dict with 'sql' (the base SELECT, exposing every sort key
+    column), 'params' and 'sorts' (sort name -> key columns, ending in a unique
+    tiebreaker); it also carries 'run' (query, params -> frame), 'columns' to
+    show and 'cached', True when run goes through the result cache. Pages are found by seeking past the previous page's last key
+    with a row-value comparison, so every page costs the same as the first;
+    `after` is that key, or None for the first page.
+    """
+    keys = source['sorts'][sort]
+    direction = 'DESC' if descending else 'ASC'
+    params = list(source.get('params') or ())
+    where = ''
+    if after is not None:
+        where = f"WHERE ({', '.join(keys)}) {'<' if descending else '>'} ({', '.join('?' for _ in keys)})"
+        params += list(after)
+    query = f'''
+    SELECT * FROM ({source['sql']}) AS page_source
+    {where}
+    ORDER BY {', '.join(f'{key} {direction}' for key in keys)}
+    LIMIT ?
+    '''
+    return query, tuple(params) + (limit,)
+
+
+def count_query(source):
+    """SQL and parameters counting the rows of a paged source."""
+    return f"SELECT COUNT(*) AS total FROM ({source['sql']}) AS page_source", tuple(source.get('params') or ())
+
+
+def last_key(page, source, sort):
+    """Key values of a page's last row, as plain Python values for the next seek."""
+    return tuple(_plain(page[key].iloc[-1]) for key in source['sorts'][sort])
+
+
+def _plain(value):
+    # Dates are stored as ISO text; numpy scalars become int/float/str for the DB drivers
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d')
+    return value.item() if hasattr(value, 'item') else value
+
+
+class ResultStore:
+    """In-memory SQLite tables holding computed results, so they can be paged like database tables.
+
+    Each result is loaded once under a key, with one index per sort so every
+    page is an index seek. At most max_tables results are kept; the least
+    recently used is dropped first. A table's name is derived from its key, so
+    a query can reload an evicted table under the name its SQL refers to.
+    Safe to share across threads.
+    """
+
+    def __init__(self, max_tables=16):
+        self.max_tables = max_tables
+        self._conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self._lock = threading.Lock()
+        self._tables = OrderedDict()  # key -> table name
+
+    def load(self, key, frame, sorts):
+        """Return the table holding frame under key, creating it and its sort indexes on first use."""
+        with self._lock:
+            return self._load_locked(key, frame, sorts)
+
+    def _load_locked(self, key, frame, sorts):
+        table = self._tables.get(key)
+        if table is not None:
+            self._tables.move_to_end(key)
+            return table
+        table = self._tables[key] = f"result_{hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]}"
+        frame.to_sql(table, self._conn, index=False)
+        for i, keys in enumerate(sorts.values()):
+            self._conn.execute(f"CREATE INDEX {table}_sort_{i} ON {table} ({', '.join(keys)})")
+        while len(self._tables) > self.max_tables:
+            _, dropped = self._tables.popitem(last=False)
+            self._conn.execute(f"DROP TABLE {dropped}")
+        return table
+
+    def query(self, query, params=None, reload=None):
+        """Run a query on the stored tables.
+
+        `reload` is the (key, frame, sorts) its table was loaded with: if other
+        results have pushed that table out of the store since, it is loaded
+        again first rather than the query failing with "no such table".
+        """
+        with self._lock:
+            if reload is not None:
+                self._load_locked(*reload)
+            return pd.read_sql_query(query, self._conn, params=params)
@@ -0,0 +1,301 @@
+import argparse
+import json
+import os
+import sqlite3
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from db_pool import connect_source, read_only_uri
+from disk_cache import database_version
+
+# Fact tables split into one SQLite file per year of their date column. Rows are
+# written in `order`, so each employee's rows sit together, and `indexes` are
+# built afterwards. `checksum` columns are summed per year to tell which years
+# changed since the last build.
+PARTITIONED_TABLES = {
+    'performance_reviews': {
+        'date': 'review_date',
+        'order': 'emp_id, review_day, reviewer_id',
+        'indexes': ['CREATE INDEX idx_performance_reviews_emp_day_score ON performance_reviews(emp_id, review_day, score)'],
+        'checksum': ['emp_id', 'score', 'reviewer_id', 'review_day'],
+    },
+    'employee_projects': {
+        'date': 'log_date',
+        'order': 'emp_id, project_id, log_date',
+        'indexes': [
+            'CREATE INDEX idx_employee_projects_emp_project_date ON employee_projects(emp_id, project_id, log_date)',
+            'CREATE INDEX idx_employee_projects_emp_date_hours ON employee_projects(emp_id, log_date, hours_logged)',
+        ],
+        'checksum': ['emp_id', 'project_id', 'hours_logged', 'log_day'],
+    },
+}
+
+CATALOGUE = 'catalogue.json'
+
+# Name the main database is attached under in a partition connection. Tables
+# that aren't partitioned (employees, departments, ...) resolve to it, so the
+# dashboard's SQL runs unchanged against a partition file.
+MAIN_SCHEMA = 'hr'
+
+
+def partition_path(partition_dir, db_path):
+    """Directory holding the partition files of one database file."""
+    return os.path.join(partition_dir, Path(db_path).stem)
+
+
+def _year_stats(conn, table, spec):
+    """{year: {'fingerprint': [...], 'departments': [...]}} for one table, in one pass."""
+    checksums = ', '.join(f"TOTAL(t.{column})" for column in spec['checksum'])
+    rows = conn.execute(f'''
+        SELECT CAST(substr(t.{spec['date']}, 1, 4) AS INTEGER) AS year, d.name,
+               COUNT(*), MAX(t.rowid), {checksums}
+        FROM {table} t
+        LEFT JOIN employees e ON t.emp_id = e.emp_id
+        LEFT JOIN departments d ON e.department_id = d.dept_id
+        WHERE t.{spec['date']} IS NOT NULL
+        GROUP BY 1, 2
+    ''').fetchall()
+    years = {}
+    for year, department, count, max_rowid, *sums in rows:
+        entry = years.setdefault(year, {'fingerprint': [0, 0] + [0.0] * len(sums), 'departments': []})
+        fingerprint = entry['fingerprint']
+        fingerprint[0] += count
+        fingerprint[1] = max(fingerprint[1], max_rowid)
+        for i, value in enumerate(sums, start=2):
+            fingerprint[i] += value
+        if department is not None:
+            entry['departments'].append(department)
+    return years
+
+
+def _read_only(path):
+    return not os.stat(path).st_mode & stat.S_IWUSR
+
+
+def _build_year(db_path, target, year, closed):
+    """Write the partition file for one year: sorted copies of the fact rows, indexes, ANALYZE, VACUUM."""
+    staging = f'{target}.tmp-{os.getpid()}'
+    if os.path.exists(staging):
+        os.remove(staging)
+    conn = sqlite3.connect(staging)
+    try:
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('ATTACH DATABASE ? AS source', (read_only_uri(db_path),))
+        for table, spec in PARTITIONED_TABLES.items():
+            conn.execute(f'''
+                CREATE TABLE {table} AS
+                SELECT * FROM source.{table}
+                WHERE {spec['date']} BETWEEN '{year:04d}-01-01' AND '{year:04d}-12-31'
+                ORDER BY {spec['order']}
+            ''')
+            for statement in spec['indexes']:
+                conn.execute(statement)
+        conn.commit()
+        conn.execute('DETACH DATABASE source')
+        conn.execute('ANALYZE')
+        conn.commit()
+        # Rewrites the file without free pages, in index order
+        conn.execute('VACUUM')
+    finally:
+        conn.close()
+    if closed:
+        # Past years no longer change: read-only files can be opened immutable
+        os.chmod(staging, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    os.replace(staging, target)
+
+
+def build_partitions(db_path, partition_dir, full=False, verbose=True):
+    """Split the fact tables of db_path into per-year partition files and return the catalogue.
+
+    Only years whose row count, highest rowid or column sums changed since the
+    last build are rewritten (all of them with full=True). Years before the
+    latest one are written read-only. The catalogue records each year's file,
+    row counts and departments, and the database version the partitions were
+    built from, so the router can tell when they have gone stale.
+    """
+    target = partition_path(partition_dir, db_path)
+    os.makedirs(target, exist_ok=True)
+    previous = load_catalogue(target) or {}
+    previous_years = previous.get('years', {})
+
+    with closing(connect_source(db_path)) as conn:
+        version = database_version(db_path)
+        stats = {table: _year_stats(conn, table, spec) for table, spec in PARTITIONED_TABLES.items()}
+
+    all_years = sorted(set().union(*(table_stats.keys() for table_stats in stats.values())))
+    years = {}
+    for year in all_years:
+        entry = {
+            'file': f'{year}.db',
+            'tables': {
+                table: {
+                    'rows': table_stats.get(year, {}).get('fingerprint', [0])[0],
+                    'fingerprint': table_stats.get(year, {}).get('fingerprint'),
+                    'departments': sorted(table_stats.get(year, {}).get('departments', [])),
+                }
+                for table, table_stats in stats.items()
+            },
+        }
+        path = os.path.join(target, entry['file'])
+        old = previous_years.get(str(year))
+        unchanged = (old is not None and os.path.exists(path) and
+                     all(old['tables'].get(table, {}).get('fingerprint') == info['fingerprint']
+                         for table, info in entry['tables'].items()))
+        started = time.perf_counter()
+        if full or not unchanged:
+            _build_year(db_path, path, year, closed=year < all_years[-1])
+            entry['built_at'] = datetime.now().isoformat(timespec='seconds')
+        else:
+            entry['built_at'] = old.get('built_at')
+        if year < all_years[-1] and not _read_only(path):
+            os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        entry['bytes'] = os.path.getsize(path)
+        years[str(year)] = entry
+        if verbose:
+            rows = sum(info['rows'] for info in entry['tables'].values())
+            action = 'built' if full or not unchanged else 'kept'
+            print(f"{year}  {action:<5} {rows:>12,} rows  {entry['bytes'] / 1e6:9.1f} MB  "
+                  f"{time.perf_counter() - started:7.2f}s")
+
+    for year in set(previous_years) - set(years):
+        stale = os.path.join(target, previous_years[year]['file'])
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    catalogue = {
+        'db_path': os.path.abspath(db_path),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'database_version': version,
+        'years': years,
+    }
+    staging = os.path.join(target, f'{CATALOGUE}.tmp-{os.getpid()}')
+    with open(staging, 'w') as f:
+        json.dump(catalogue, f, indent=2)
+    os.replace(staging, os.path.join(target, CATALOGUE))
+    return catalogue
+
+
+def load_catalogue(directory):
+    path = os.path.join(directory, CATALOGUE)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class PartitionRouter:
+    """Runs dashboard SQL over the per-year partition files of a database, in parallel.
+
+    A query comes with a plan: the partitioned table, its date range and
+    optional department (used to prune partitions through the catalogue), the
+    SQL and parameters to run on each partition, and a merge function combining
+    the per-partition frames. Each worker thread keeps one connection per
+    partition file, with the main database attached read-only for the tables
+    that aren't partitioned.
+    """
+
+    def __init__(self, directory, max_workers=4, mmap_size=268435456):
+        self.directory = directory
+        self.mmap_size = mmap_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='partition')
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._catalogue = None
+        self._catalogue_mtime = None
+        self._generation = 0
+
+    def _load_catalogue(self):
+        path = os.path.join(self.directory, CATALOGUE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if mtime != self._catalogue_mtime:
+                self._catalogue = load_catalogue(self.directory)
+                self._catalogue_mtime = mtime
+                self._generation += 1
+            return self._catalogue
+
+    def is_current(self, db_path):
+        """True when partitions exist and were built from the database's current version."""
+        catalogue = self._load_catalogue()
+        if catalogue is None:
+            return False
+        current = json.loads(json.dumps(database_version(db_path)))
+        return catalogue.get('database_version') == current
+
+    def prune(self, table, start_date=None, end_date=None, department=None):
+        """Partition files that can hold rows of table in the date range for the department."""
+        catalogue = self._load_catalogue() or {'years': {}}
+        first = int(start_date[:4]) if start_date else None
+        last = int(end_date[:4]) if end_date else None
+        files = []
+        for year, entry in sorted(catalogue['years'].items()):
+            info = entry['tables'].get(table, {})
+            if not info.get('rows'):
+                continue
+            if (first is not None and int(year) < first) or (last is not None and int(year) > last):
+                continue
+            if department is not None and department not in info.get('departments', ()):
+                continue
+            files.append(os.path.join(self.directory, entry['file']))
+        return files
+
+    def _connection(self, path, db_path):
+        generation = self._generation
+        if getattr(self._local, 'generation', None) != generation:
+            # Partition files were rebuilt: drop this thread's connections to the old ones
+            for conn in getattr(self._local, 'connections', {}).values():
+                conn.close()
+            self._local.connections, self._local.generation = {}, generation
+        conn = self._local.connections.get(path)
+        if conn is None:
+            # Read-only files never change while open, so SQLite can skip locking them
+            conn = sqlite3.connect(read_only_uri(path, immutable=_read_only(path)), uri=True)
+            conn.execute(f'PRAGMA mmap_size = {self.mmap_size}')
+            conn.execute(f'ATTACH DATABASE ? AS {MAIN_SCHEMA}', (read_only_uri(db_path),))
+            self._local.connections[path] = conn
+        return conn
+
+    def _run(self, path, db_path, query, params):
+        with closing(self._connection(path, db_path).execute(query, params or ())) as cursor:
+            return [column[0] for column in cursor.description], cursor.fetchall()
+
+    def query(self, db_path, plan):
+        """Run plan on every partition it can touch, in parallel, and return the merged frame."""
+        files = self.prune(plan['table'], plan.get('start_date'), plan.get('end_date'), plan.get('department'))
+        if not files:
+            # Nothing to read; any partition returns the right (empty) columns, as
+            # the plan's own filters exclude all of its rows
+            catalogue = self._load_catalogue() or {'years': {}}
+            files = [os.path.join(self.directory, entry['file']) for entry in catalogue['years'].values()][:1]
+            if not files:
+                raise sqlite3.OperationalError(f"No partitions in {self.directory}")
+        run = lambda path: self._run(path, db_path, plan['query'], plan['params'])
+        # A single partition runs on the calling thread, skipping the handoff
+        results = [run(files[0])] if len(files) == 1 else list(self._executor.map(run, files))
+        # One frame from every partition's rows; pandas' per-frame overhead would
+        # otherwise dominate the small per-year results
+        rows = [row for _, partition_rows in results for row in partition_rows]
+        return plan['merge']([pd.DataFrame.from_records(rows, columns=results[0][0], coerce_float=True)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split the fact tables into per-year SQLite partition files.")
+    parser.add_argument('--db', default=os.environ.get('HR_DB_PATH', 'db/hr_analytics.db'))
+    parser.add_argument('--partition-dir', default=os.environ.get('HR_PARTITION_DIR', 'partitions'))
+    parser.add_argument('--full', action='store_true', help="Rebuild every year, not only the changed ones")
+    args = parser.parse_args()
+
+    catalogue = build_partitions(args.db, args.partition_dir, full=args.full)
+    print(f"{len(catalogue['years'])} partitions written to {partition_path(args.partition_dir, args.db)}")
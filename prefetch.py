@@ -0,0 +1,101 @@
+import threading
+from collections import deque
+
+
+class PrefetchScheduler:
+    """Warm the result cache for one session by running queries in the background.
+
+    Jobs run on a shared, bounded executor. At most max_inflight jobs per
+    session are submitted at once, so one session can't monopolise the
+    executor; the rest wait in this scheduler's queue, in order, and are
+    submitted as earlier ones finish. Scheduling a new set of filters empties
+    the queue and cancels the jobs submitted for the previous ones; jobs that
+    were already dequeued check a generation counter and skip themselves.
+    """
+
+    def __init__(self, executor, max_inflight=4):
+        self._executor = executor
+        self.max_inflight = max_inflight
+        # Reentrant: a future that is already done runs its callback in add_done_callback
+        self._lock = threading.RLock()
+        self._filters = None
+        self._generation = 0
+        self._futures = {}  # job name -> future, for the current filters
+        self._queue = deque()  # (name, job) waiting for a slot, for the current filters
+        self._inflight = []  # futures from any generation not yet finished
+        self._stats = {'scheduled': 0, 'completed': 0, 'cancelled': 0, 'skipped': 0, 'failed': 0}
+
+    def _run(self, generation, job):
+        if generation != self._generation:
+            with self._lock:
+                self._stats['skipped'] += 1
+            return None
+        try:
+            result = job()
+        except Exception as e:
+            print(f"Prefetch error: {e}")
+            with self._lock:
+                self._stats['failed'] += 1
+            return None
+        with self._lock:
+            self._stats['completed'] += 1
+        return result
+
+    def schedule(self, filters, jobs):
+        """Prefetch `jobs` (name -> zero-argument callable) unless these filters are already scheduled."""
+        with self._lock:
+            if filters == self._filters:
+                return
+            self._cancel_locked()
+            self._filters = filters
+            self._generation += 1
+            self._futures = {}
+            self._queue = deque(jobs.items())
+            self._submit_locked()
+
+    def add(self, name, job):
+        """Queue one more job for the current filters, such as the next page of a table.
+
+        It goes ahead of the jobs still waiting, as the page a user is reading
+        is the likeliest to be asked for next, and replaces a queued job of
+        the same name. It counts against max_inflight like any other job and
+        is cancelled with the rest when the filters change.
+        """
+        with self._lock:
+            self._queue = deque(item for item in self._queue if item[0] != name)
+            self._queue.appendleft((name, job))
+            self._submit_locked()
+
+    def _submit_locked(self):
+        # Jobs from earlier filters that are still running count against the cap
+        self._inflight = [future for future in self._inflight if not future.done()]
+        while self._queue and len(self._inflight) < self.max_inflight:
+            name, job = self._queue.popleft()
+            future = self._executor.submit(self._run, self._generation, job)
+            self._futures[name] = future
+            self._inflight.append(future)
+            self._stats['scheduled'] += 1
+            future.add_done_callback(self._on_done)
+
+    def _on_done(self, future):
+        with self._lock:
+            self._submit_locked()
+
+    def _cancel_locked(self):
+        self._stats['cancelled'] += len(self._queue)
+        self._queue.clear()
+        for future in self._futures.values():
+            if future.cancel():
+                self._stats['cancelled'] += 1
+
+    def cancel(self):
+        """Cancel every queued or submitted job for the current filters."""
+        with self._lock:
+            self._cancel_locked()
+            self._filters = None
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            pending = sum(not future.done() for future in self._futures.values())
+            return dict(self._stats, pending=pending, queued=len(self._queue))
@@ -0,0 +1,159 @@
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from db_pool import read_only_uri
+from disk_cache import database_version
+
+
+def normalize_sql(query):
+    """Collapse whitespace so formatting differences don't split cache entries."""
+    return ' '.join(query.split()).rstrip(';')
+
+
+def estimate_bytes(value):
+    """Approximate the memory held by a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_bytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def protect(value):
+    """Return a value that callers can modify without corrupting the cached copy.
+
+    Frames are shallow copies: with copy-on-write their buffers are shared
+    until a caller writes, so a cache hit copies no data.
+    """
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=False)
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    if isinstance(value, tuple):
+        for item in value:
+            protect(item)
+    return value
+
+
+class QueryCache:
+    """Bounded LRU cache of query results that invalidates itself when the database changes.
+
+    Entries are keyed on (database, normalized SQL, parameters, variant) and
+    evicted least-recently-used first once their combined size exceeds
+    max_bytes. Before every lookup the database's version token is checked:
+    PRAGMA data_version from a dedicated connection (changes whenever another
+    connection commits) plus the mtimes of the database and its WAL file. Any
+    change drops every entry for that database. A result computed while the
+    database changed is not stored: put takes the version seen before the
+    query ran and skips the store if it no longer matches.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, nbytes, stored_at)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._probes = {}  # db_path -> connection used only for PRAGMA data_version
+        self._versions = {}  # db_path -> last seen version token
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'expired': 0,
+                       'stale_puts': 0}
+
+    def _version_token(self, db_path):
+        probe = self._probes.get(db_path)
+        if probe is None:
+            probe = self._probes[db_path] = sqlite3.connect(read_only_uri(db_path), uri=True,
+                                                            check_same_thread=False)
+        data_version = probe.execute('PRAGMA data_version').fetchone()[0]
+        return data_version, database_version(db_path)
+
+    def _check_version(self, db_path):
+        try:
+            token = self._version_token(db_path)
+        except sqlite3.Error:
+            token = None
+        if self._versions.get(db_path, token) != token:
+            stale = [key for key in self._entries if key[0] == db_path]
+            for key in stale:
+                self._drop(key)
+            self._stats['invalidations'] += len(stale)
+        self._versions[db_path] = token
+
+    def _drop(self, key):
+        _, nbytes, _ = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    @staticmethod
+    def make_key(db_path, query, params=None, variant=None):
+        return db_path, normalize_sql(query), tuple(params) if params is not None else None, variant
+
+    def version(self, db_path):
+        """Current version token of db_path; pass it to put for a result queried after this call."""
+        with self._lock:
+            self._check_version(db_path)
+            return self._versions[db_path]
+
+    def get(self, key):
+        """Return a protected copy of the cached value for key, or None on a miss."""
+        with self._lock:
+            self._check_version(key[0])
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+                self._drop(key)
+                self._stats['expired'] += 1
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return protect(entry[0])
+
+    def put(self, key, value, version=None):
+        """Store value under key and evict least-recently-used entries beyond max_bytes.
+
+        With `version` (from version() before the query ran), the value is
+        only stored if the database hasn't changed since; otherwise it may
+        predate a write the cache has already been invalidated for.
+        """
+        nbytes = estimate_bytes(value)
+        if nbytes > self.max_bytes:
+            return protect(value)
+        with self._lock:
+            if version is not None:
+                self._check_version(key[0])
+                if self._versions[key[0]] != version:
+                    self._stats['stale_puts'] += 1
+                    return protect(value)
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, nbytes, time.monotonic())
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+        return protect(value)
+
+    def size(self, key):
+        """Estimated bytes held for key, or None if it isn't cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current size."""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
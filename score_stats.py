@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+from date_keys import month_key_sql
+
+# Review scores are whole numbers from 0 to 10 (see ingest.RANGES), so a count
+# per score value is an exact sketch of any group's distribution, and the
+# sketches of two groups merge by adding counts. One row per department, month
+# and score holds every review ever written in a few thousand rows.
+SCORE_TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS dept_monthly_scores (
+        department_id INTEGER NOT NULL,
+        month_key INTEGER NOT NULL,
+        score INTEGER NOT NULL,
+        reviews INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (department_id, month_key, score)
+    ) WITHOUT ROWID
+    ''',
+]
+
+# One streaming pass over performance_reviews fills the histogram
+SCORE_BACKFILL = [
+    'DELETE FROM dept_monthly_scores',
+    f'''
+    INSERT INTO dept_monthly_scores (department_id, month_key, score, reviews)
+    SELECT e.department_id, {month_key_sql('p.review_date')}, p.score, COUNT(*)
+    FROM performance_reviews p
+    JOIN employees e ON p.emp_id = e.emp_id
+    WHERE e.department_id IS NOT NULL AND p.review_date IS NOT NULL AND p.score IS NOT NULL
+    GROUP BY 1, 2, 3
+    ''',
+]
+
+
+def _review_delta(row, sign):
+    """Upsert that adds (or with sign -1 removes) the review `row` to its department's histogram."""
+    return f'''
+        INSERT INTO dept_monthly_scores (department_id, month_key, score, reviews)
+        SELECT e.department_id, {month_key_sql(f'{row}.review_date')}, {row}.score, {sign}
+        FROM employees e
+        WHERE e.emp_id = {row}.emp_id AND e.department_id IS NOT NULL
+          AND {row}.review_date IS NOT NULL AND {row}.score IS NOT NULL
+        ON CONFLICT (department_id, month_key, score) DO UPDATE SET reviews = reviews + excluded.reviews;
+    '''
+
+
+def _employee_reviews_delta(row, sign):
+    """Upsert that moves all of an employee's reviews into (or out of) their department's histogram."""
+    return f'''
+        INSERT INTO dept_monthly_scores (department_id, month_key, score, reviews)
+        SELECT {row}.department_id, {month_key_sql('p.review_date')}, p.score, {sign} * COUNT(*)
+        FROM performance_reviews p
+        WHERE p.emp_id = {row}.emp_id AND {row}.department_id IS NOT NULL
+          AND p.review_date IS NOT NULL AND p.score IS NOT NULL
+        GROUP BY 2, 3
+        ON CONFLICT (department_id, month_key, score) DO UPDATE SET reviews = reviews + excluded.reviews;
+    '''
+
+
+# Triggers keep the histogram current as reviews land or employees move
+SCORE_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_performance_reviews_scores_insert AFTER INSERT ON performance_reviews
+    BEGIN
+        {_review_delta('NEW', 1)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_performance_reviews_scores_delete AFTER DELETE ON performance_reviews
+    BEGIN
+        {_review_delta('OLD', -1)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_performance_reviews_scores_update
+    AFTER UPDATE OF emp_id, review_date, score ON performance_reviews
+    BEGIN
+        {_review_delta('OLD', -1)}
+        {_review_delta('NEW', 1)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_employees_scores_insert AFTER INSERT ON employees
+    BEGIN
+        {_employee_reviews_delta('NEW', 1)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_employees_scores_delete AFTER DELETE ON employees
+    BEGIN
+        {_employee_reviews_delta('OLD', -1)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_employees_scores_transfer AFTER UPDATE OF department_id ON employees
+    WHEN OLD.department_id IS NOT NEW.department_id
+    BEGIN
+        {_employee_reviews_delta('OLD', -1)}
+        {_employee_reviews_delta('NEW', 1)}
+    END
+    ''',
+]
+
+# Period key expressions over month_key (YYYYMM) as (SQLite, DuckDB): DuckDB's
+# '/' always returns a double, so integer division is spelled '//' there
+PERIODS = {
+    'month': ('month_key', 'month_key'),
+    'quarter': ('month_key / 100 * 10 + (month_key % 100 + 2) / 3',
+                'month_key // 100 * 10 + (month_key % 100 + 2) // 3'),
+    'year': ('month_key / 100', 'month_key // 100'),
+    'all': ('0', '0'),
+}
+
+DISTRIBUTION_COLUMNS = ['department', 'period', 'reviews', 'avg_score', 'min_score', 'lowerfence',
+                        'q1', 'median', 'q3', 'upperfence', 'max_score']
+
+
+def period_label(key):
+    """Label of a period key: 2024 (year), 20241 (quarter), 202401 (month) or 0 (all time)."""
+    key = int(key)
+    if key == 0:
+        return 'All time'
+    if key < 10_000:
+        return str(key)
+    if key < 100_000:
+        return f'{key // 10}-Q{key % 10}'
+    return f'{key // 100}-{key % 100:02d}'
+
+
+def histogram_quantile(values, counts, q):
+    """q-th quantile of the sample with counts[i] copies of values[i] (values ascending).
+
+    Matches numpy.percentile's default linear interpolation over the expanded
+    sample, without expanding it.
+    """
+    cumulative = np.cumsum(counts)
+    position = (cumulative[-1] - 1) * q
+    below, above = np.floor(position), np.ceil(position)
+    lower = values[np.searchsorted(cumulative, below, side='right')]
+    upper = values[np.searchsorted(cumulative, above, side='right')]
+    return float(lower + (upper - lower) * (position - below))
+
+
+def histogram_stats(values, counts):
+    """Count, mean, quartiles and Tukey whiskers of a histogram."""
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    order = np.argsort(values, kind='mergesort')
+    values, counts = values[order], counts[order]
+    keep = counts > 0
+    values, counts = values[keep], counts[keep]
+    q1, median, q3 = (histogram_quantile(values, counts, q) for q in (0.25, 0.5, 0.75))
+    reach = 1.5 * (q3 - q1)
+    return {
+        'reviews': int(counts.sum()),
+        'avg_score': round(float((values * counts).sum() / counts.sum()), 4),
+        'min_score': float(values[0]),
+        # Whiskers end at the most extreme scores within 1.5 IQR of the box
+        'lowerfence': float(values[values >= q1 - reach][0]),
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'upperfence': float(values[values <= q3 + reach][-1]),
+        'max_score': float(values[-1]),
+    }
+
+
+def score_distribution(histogram):
+    """Merge (department, period, score, reviews) histogram rows into one stats row per department and period."""
+    rows = []
+    for (department, period), group in histogram.groupby(['department', 'period'], sort=True, observed=True):
+        counts = group['reviews'].to_numpy(dtype=np.int64)
+        if counts.clip(min=0).sum() > 0:
+            stats = histogram_stats(group['score'].to_numpy(), counts)
+            rows.append({'department': department, 'period': period_label(period), **stats})
+    return pd.DataFrame(rows, columns=DISTRIBUTION_COLUMNS)
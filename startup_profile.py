@@ -0,0 +1,158 @@
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+APP_SCRIPT = 'app.py'
+DEFAULT_RUNS = 5
+
+# Heavy modules that only the tabs and actions using them should load; any of
+# these showing up in the app's startup imports counts as a regression
+DEFERRED_MODULES = ('plotly.express', 'plotly.subplots', 'xlsxwriter', 'duckdb', 'pyarrow.dataset',
+                    'pyarrow.parquet', 'kaleido')
+
+# Startup increases smaller than this are treated as noise when checking for regressions
+MIN_REGRESSION_MS = 10.0
+
+
+def app_imports(script=APP_SCRIPT):
+    """Modules imported at the top level of the app script, in import order."""
+    with open(script, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names = [node.module]
+        else:
+            continue
+        modules += [name for name in names if name not in modules]
+    return modules
+
+
+def parse_importtime(stderr):
+    """(module, self_us, cumulative_us, depth) for every line of `python -X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def profile_once(modules, cwd='.'):
+    """Import modules in a fresh interpreter; return (importtime rows, process wall seconds)."""
+    started = time.perf_counter()
+    code = f"import {', '.join(modules)}" if modules else 'pass'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=cwd, capture_output=True, text=True)
+    seconds = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing the app's modules failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr), seconds
+
+
+def profile_startup(script=APP_SCRIPT, runs=DEFAULT_RUNS):
+    """Median import-time breakdown of the app's startup imports over several fresh interpreters.
+
+    `imports` is the cumulative time of each top-level import statement, in the
+    order the app runs them, so a package is charged to the first import that
+    pulls it in. `packages` sums the self time of every module by top-level
+    package, which does not depend on import order. Modules the interpreter
+    loads before running any code (site, encodings) are left out of both.
+    """
+    modules = app_imports(script)
+    cwd = os.path.dirname(os.path.abspath(script))
+    bootstrap = {name for name, _, _, _ in profile_once([], cwd)[0]}
+    totals, processes, imports, packages, loaded = [], [], {}, {}, set()
+    for _ in range(runs):
+        rows, seconds = profile_once(modules, cwd)
+        rows = [row for row in rows if row[0] not in bootstrap]
+        processes.append(seconds * 1000)
+        totals.append(sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000)
+        run_packages = {}
+        for name, self_us, cumulative, depth in rows:
+            if depth == 0:
+                imports.setdefault(name, []).append(cumulative / 1000)
+            package = name.split('.')[0]
+            run_packages[package] = run_packages.get(package, 0) + self_us / 1000
+            loaded.add(name)
+        for package, ms in run_packages.items():
+            packages.setdefault(package, []).append(ms)
+
+    def median(values):
+        return round(statistics.median(values), 3)
+
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'script': script,
+        'modules': modules,
+        'runs': runs,
+        'total_ms': median(totals),
+        'process_ms': median(processes),
+        'imports': {name: median(values) for name, values in imports.items()},
+        'packages': dict(sorted(((package, median(values)) for package, values in packages.items()),
+                                key=lambda item: -item[1])),
+        'deferred_loaded': [name for name in DEFERRED_MODULES if name in loaded],
+    }
+
+
+def find_regressions(current, baseline, threshold):
+    """Return (what, baseline_ms, current_ms) for the total and packages that grew by more than threshold."""
+    regressions = []
+    pairs = [('total', baseline.get('total_ms'), current['total_ms'])]
+    pairs += [(f'package {package}', baseline.get('packages', {}).get(package), ms)
+              for package, ms in current['packages'].items()]
+    for what, before, after in pairs:
+        if before is None:
+            continue
+        if after > before * (1 + threshold) and after - before > MIN_REGRESSION_MS:
+            regressions.append((what, before, after))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the dashboard's startup import time, module by module.")
+    parser.add_argument('--script', default=APP_SCRIPT, help="Streamlit script whose imports are profiled")
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help="Fresh interpreters to take the median of")
+    parser.add_argument('--top', type=int, default=15, help="Packages to print")
+    parser.add_argument('--output', default='startup_profile.json', help="Where to write results")
+    parser.add_argument('--baseline', help="Previous results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed slowdown versus the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    report = profile_startup(args.script, args.runs)
+    print(f"Startup imports: {report['total_ms']:.1f} ms (process {report['process_ms']:.1f} ms, "
+          f"median of {report['runs']} runs)")
+    for name, ms in report['imports'].items():
+        print(f"  import {name:<40} {ms:9.1f} ms")
+    print("Self time by package:")
+    for package, ms in list(report['packages'].items())[:args.top]:
+        print(f"  {package:<47} {ms:9.1f} ms")
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    failed = False
+    for name in report['deferred_loaded']:
+        print(f"❌ {name} is imported at startup; it should load on the tab or action that uses it")
+        failed = True
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report, json.load(f), args.threshold)
+        for what, before, after in regressions:
+            print(f"❌ REGRESSION {what}: {before:.1f} ms -> {after:.1f} ms")
+        failed = failed or bool(regressions)
+        if not regressions:
+            print("✅ No regressions beyond threshold")
+    if failed:
+        sys.exit(1)
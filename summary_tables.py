@@ -0,0 +1,153 @@
+import sqlite3
+
+from employee_search import SEARCH_BACKFILL, SEARCH_TABLES
+from score_stats import SCORE_BACKFILL, SCORE_TABLES
+
+# Pre-aggregated tables behind the Attrition and Department Load tabs. Hours are
+# stored as sum and count so averages over any date range roll up exactly.
+SUMMARY_TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS dept_monthly_exits (
+        department_id INTEGER NOT NULL,
+        month TEXT NOT NULL,
+        exits INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (department_id, month)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS dept_daily_hours (
+        department_id INTEGER NOT NULL,
+        log_date TEXT NOT NULL,
+        hours_sum INTEGER NOT NULL DEFAULT 0,
+        log_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (department_id, log_date)
+    ) WITHOUT ROWID
+    ''',
+]
+
+SUMMARY_BACKFILL = [
+    'DELETE FROM dept_monthly_exits',
+    '''
+    INSERT INTO dept_monthly_exits (department_id, month, exits)
+    SELECT department_id, strftime('%Y-%m', exit_date), COUNT(*)
+    FROM employees
+    WHERE exit_date IS NOT NULL AND department_id IS NOT NULL
+    GROUP BY 1, 2
+    ''',
+    'DELETE FROM dept_daily_hours',
+    '''
+    INSERT INTO dept_daily_hours (department_id, log_date, hours_sum, log_count)
+    SELECT e.department_id, ep.log_date, TOTAL(ep.hours_logged), COUNT(ep.hours_logged)
+    FROM employee_projects ep
+    JOIN employees e ON ep.emp_id = e.emp_id
+    WHERE e.department_id IS NOT NULL AND ep.log_date IS NOT NULL
+    GROUP BY 1, 2
+    ''',
+]
+
+
+def _exit_delta(row, sign):
+    """Upsert that adds `sign` to the exit count of the employee row `row` (NEW or OLD)."""
+    return f'''
+        INSERT INTO dept_monthly_exits (department_id, month, exits)
+        SELECT {row}.department_id, strftime('%Y-%m', {row}.exit_date), {sign}
+        WHERE {row}.exit_date IS NOT NULL AND {row}.department_id IS NOT NULL
+        ON CONFLICT (department_id, month) DO UPDATE SET exits = exits + excluded.exits;
+    '''
+
+
+def _log_delta(row, sign):
+    """Upsert that adds (or with sign -1 removes) the project log `row` to its department's day."""
+    return f'''
+        INSERT INTO dept_daily_hours (department_id, log_date, hours_sum, log_count)
+        SELECT e.department_id, {row}.log_date, {sign} * COALESCE({row}.hours_logged, 0),
+               {sign} * ({row}.hours_logged IS NOT NULL)
+        FROM employees e
+        WHERE e.emp_id = {row}.emp_id AND e.department_id IS NOT NULL AND {row}.log_date IS NOT NULL
+        ON CONFLICT (department_id, log_date) DO UPDATE SET
+            hours_sum = hours_sum + excluded.hours_sum,
+            log_count = log_count + excluded.log_count;
+    '''
+
+
+def _employee_logs_delta(row, sign):
+    """Upsert that moves all of an employee's logged hours into (or out of) their department."""
+    return f'''
+        INSERT INTO dept_daily_hours (department_id, log_date, hours_sum, log_count)
+        SELECT {row}.department_id, ep.log_date, {sign} * TOTAL(ep.hours_logged), {sign} * COUNT(ep.hours_logged)
+        FROM employee_projects ep
+        WHERE ep.emp_id = {row}.emp_id AND {row}.department_id IS NOT NULL AND ep.log_date IS NOT NULL
+        GROUP BY ep.log_date
+        ON CONFLICT (department_id, log_date) DO UPDATE SET
+            hours_sum = hours_sum + excluded.hours_sum,
+            log_count = log_count + excluded.log_count;
+    '''
+
+
+# Triggers keep the summaries current as rows land, so no full refresh is needed
+SUMMARY_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_employees_summary_insert AFTER INSERT ON employees
+    BEGIN
+        {_exit_delta('NEW', 1)}
+        {_employee_logs_delta('NEW', 1)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_employees_summary_delete AFTER DELETE ON employees
+    BEGIN
+        {_exit_delta('OLD', -1)}
+        {_employee_logs_delta('OLD', -1)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_employees_summary_exit AFTER UPDATE OF exit_date ON employees
+    WHEN OLD.department_id IS NEW.department_id
+    BEGIN
+        {_exit_delta('OLD', -1)}
+        {_exit_delta('NEW', 1)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_employees_summary_transfer AFTER UPDATE OF department_id ON employees
+    WHEN OLD.department_id IS NOT NEW.department_id
+    BEGIN
+        {_exit_delta('OLD', -1)}
+        {_exit_delta('NEW', 1)}
+        {_employee_logs_delta('OLD', -1)}
+        {_employee_logs_delta('NEW', 1)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_employee_projects_summary_insert AFTER INSERT ON employee_projects
+    BEGIN
+        {_log_delta('NEW', 1)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_employee_projects_summary_delete AFTER DELETE ON employee_projects
+    BEGIN
+        {_log_delta('OLD', -1)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_employee_projects_summary_update
+    AFTER UPDATE OF emp_id, hours_logged, log_date ON employee_projects
+    BEGIN
+        {_log_delta('OLD', -1)}
+        {_log_delta('NEW', 1)}
+    END
+    ''',
+]
+
+
+def rebuild_summary_tables(db_path):
+    """Recompute the summary tables, score histogram and name search index from the raw tables (e.g. after a bulk load with triggers off)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            for statement in (SUMMARY_TABLES + SUMMARY_BACKFILL + SCORE_TABLES + SCORE_BACKFILL
+                              + SEARCH_TABLES + SEARCH_BACKFILL):
+                conn.execute(statement)
+    finally:
+        conn.close()
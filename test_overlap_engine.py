@@ -0,0 +1,29 @@
+import pandas as pd
+
+from overlap_engine import OVERLAP_COLUMNS, find_overlaps
+
+
+def assignments(*projects):
+    """One employee's (project_name, start_day, end_day) rows as a find_overlaps input frame."""
+    return pd.DataFrame([
+        {'emp_id': 1, 'name': 'Ada', 'project_id': i, 'project_name': name, 'start_day': start, 'end_day': end}
+        for i, (name, start, end) in enumerate(projects)
+    ])
+
+
+def test_zero_length_project_inside_another_overlaps():
+    result = find_overlaps(assignments(('Long', 0, 10), ('Point', 5, 5)))
+    assert list(result.columns) == OVERLAP_COLUMNS
+    assert set(zip(result['project1'], result['project2'])) == {('Long', 'Point'), ('Point', 'Long')}
+    assert result['overlap_days'].tolist() == [0, 0]
+
+
+def test_zero_length_project_on_a_boundary_does_not_overlap():
+    # Strict comparisons, as in the self-join: p1.start < p2.end AND p2.start < p1.end
+    assert find_overlaps(assignments(('Long', 0, 10), ('Start', 0, 0), ('End', 10, 10))).empty
+
+
+def test_missing_dates_are_dropped():
+    result = find_overlaps(assignments(('A', 0, 10), ('B', 2, 6), ('C', None, 4)))
+    assert set(zip(result['project1'], result['project2'])) == {('A', 'B'), ('B', 'A')}
+    assert result['overlap_days'].tolist() == [4, 4]
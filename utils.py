@@ -1,95 +1,240 @@
-import pandas as pd
-from datetime import datetime
-import io
-import streamlit as st
-
-# === DATE UTILITIES ===
-
-def format_date(date_str: str) -> str:
-    """Format a date string to 'Month DD, YYYY' format."""
-    try:
-        return datetime.strptime(date_str, "%Y-%m-%d").strftime("%B %d, %Y")
-    except ValueError:
-        return "Invalid Date"
-
-def format_date_range(start_date: str, end_date: str) -> str | None:
-    """Return SQL-style BETWEEN clause for dates."""
-    if start_date and end_date:
-        return f"BETWEEN '{start_date}' AND '{end_date}'"
-    return None
-
-# === TENURE & ATTRITION ===
-
-def calculate_tenure(join_date: str, exit_date: str | None = None) -> int | None:
-    """Calculate tenure in months."""
-    try:
-        join = datetime.strptime(join_date, "%Y-%m-%d")
-        exit = datetime.strptime(exit_date, "%Y-%m-%d") if exit_date else datetime.now()
-        return (exit - join).days // 30
-    except (ValueError, TypeError):
-        return None
-
-def calculate_monthly_attrition_rate(exits: int, total_employees: int) -> float:
-    """Calculate monthly attrition as a percentage."""
-    if total_employees == 0:
-        return 0
-    return (exits / total_employees) * 100
-
-# === SQL HELPER FUNCTIONS ===
-
-def generate_sql_filter(department: str = None, date_range: str = None, performance_threshold: int = None) -> str:
-    """Build SQL WHERE clause from filters."""
-    filters = []
-    if department:
-        filters.append(f"d.name = '{department}'")
-    if date_range:
-        filters.append(f"p.review_date {date_range}")
-    if performance_threshold is not None:
-        filters.append(f"p.score >= {performance_threshold}")
-    return "WHERE " + " AND ".join(filters) if filters else ""
-
-def generate_performance_trends_query(department: str = None, date_range: str = None, performance_threshold: int = None) -> str:
-    """Return full SQL query for performance trends with optional filters."""
-    base_query = '''
-    SELECT e.name, p.review_date, p.score
-    FROM performance_reviews p
-    JOIN employees e ON p.emp_id = e.emp_id
-    JOIN departments d ON e.department_id = d.dept_id
-    '''
-    filter_clause = generate_sql_filter(department, date_range, performance_threshold)
-    if filter_clause:
-        base_query += " " + filter_clause
-    base_query += " ORDER BY e.name, p.review_date;"
-    return base_query
-
-# === MISC UTILITIES ===
-
-def format_number(number) -> str:
-    """Return formatted number with commas."""
-    try:
-        return f"{int(number):,}"
-    except (ValueError, TypeError):
-        return "N/A"
-
-# === STREAMLIT DOWNLOAD UTILITIES ===
-
-def download_plot(fig, filename: str):
-    """Render download button for Plotly figure as PNG using in-memory buffer."""
-    img_bytes = fig.to_image(format="png")
-    buffer = io.BytesIO(img_bytes)
-    st.download_button("Download Chart", data=buffer, file_name=filename, mime="image/png")
-
-def download_as_excel(df: pd.DataFrame, filename: str):
-    """Render download button for DataFrame as Excel."""
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name='Sheet1')
-    output.seek(0)
-    st.download_button("Download Excel", data=output, file_name=filename, mime="application/vnd.ms-excel")
-
-def render_plot_with_download(fig, title: str, filename: str):
-    """Display Plotly chart with title and download button."""
-    if fig:
-        st.subheader(title)
-        st.plotly_chart(fig, use_container_width=True)
-        download_plot(fig, filename)
+from datetime import datetime
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import streamlit as st
+
+from chart_export import ChartExporter, figure_key
+from exports import EXPORT_FORMATS, export_chunks
+from pagination import PAGE_ROWS, count_query, last_key, seek_query
+
+# === DATE UTILITIES ===
+
+def format_date(date_str: str) -> str:
+    """Format a date string to 'Month DD, YYYY' format."""
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").strftime("%B %d, %Y")
+    except ValueError:
+        return "Invalid Date"
+
+def format_date_range(start_date: str, end_date: str) -> str | None:
+    """Return SQL-style BETWEEN clause for dates."""
+    if start_date and end_date:
+        return f"BETWEEN '{start_date}' AND '{end_date}'"
+    return None
+
+# === TENURE & ATTRITION ===
+
+def calculate_tenure(join_date: str, exit_date: str | None = None) -> int | None:
+    """Calculate tenure in months."""
+    try:
+        join = datetime.strptime(join_date, "%Y-%m-%d")
+        exit = datetime.strptime(exit_date, "%Y-%m-%d") if exit_date else datetime.now()
+        return (exit - join).days // 30
+    except (ValueError, TypeError):
+        return None
+
+def calculate_monthly_attrition_rate(exits: int, total_employees: int) -> float:
+    """Calculate monthly attrition as a percentage."""
+    if total_employees == 0:
+        return 0
+    return (exits / total_employees) * 100
+
+# === SQL HELPER FUNCTIONS ===
+
+def generate_sql_filter(department: str = None, date_range: str = None, performance_threshold: int = None) -> str:
+    """Build SQL WHERE clause from filters."""
+    filters = []
+    if department:
+        filters.append(f"d.name = '{department}'")
+    if date_range:
+        filters.append(f"p.review_date {date_range}")
+    if performance_threshold is not None:
+        filters.append(f"p.score >= {performance_threshold}")
+    return "WHERE " + " AND ".join(filters) if filters else ""
+
+def generate_performance_trends_query(department: str = None, date_range: str = None, performance_threshold: int = None) -> str:
+    """Return full SQL query for performance trends with optional filters."""
+    base_query = '''
+    SELECT e.name, p.review_date, p.score
+    FROM performance_reviews p
+    JOIN employees e ON p.emp_id = e.emp_id
+    JOIN departments d ON e.department_id = d.dept_id
+    '''
+    filter_clause = generate_sql_filter(department, date_range, performance_threshold)
+    if filter_clause:
+        base_query += " " + filter_clause
+    base_query += " ORDER BY e.name, p.review_date;"
+    return base_query
+
+# === MISC UTILITIES ===
+
+def format_number(number) -> str:
+    """Return formatted number with commas."""
+    try:
+        return f"{int(number):,}"
+    except (ValueError, TypeError):
+        return "N/A"
+
+# === STREAMLIT DOWNLOAD UTILITIES ===
+
+# Worker processes for chart export, and how often a pending export is polled
+CHART_EXPORT_WORKERS = 2
+CHART_EXPORT_POLL_SECONDS = 0.5
+
+@st.cache_resource
+def get_chart_exporter():
+    """Shared exporter rendering PNGs in worker processes, so Kaleido never runs on the script thread."""
+    # Never fork: the server is multi-threaded, and a forked child inherits any lock another
+    # thread held at that moment. Fresh workers only import chart_export for render_png (the
+    # script isn't re-run; spawn imports the streamlit launcher as __mp_main__, which is guarded).
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    executor = ProcessPoolExecutor(max_workers=CHART_EXPORT_WORKERS, mp_context=multiprocessing.get_context(method))
+    return ChartExporter(executor)
+
+@st.fragment(run_every=CHART_EXPORT_POLL_SECONDS)
+def await_chart_export(key: str):
+    """Poll a pending export; rerun the app once the image is ready so the download button appears."""
+    exporter = get_chart_exporter()
+    if exporter.pending(key):
+        st.caption("Rendering chart…")
+    else:
+        st.rerun()
+
+def download_plot(fig, filename: str):
+    """Render download button for Plotly figure as PNG, rendered on request and cached by figure."""
+    exporter = get_chart_exporter()
+    fig_json = fig.to_json()
+    key = figure_key(fig_json)
+
+    img_bytes = exporter.get(key)
+    if img_bytes is not None:
+        st.download_button("Download Chart", data=img_bytes, file_name=filename, mime="image/png")
+        return
+    if exporter.error(key):
+        st.error(f"Chart export failed: {exporter.error(key)}")
+    if exporter.pending(key):
+        await_chart_export(key)
+    elif st.button("Prepare Chart Download", key=f"export_{key}"):
+        exporter.submit(key, fig_json)
+        await_chart_export(key)
+
+# Export files offered through download buttons are written here
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "hr_exports")
+
+def download_export(make_chunks, basename: str):
+    """Render format picker and download button for a table, streamed chunk by chunk to a temp file on request."""
+    fmt = st.selectbox("Export format", list(EXPORT_FORMATS), key=f"export_format_{basename}")
+    filename = f"{basename}.{fmt}"
+    exports = st.session_state.setdefault("exports", {})  # filename -> (path, ExportStats)
+
+    if st.button("Prepare Export", key=f"export_{filename}"):
+        previous = exports.pop(filename, None)
+        if previous and os.path.exists(previous[0]):
+            os.remove(previous[0])
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=EXPORT_DIR, suffix=f".{fmt}")
+        os.close(fd)
+        try:
+            with st.spinner("Exporting..."):
+                exports[filename] = (path, export_chunks(make_chunks(), path, fmt))
+        except Exception as e:
+            print(f"Export error: {e}")
+            st.error(f"Export failed: {e}")
+            os.remove(path)
+
+    if filename in exports:
+        path, stats = exports[filename]
+        try:
+            with open(path, "rb") as export_file:
+                st.download_button(f"Download {fmt.upper()}", data=export_file, file_name=filename,
+                                   mime=EXPORT_FORMATS[fmt])
+        except FileNotFoundError:
+            del exports[filename]
+            return
+        st.caption(f"Exported {stats.summary()}")
+
+def render_plot_with_download(fig, title: str, filename: str):
+    """Display Plotly chart with title and download button."""
+    if fig:
+        st.subheader(title)
+        st.plotly_chart(fig, use_container_width=True)
+        download_plot(fig, filename)
+
+# === PAGED TABLES ===
+
+def render_paged_table(source: dict, key: str, page_rows: int = PAGE_ROWS, prefetch=None):
+    """Render one page of a paged source with sort and navigation controls.
+
+    Only the current page is fetched and sent to the browser. Pages are found
+    by keyset seeks (see pagination.seek_query), the total is counted only on
+    request, and `prefetch`, if given, is called with a name and a job that
+    warms the cache for the next page; only for sources whose run is cached,
+    since for the others the prefetched page would just be thrown away.
+    """
+    state = st.session_state.setdefault(f"pager_{key}", {"cursors": [None], "next": None, "count": None})
+
+    def reset():
+        state.update(cursors=[None], next=None, count=None)
+
+    sort_col, order_col = st.columns(2)
+    sort = sort_col.selectbox("Sort by", list(source["sorts"]), key=f"pager_{key}_sort", on_change=reset)
+    descending = order_col.toggle("Descending", key=f"pager_{key}_desc", on_change=reset)
+
+    query, params = seek_query(source, sort, descending, state["cursors"][-1], page_rows + 1)
+    page = source["run"](query, params)
+    if page is None:
+        st.error("Could not load this page.")
+        return
+    has_next = len(page) > page_rows
+    page = page.iloc[:page_rows]
+    state["next"] = last_key(page, source, sort) if has_next else None
+    first_row = (len(state["cursors"]) - 1) * page_rows
+    if not has_next:
+        state["count"] = first_row + len(page)
+
+    st.dataframe(page[source["columns"]], hide_index=True)
+
+    prev_col, next_col, count_col, label_col = st.columns([1, 1, 1, 3])
+    prev_col.button("◀ Previous", key=f"pager_{key}_prev", disabled=len(state["cursors"]) == 1,
+                    on_click=lambda: state["cursors"].pop())
+    next_col.button("Next ▶", key=f"pager_{key}_next", disabled=not has_next,
+                    on_click=lambda: state["cursors"].append(state["next"]))
+    if state["count"] is None and count_col.button("Count rows", key=f"pager_{key}_count"):
+        total = source["run"](*count_query(source))
+        state["count"] = None if total is None else int(total["total"].iloc[0])
+    total = f" of {state['count']:,}" if state["count"] is not None else ""
+    label_col.caption(f"Rows {first_row + 1:,}–{first_row + len(page):,}{total}" if len(page) else "No rows")
+
+    if has_next and prefetch is not None and source.get("cached"):
+        prefetch(f"page_{key}", partial(source["run"], *seek_query(source, sort, descending, state["next"],
+                                                                    page_rows + 1)))
+
+# === PERFORMANCE PANEL ===
+
+def render_performance_panel(recorder):
+    """Show per-tab p50/p95 latency and the slowest queries from an instrumentation Recorder."""
+    with st.expander("⏱️ Performance", expanded=True):
+        include_background = st.checkbox("Include background prefetch", value=False, key="perf_background")
+        summary = recorder.summary(include_background=include_background)
+        if summary.empty:
+            st.caption("No samples recorded yet.")
+            return
+        st.dataframe(summary, hide_index=True)
+
+        st.markdown("**Slowest queries**")
+        slowest = recorder.slowest(10, include_background=include_background)
+        columns = ["at", "tab", "name", "ms", "rows", "bytes", "cache", "params", "sql"]
+        st.dataframe(slowest[columns].astype({"params": str}), hide_index=True)
+
+        failures = recorder.failures(10, include_background=include_background)
+        if not failures.empty:
+            st.markdown("**Failed queries and cache operations**")
+            columns = ["at", "tab", "kind", "name", "ms", "params", "error", "sql"]
+            st.dataframe(failures[columns].astype({"params": str}), hide_index=True)
+
+        if st.button("Clear samples", key="perf_clear"):
+            recorder.clear()
+            st.rerun()
@@ -1,121 +1,245 @@
-import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import pandas as pd
-
-
-# Helper function to check if data is valid (not None and not empty)
-def validate_data(data, data_name):
-    if data is None or data.empty:
-        st.warning(f"No {data_name} data available.")
-        return False
-    return True
-
-# Helper function to handle exception and return None
-def plot_with_error_handling(plot_func, *args, **kwargs):
-    try:
-        return plot_func(*args, **kwargs)
-    except Exception as e:
-        st.error(f"Error: {e}")
-        return None
-
-
-# Plot employee performance trends over time
-def plot_performance_trends(performance_data):
-    if validate_data(performance_data, "performance"):
-        performance_data['review_date'] = pd.to_datetime(performance_data['review_date'], errors='coerce')
-        performance_data.dropna(subset=['review_date'], inplace=True)
-
-        if performance_data.empty:
-            st.warning("All review dates were invalid. No data to plot.")
-            return None
-
-        return plot_with_error_handling(
-            px.line,
-            performance_data,
-            x="review_date",
-            y="score",
-            color="name",
-            markers=True,
-            title="Employee Performance Trends"
-        )
-
-# Plot average performance score by department using boxplot
-def plot_department_performance(department_performance):
-    if validate_data(department_performance, "department performance"):
-        return plot_with_error_handling(
-            px.box,
-            department_performance,
-            x="department",
-            y="avg_score",
-            title="Performance Score Distribution by Department"
-        )
-
-# Plot monthly attrition rate using line chart
-def plot_attrition_rate(attrition_data):
-    if validate_data(attrition_data, "attrition"):
-        return plot_with_error_handling(
-            px.line,
-            attrition_data,
-            x="month",
-            y="exits",
-            markers=True,
-            title="Monthly Attrition Rate"
-        )
-
-# Plot department load over time using dual-axis line chart
-def plot_department_load(department_load):
-    if validate_data(department_load, "department load") and {'log_date', 'current_headcount', 'avg_hours_logged_per_employee'}.issubset(department_load.columns):
-        department_load['log_date'] = pd.to_datetime(department_load['log_date'], errors='coerce')
-        department_load.dropna(subset=['log_date', 'current_headcount', 'avg_hours_logged_per_employee'], inplace=True)
-
-        return plot_with_error_handling(
-            make_subplots,
-            specs=[[{"secondary_y": True}]],
-            trace_1={
-                "x": department_load['log_date'],
-                "y": department_load['current_headcount'],
-                "name": 'Headcount',
-                "mode": 'lines+markers',
-                "line": dict(color='indianred')
-            },
-            trace_2={
-                "x": department_load['log_date'],
-                "y": department_load['avg_hours_logged_per_employee'],
-                "name": 'Avg Hours Logged',
-                "mode": 'lines+markers',
-                "line": dict(color='steelblue')
-            },
-            title=f"{department_load['department'].iloc[0]} Department Load Over Time"
-        )
-
-    
-# Plot employee tenure ladder using scatter plot
-def plot_employee_tenure_ladder(tenure_ladder):
-    if validate_data(tenure_ladder, "tenure ladder"):
-        tenure_ladder = tenure_ladder.sort_values(by='tenure_years', ascending=False)
-
-        return plot_with_error_handling(
-            px.scatter,
-            tenure_ladder,
-            x="tenure_years",
-            y="name",
-            size_max=10,
-            title="Employee Tenure Ladder",
-            labels={"tenure_years": "Tenure (Years)", "name": "Employee Name"}
-        )
-
-
-# Plot Employee Project Timelines (Gantt chart)
-def plot_employee_project_timelines(project_timelines_data):
-    if validate_data(project_timelines_data, "project timelines"):
-        return plot_with_error_handling(
-            px.timeline,
-            project_timelines_data,
-            x_start="start_date",
-            x_end="end_date",
-            y="employee_name",
-            color="project_name",
-            title="Employee Project Timelines"
-        )
+import streamlit as st
+import plotly.graph_objects as go
+from downsampling import DEFAULT_CHART_WIDTH, MAX_SERIES, band_frame, downsample_frame, use_webgl
+from instrumentation import timed
+
+
+# Helper function to check if data is valid (not None and not empty)
+def validate_data(data, data_name):
+    if data is None or data.empty:
+        st.warning(f"No {data_name} data available.")
+        return False
+    return True
+
+# Helper function to handle exception and return None
+def plot_with_error_handling(plot_func, *args, **kwargs):
+    try:
+        return plot_func(*args, **kwargs)
+    except Exception as e:
+        st.error(f"Error: {e}")
+        return None
+
+
+# plotly.express and plotly.subplots are imported inside the functions that
+# use them: plotly.express alone costs about 100 ms at startup, and tabs drawn
+# with graph_objects never need it
+
+# Plot employee performance trends over time. Unless full_detail is set, the
+# points sent stay within the chart width's budget: up to MAX_SERIES employees
+# share it, and larger departments are drawn as their mean score and
+# interquartile band. Large charts render through WebGL.
+@timed('plot')
+def plot_performance_trends(performance_data, width_px=DEFAULT_CHART_WIDTH, full_detail=False):
+    if validate_data(performance_data, "performance"):
+        # review_date arrives as datetime64 from the fetch layer; unparseable dates are NaT
+        performance_data = performance_data.dropna(subset=['review_date'])
+
+        if performance_data.empty:
+            st.warning("All review dates were invalid. No data to plot.")
+            return None
+
+        if not full_detail:
+            if performance_data["name"].nunique() > MAX_SERIES:
+                band = band_frame(performance_data, "review_date", "score", width_px=width_px)
+                return plot_with_error_handling(build_performance_band_figure, band)
+            performance_data = downsample_frame(performance_data, "review_date", "score", group="name", width_px=width_px)
+
+        import plotly.express as px
+        return plot_with_error_handling(
+            px.line,
+            performance_data,
+            x="review_date",
+            y="score",
+            color="name",
+            markers=True,
+            render_mode="webgl" if use_webgl(performance_data) else "auto",
+            title="Employee Performance Trends"
+        )
+
+# Department-wide trend: mean score per review date inside the band between the
+# lower and upper quartile of that date's scores
+def build_performance_band_figure(band):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=band['review_date'], y=band['upper'], mode='lines', line=dict(width=0),
+                             showlegend=False, hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=band['review_date'], y=band['lower'], mode='lines', line=dict(width=0),
+                             fill='tonexty', fillcolor='rgba(99, 110, 250, 0.2)', name='Interquartile range',
+                             hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=band['review_date'], y=band['mean'], mode='lines', name='Mean score',
+                             line=dict(color='rgb(99, 110, 250)'), customdata=band['values'],
+                             hovertemplate='%{x|%Y-%m-%d}: %{y:.2f} (%{customdata} reviews)<extra></extra>'))
+    fig.update_layout(title="Employee Performance Trends (department mean and interquartile range)",
+                      xaxis_title="Review date", yaxis_title="Score")
+    return fig
+
+# Plot average performance score by department using boxplot
+@timed('plot')
+def plot_department_performance(department_performance):
+    if validate_data(department_performance, "department performance"):
+        return plot_with_error_handling(build_score_distribution_figure, department_performance)
+
+# Box per period from precomputed quartiles and whiskers, so no raw scores are needed
+def build_score_distribution_figure(distribution):
+    fig = go.Figure()
+    for department, periods in distribution.groupby('department', sort=False, observed=True):
+        fig.add_trace(go.Box(
+            name=str(department),
+            x=periods['period'],
+            q1=periods['q1'],
+            median=periods['median'],
+            q3=periods['q3'],
+            lowerfence=periods['lowerfence'],
+            upperfence=periods['upperfence'],
+            mean=periods['avg_score'],
+        ))
+    fig.update_layout(title="Performance Score Distribution by Department", boxmode="group",
+                      xaxis_title="Period", yaxis_title="Score", xaxis_type="category")
+    return fig
+
+# Plot monthly attrition rate using line chart
+@timed('plot')
+def plot_attrition_rate(attrition_data):
+    if validate_data(attrition_data, "attrition"):
+        import plotly.express as px
+        return plot_with_error_handling(
+            px.line,
+            attrition_data,
+            x="month",
+            y="exits",
+            markers=True,
+            title="Monthly Attrition Rate"
+        )
+
+# Build the dual-axis figure: headcount on the left axis, average hours on the right
+def build_department_load_figure(department_load):
+    from plotly.subplots import make_subplots
+
+    scatter = go.Scattergl if use_webgl(department_load) else go.Scatter
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(
+        scatter(
+            x=department_load['log_date'],
+            y=department_load['headcount'],
+            name='Headcount',
+            mode='lines',
+            line=dict(color='indianred')
+        ),
+        secondary_y=False
+    )
+    fig.add_trace(
+        scatter(
+            x=department_load['log_date'],
+            y=department_load['avg_hours_logged_per_employee'],
+            name='Avg Hours Logged',
+            mode='lines+markers',
+            line=dict(color='steelblue')
+        ),
+        secondary_y=True
+    )
+    fig.update_layout(title=f"{department_load['department'].iloc[0]} Department Load Over Time")
+    fig.update_yaxes(title_text="Headcount", secondary_y=False)
+    fig.update_yaxes(title_text="Avg Hours Logged", secondary_y=True)
+    return fig
+
+# Plot department load over time using dual-axis line chart; the daily hours
+# series is downsampled to the chart width unless full_detail is set
+@timed('plot')
+def plot_department_load(department_load, width_px=DEFAULT_CHART_WIDTH, full_detail=False):
+    if validate_data(department_load, "department load") and {'log_date', 'headcount', 'avg_hours_logged_per_employee'}.issubset(department_load.columns):
+        department_load = department_load.dropna(subset=['log_date', 'headcount', 'avg_hours_logged_per_employee'])
+
+        if not full_detail:
+            department_load = downsample_frame(department_load, 'log_date', 'avg_hours_logged_per_employee',
+                                               width_px=width_px)
+
+        return plot_with_error_handling(build_department_load_figure, department_load)
+
+    
+# Plot employee tenure ladder using scatter plot
+@timed('plot')
+def plot_employee_tenure_ladder(tenure_ladder):
+    if validate_data(tenure_ladder, "tenure ladder"):
+        tenure_ladder = tenure_ladder.sort_values(by='tenure_years', ascending=False)
+
+        import plotly.express as px
+        return plot_with_error_handling(
+            px.scatter,
+            tenure_ladder,
+            x="tenure_years",
+            y="name",
+            size_max=10,
+            title="Employee Tenure Ladder",
+            labels={"tenure_years": "Tenure (Years)", "name": "Employee Name"}
+        )
+
+
+# Plot Employee Project Timelines (Gantt chart)
+@timed('plot')
+def plot_employee_project_timelines(project_timelines_data):
+    if validate_data(project_timelines_data, "project timelines"):
+        import plotly.express as px
+        return plot_with_error_handling(
+            px.timeline,
+            project_timelines_data,
+            x_start="start_date",
+            x_end="end_date",
+            y="employee_name",
+            color="project_name",
+            title="Employee Project Timelines"
+        )
+
+
+# Plot one employee's review scores over time, for the profile drill-down
+@timed('plot')
+def plot_employee_reviews(reviews):
+    if validate_data(reviews, "review"):
+        import plotly.express as px
+        return plot_with_error_handling(
+            px.line,
+            reviews,
+            x="review_date",
+            y="score",
+            markers=True,
+            hover_data=["reviewer"],
+            range_y=[0, 10.5],
+            title="Review Scores"
+        )
+
+
+# Pixels per department row in the comparison charts, so 200 departments stay legible
+COMPARISON_ROW_PX = 22
+
+def comparison_height(departments):
+    return max(400, COMPARISON_ROW_PX * departments + 150)
+
+# Small multiples comparing every department: average score, headcount and tenure
+@timed('plot')
+def plot_department_comparison(comparison_summary):
+    if validate_data(comparison_summary, "department comparison"):
+        from plotly.subplots import make_subplots
+
+        metrics = [("avg_score", "Avg Score"), ("headcount", "Headcount"), ("avg_tenure_years", "Avg Tenure (Years)")]
+        fig = make_subplots(rows=1, cols=len(metrics), shared_yaxes=True,
+                            subplot_titles=[label for _, label in metrics])
+        for col, (metric, label) in enumerate(metrics, start=1):
+            fig.add_trace(
+                go.Bar(x=comparison_summary[metric], y=comparison_summary['department'], orientation='h',
+                       name=label, showlegend=False),
+                row=1, col=col
+            )
+        fig.update_yaxes(autorange="reversed", row=1, col=1)
+        fig.update_layout(title="Department Comparison", height=comparison_height(len(comparison_summary)))
+        return fig
+
+# Heatmap of a monthly metric with one row per department
+@timed('plot')
+def plot_department_heatmap(monthly_data, value, title, colorbar_title=None):
+    if validate_data(monthly_data, title.lower()):
+        grid = monthly_data.pivot(index='department', columns='month', values=value).sort_index(axis=1)
+        return plot_with_error_handling(
+            go.Figure,
+            go.Heatmap(z=grid.to_numpy(), x=grid.columns.tolist(), y=grid.index.tolist(),
+                       colorscale="Viridis", colorbar=dict(title=colorbar_title or value),
+                       hoverongaps=False),
+            layout=dict(title=title, height=comparison_height(len(grid)), yaxis=dict(autorange="reversed"))
+        )